@@ -0,0 +1,109 @@
+"""
+Benchmark and equivalence check for the HTML extractors in extraction.py.
+
+    python benchmarks/bench_html.py [PATH_OR_URL ...] [--repeat 5]
+
+Pass saved or live bill pages (files, directories of .htm/.html files, or http(s) URLs); with no
+arguments a synthetic multi-megabyte bill page is used. For every page the BeautifulSoup path and
+the streaming path are timed, and their output must contain the same words in the same order
+(the extractors only differ in the whitespace between words). Exits non-zero on a mismatch.
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import extraction  # noqa: E402
+
+EXTRACTORS = {
+    "bs4": extraction.extract_text_from_html_bs4,
+    "stream": extraction.extract_text_from_html_stream,
+}
+
+SECTION = (
+    '<div class="section"><h3 id="s{n}">SECTION {n}.</h3>'
+    '<p>Section {n} of the Revised Statutes is <b>amended</b> to read: &ldquo;The department shall, '
+    'subject to appropriation, establish a <a href="#d{n}">grant program</a> for eligible entities.&rdquo;</p>'
+    '<table><tr><td>Fiscal year</td><td>Amount</td></tr><tr><td>2026</td><td>$250,000</td></tr></table>'
+    '<!-- page break --><script>trackSection({n});</script></div>\n'
+)
+
+
+def synthetic_page(megabytes):
+    body, size, n = [], 0, 1
+    while size < megabytes * 1024 * 1024:
+        section = SECTION.format(n=n)
+        body.append(section)
+        size += len(section)
+        n += 1
+    html = ("<!DOCTYPE html><html><head><title>HB 1234</title><style>p { margin: 0 }</style></head><body>"
+            + "".join(body) + "<p>This act takes effect on July 1, 2026.</p></body></html>")
+    return html.encode("utf-8")
+
+
+def load_pages(sources):
+    for source in sources:
+        if source.startswith(("http://", "https://")):
+            with urllib.request.urlopen(source, timeout=30) as response:
+                yield source, response.read()
+        elif os.path.isdir(source):
+            for name in sorted(os.listdir(source)):
+                if name.lower().endswith((".htm", ".html")):
+                    path = os.path.join(source, name)
+                    with open(path, "rb") as f:
+                        yield path, f.read()
+        else:
+            with open(source, "rb") as f:
+                yield source, f.read()
+
+
+def measure(fn, content, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = fn(content)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    fn(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return text, best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="*", help="HTML files, directories or URLs")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--mb", type=float, default=2.0, help="size of the synthetic page when no sources are given")
+    args = parser.parse_args()
+
+    pages = load_pages(args.sources) if args.sources else [("synthetic", synthetic_page(args.mb))]
+    mismatches = 0
+    for name, content in pages:
+        mb = len(content) / (1024 * 1024)
+        results = {key: measure(fn, content, args.repeat) for key, fn in EXTRACTORS.items()}
+        print(f"{name} ({mb:.2f} MiB)")
+        for key, (_, seconds, peak) in results.items():
+            print(f"  {key:7s} {seconds * 1000:9.1f} ms  {mb / seconds:7.2f} MiB/s  peak {peak / 1024 ** 2:7.1f} MiB")
+        reference = results["bs4"][0].split()
+        candidate = results["stream"][0].split()
+        if reference == candidate:
+            print(f"  equivalent: {len(reference)} words")
+        else:
+            mismatches += 1
+            first = next((i for i, pair in enumerate(zip(reference, candidate)) if pair[0] != pair[1]),
+                         min(len(reference), len(candidate)))
+            print(f"  MISMATCH at word {first}: bs4={reference[first:first + 8]} stream={candidate[first:first + 8]}")
+        clean = {key: extraction.preprocess_text(result[0]).split() for key, result in results.items()}
+        if clean["bs4"] != clean["stream"]:
+            mismatches += 1
+            print("  MISMATCH after preprocess_text")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Microbenchmark for text preprocessing and effective-date extraction on multi-megabyte bill text.
+
+    python benchmarks/bench_preprocess.py [--mb 4] [--repeat 5]
+
+Compares the former three-pass preprocess_text and per-call effective-date regex with the
+single-pass versions in extraction.py, checks that their output is identical and reports MB/s.
+"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import extraction  # noqa: E402
+
+LEGACY_EFFECTIVE_DATE_PATTERN = (
+    r"(effective\s+(?:date\s*(?:is|of|:)?|on)|takes\s+effect\s+(?:on)?)\s*[:\s]*(?:(January|February|March|April|May|June|July"
+    r"|August|September|October|November|December)\s+\d{1,2}(?:st|nd|rd|th)?[,\s]+\d{4}|\d{1,2}(?:st|nd|rd|th)?\s+(January"
+    r"|February|March|April|May|June|July|August|September|October|November|December)[,\s]+\d{4}|\d{4}-\d{2}-\d{2}|\d{2}/\d{2}/\d{4})"
+)
+
+SECTION = (
+    "SECTION {n}. Section {m} of the Revised Statutes is amended to read:\r\n\r\n"
+    "  (a)  The department shall, subject to appropriation, establish a grant program — "
+    "“the program” — for eligible entities.\n"
+    "  (b)  An applicant shall submit an application in the form and manner prescribed by the department.\n\n\n"
+    "  (c)  Amounts awarded under this section shall not exceed $250,000 per fiscal year. \n"
+)
+
+
+def make_bill(megabytes, seed=0):
+    """Synthetic bill text with blank lines, typographic Unicode and an effective date near the end."""
+    rng = random.Random(seed)
+    parts, size, n = [], 0, 1
+    while size < megabytes * 1024 * 1024:
+        part = SECTION.format(n=n, m=rng.randint(1, 999))
+        parts.append(part)
+        size += len(part)
+        n += 1
+    parts.append("\n\nSECTION {}. This act takes effect on July 1, 2026.\n".format(n))
+    return "".join(parts)
+
+
+def legacy_preprocess(text):
+    text = re.sub(r"[\r\n]{2,}", "\n", text)
+    text = re.sub(r"[^\x00-\x7F]+", " ", text)
+    text = re.sub(r"\s{2,}", " ", text)
+    return text.strip()
+
+
+def legacy_effective_date(text):
+    re.purge()  # the old code compiled the pattern on every call; purge so the cache does not hide it
+    match = re.search(LEGACY_EFFECTIVE_DATE_PATTERN, text, re.IGNORECASE)
+    return match.group(0) if match else None
+
+
+def best_of(fn, arg, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(arg)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, default=4.0, help="size of the synthetic bill in MiB")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--models", type=int, default=3, help="summaries per document (date scans in the old code)")
+    args = parser.parse_args()
+
+    text = make_bill(args.mb)
+    mb = len(text) / (1024 * 1024)
+    print(f"document: {mb:.2f} MiB, {text.count(chr(10))} lines")
+
+    legacy_seconds, legacy_result = best_of(legacy_preprocess, text, args.repeat)
+    new_seconds, new_result = best_of(extraction.preprocess_text, text, args.repeat)
+    assert legacy_result == new_result, "single-pass preprocess_text differs from the three-pass version"
+    print(f"preprocess  three-pass  {legacy_seconds * 1000:8.1f} ms  {mb / legacy_seconds:8.1f} MiB/s")
+    print(f"preprocess  single-pass {new_seconds * 1000:8.1f} ms  {mb / new_seconds:8.1f} MiB/s")
+
+    clean = new_result
+    legacy_seconds, _ = best_of(lambda t: [legacy_effective_date(t) for _ in range(args.models)], clean, args.repeat)
+    new_seconds, date = best_of(extraction.extract_effective_date, clean, args.repeat)
+    print(f"effective date  per-model recompiled x{args.models}  {legacy_seconds * 1000:8.1f} ms")
+    print(f"effective date  once per document        {new_seconds * 1000:8.1f} ms  -> {date!r}")
+
+
+if __name__ == "__main__":
+    main()
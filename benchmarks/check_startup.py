@@ -0,0 +1,74 @@
+"""
+Startup budget check: time-to-import and time-to-ready of the app, and which heavy modules it loads.
+
+    python benchmarks/check_startup.py [--import-budget 1.5] [--ready-budget 3.0] [--preload]
+
+Runs in a fresh interpreter with only the Firebase connection faked (firebase_init.init returns the
+fakes from fakes.py; the real firebase_admin library is used): imports main, runs the FastAPI
+lifespan startup, and exits non-zero if either phase exceeds its budget or if importing the app
+pulled in a module that should only be loaded on first use (Firestore/grpc, fitz, OCR, tokenizers,
+openai, bs4).
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARK_DIR)
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+import fakes  # noqa: E402
+
+# Modules that must not be imported by `import main`; they are loaded lazily where used.
+DEFERRED_MODULES = ("firebase_admin", "google.cloud.firestore", "google.cloud.storage", "grpc",
+                    "fitz", "pytesseract", "PIL", "pdf2image", "pdfkit", "tiktoken", "openai", "bs4")
+
+
+async def run_startup(app):
+    start = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter() - start
+    return ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--import-budget", type=float, default=float(os.getenv("STARTUP_IMPORT_BUDGET_SECONDS", "1.5")))
+    parser.add_argument("--ready-budget", type=float, default=float(os.getenv("STARTUP_READY_BUDGET_SECONDS", "3.0")))
+    parser.add_argument("--preload", action="store_true", help="measure with STARTUP_PRELOAD=1")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp()
+    os.environ.setdefault("BATCH_DB_PATH", os.path.join(scratch, "batch_jobs.sqlite3"))
+    os.environ.setdefault("FIRESTORE_WRITE_SPOOL_PATH", os.path.join(scratch, "firestore_writes.sqlite3"))
+    os.environ["STARTUP_PRELOAD"] = "1" if args.preload else "0"
+    fakes.install(stub_firebase_admin=False)
+    os.chdir(os.path.dirname(BENCHMARK_DIR))
+
+    start = time.perf_counter()
+    import main as app_module
+    import_seconds = time.perf_counter() - start
+    loaded = [name for name in DEFERRED_MODULES if name in sys.modules]
+    lifespan_seconds = asyncio.run(run_startup(app_module.app))
+    ready_seconds = import_seconds + lifespan_seconds
+
+    print(f"import    {import_seconds:6.3f}s  (budget {args.import_budget:.2f}s)")
+    print(f"lifespan  {lifespan_seconds:6.3f}s")
+    print(f"ready     {ready_seconds:6.3f}s  (budget {args.ready_budget:.2f}s, preload {'on' if args.preload else 'off'})")
+    failures = []
+    if import_seconds > args.import_budget:
+        failures.append(f"import took {import_seconds:.3f}s, budget {args.import_budget:.2f}s")
+    if ready_seconds > args.ready_budget:
+        failures.append(f"time to ready was {ready_seconds:.3f}s, budget {args.ready_budget:.2f}s")
+    if loaded:
+        failures.append(f"importing the app loaded deferred modules: {', '.join(loaded)}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Deterministic benchmark corpus of bill documents: native-text PDFs, scanned (image-only) PDFs
+that go through OCR, and HTML bill pages, in a few sizes.
+
+    python benchmarks/corpus.py [--out benchmarks/corpus]
+
+The files are generated rather than checked in; build() is a no-op when they already exist.
+"""
+import os
+import io
+import random
+import argparse
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+# (file name, kind, sections). Scanned documents are kept short because every page is OCRed.
+DOCUMENTS = [
+    ("native_short.pdf", "native_pdf", 12),
+    ("native_long.pdf", "native_pdf", 400),
+    ("scanned_short.pdf", "scanned_pdf", 4),
+    ("bill_short.html", "html", 20),
+    ("bill_long.html", "html", 1500),
+]
+
+TOPICS = ("grant program", "reporting requirement", "licensing fee", "tax credit", "pilot project",
+          "advisory council", "data privacy standard", "procurement rule", "appropriation", "penalty")
+
+
+def bill_sections(count, seed=0):
+    rng = random.Random(seed)
+    sections = []
+    for n in range(1, count + 1):
+        topic = rng.choice(TOPICS)
+        amount = rng.randrange(10, 900) * 1000
+        sections.append(
+            f"SECTION {n}. Section {rng.randint(1, 999)}-{rng.randint(1, 99)} of the Revised Statutes is amended "
+            f"to establish a {topic}. The department shall adopt rules to implement this section and may "
+            f"expend not more than ${amount:,} in each fiscal year for this purpose. The department shall "
+            f"report to the legislature on the {topic} no later than December 31 of each year."
+        )
+    sections.append("SECTION {}. This act takes effect on July 1, 2026.".format(count + 1))
+    return sections
+
+
+def write_native_pdf(path, sections):
+    import fitz
+    with fitz.open() as doc:
+        for start in range(0, len(sections), 6):
+            page = doc.new_page()
+            page.insert_textbox(fitz.Rect(50, 50, 560, 790), "\n\n".join(sections[start:start + 6]), fontsize=10)
+        doc.save(path)
+
+
+def write_scanned_pdf(path, sections):
+    import fitz
+    from PIL import Image, ImageDraw
+    with fitz.open() as doc:
+        for start in range(0, len(sections), 3):
+            image = Image.new("RGB", (1275, 1650), "white")
+            draw = ImageDraw.Draw(image)
+            y = 80
+            for section in sections[start:start + 3]:
+                words, line = section.split(), ""
+                for word in words:
+                    if len(line) + len(word) > 95:
+                        draw.text((80, y), line, fill="black")
+                        y, line = y + 22, ""
+                    line = f"{line} {word}".strip()
+                draw.text((80, y), line, fill="black")
+                y += 44
+            buffer = io.BytesIO()
+            image.save(buffer, format="PNG")
+            page = doc.new_page()
+            page.insert_image(page.rect, stream=buffer.getvalue())
+        doc.save(path)
+
+
+def write_html(path, sections):
+    body = "\n".join(f'<div class="section"><p>{section}</p><script>track({i});</script></div>'
+                     for i, section in enumerate(sections))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"<!DOCTYPE html><html><head><title>HB 1234</title><style>p {{ margin: 0 }}</style></head>"
+                f"<body><h1>HOUSE BILL 1234</h1>{body}</body></html>")
+
+
+WRITERS = {"native_pdf": write_native_pdf, "scanned_pdf": write_scanned_pdf, "html": write_html}
+
+
+def build(out_dir=DEFAULT_DIR):
+    """Generate any missing corpus files; returns {file name: (path, kind)}."""
+    os.makedirs(out_dir, exist_ok=True)
+    corpus = {}
+    for seed, (name, kind, sections) in enumerate(DOCUMENTS):
+        path = os.path.join(out_dir, name)
+        if not os.path.exists(path):
+            WRITERS[kind](path, bill_sections(sections, seed))
+        corpus[name] = (path, kind)
+    return corpus
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=DEFAULT_DIR)
+    args = parser.parse_args()
+    for name, (path, kind) in build(args.out).items():
+        print(f"{kind:12s} {os.path.getsize(path) / 1024:9.1f} KiB  {path}")
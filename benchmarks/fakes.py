@@ -0,0 +1,354 @@
+"""
+In-process stand-ins for Firestore and Cloud Storage, so the app can be benchmarked without
+credentials or network access to Firebase.
+
+    import fakes
+    fakes.install()      # before anything imports firebase_init / firebase_admin
+    import main
+
+install() registers a fake `firebase_init` (init, get_db, get_bucket) and a fake `firebase_admin.firestore`
+exposing the names the app uses (SERVER_TIMESTAMP, Query, transactional, Increment). Only the
+operations the app performs are implemented. FAKE_FIRESTORE_LATENCY_MS and FAKE_STORAGE_LATENCY_MS
+add a fixed delay per call to approximate real round-trips.
+"""
+import os
+import sys
+import copy
+import time
+import types
+import hashlib
+import threading
+from datetime import datetime, timezone
+
+FIRESTORE_LATENCY = float(os.getenv("FAKE_FIRESTORE_LATENCY_MS", "0")) / 1000
+STORAGE_LATENCY = float(os.getenv("FAKE_STORAGE_LATENCY_MS", "0")) / 1000
+
+SERVER_TIMESTAMP = object()
+
+
+class Increment:
+    def __init__(self, value):
+        self.value = value
+
+
+class Query:
+    ASCENDING = "ASCENDING"
+    DESCENDING = "DESCENDING"
+
+
+def _pause(seconds):
+    if seconds:
+        time.sleep(seconds)
+
+
+def _resolve(value, current=None):
+    """Replace write sentinels (SERVER_TIMESTAMP, Increment) with concrete values."""
+    if value is SERVER_TIMESTAMP:
+        return datetime.now(timezone.utc)
+    if isinstance(value, Increment):
+        return (current or 0) + value.value
+    if isinstance(value, dict):
+        current = current if isinstance(current, dict) else {}
+        return {key: _resolve(item, current.get(key)) for key, item in value.items()}
+    return copy.deepcopy(value)
+
+
+def _merge(target, updates):
+    for key, value in updates.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = value
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field):
+        value = self._data
+        for part in field.split("."):
+            value = value[part]
+        return value
+
+
+class FakeDocumentReference:
+    def __init__(self, db, collection_path, doc_id):
+        self._db = db
+        self._collection_path = collection_path
+        self.id = doc_id
+        self.path = f"{collection_path}/{doc_id}"
+
+    def collection(self, name):
+        return FakeCollection(self._db, f"{self.path}/{name}")
+
+    def get(self, transaction=None, field_paths=None):
+        _pause(FIRESTORE_LATENCY)
+        with self._db.lock:
+            data = self._db.docs.get(self._collection_path, {}).get(self.id)
+            return FakeSnapshot(self, copy.deepcopy(data))
+
+    def set(self, data, merge=False, _latency=None):
+        _pause(FIRESTORE_LATENCY if _latency is None else _latency)
+        with self._db.lock:
+            documents = self._db.docs.setdefault(self._collection_path, {})
+            current = documents.get(self.id)
+            resolved = _resolve(data, current if merge else None)
+            if merge and current is not None:
+                _merge(current, resolved)
+            else:
+                documents[self.id] = resolved
+
+    def update(self, data):
+        _pause(FIRESTORE_LATENCY)
+        with self._db.lock:
+            current = self._db.docs.get(self._collection_path, {}).get(self.id)
+            if current is None:
+                from google.api_core.exceptions import NotFound
+                raise NotFound(f"No document to update: {self.path}")
+            for field, value in data.items():
+                target = current
+                *parents, leaf = field.split(".")
+                for part in parents:
+                    target = target.setdefault(part, {})
+                target[leaf] = _resolve(value, target.get(leaf))
+
+    def delete(self):
+        _pause(FIRESTORE_LATENCY)
+        with self._db.lock:
+            self._db.docs.get(self._collection_path, {}).pop(self.id, None)
+
+
+_OPERATORS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">": lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "in": lambda a, b: a in b,
+    "array_contains_any": lambda a, b: a is not None and any(item in a for item in b),
+}
+
+
+class FakeQuery:
+    def __init__(self, db, path, filters=(), order=None, fields=None, cursor=None, limit_to=None):
+        self._db = db
+        self._path = path
+        self._filters = tuple(filters)
+        self._order = order
+        self._fields = fields
+        self._cursor = cursor
+        self._limit = limit_to
+
+    def _copy(self, **changes):
+        state = {"filters": self._filters, "order": self._order, "fields": self._fields,
+                 "cursor": self._cursor, "limit_to": self._limit}
+        state.update(changes)
+        return FakeQuery(self._db, self._path, **state)
+
+    def where(self, field, op, value):
+        return self._copy(filters=self._filters + ((field, op, value),))
+
+    def order_by(self, field, direction=Query.ASCENDING):
+        return self._copy(order=(field, direction))
+
+    def select(self, fields):
+        return self._copy(fields=list(fields))
+
+    def start_after(self, snapshot):
+        return self._copy(cursor=snapshot.id)
+
+    def limit(self, count):
+        return self._copy(limit_to=count)
+
+    def stream(self):
+        _pause(FIRESTORE_LATENCY)
+        with self._db.lock:
+            items = [(doc_id, copy.deepcopy(data)) for doc_id, data in self._db.docs.get(self._path, {}).items()
+                     if all(_OPERATORS[op](data.get(field), value) for field, op, value in self._filters)]
+        if self._order:
+            field, direction = self._order
+            items = [item for item in items if item[1].get(field) is not None]
+            items.sort(key=lambda item: (item[1][field], item[0]), reverse=direction == Query.DESCENDING)
+        if self._cursor is not None:
+            ids = [doc_id for doc_id, _ in items]
+            items = items[ids.index(self._cursor) + 1:] if self._cursor in ids else []
+        if self._limit is not None:
+            items = items[:self._limit]
+        for doc_id, data in items:
+            if self._fields is not None:
+                data = {key: value for key, value in data.items() if key in self._fields}
+            yield FakeSnapshot(FakeDocumentReference(self._db, self._path, doc_id), data)
+
+    def get(self):
+        return list(self.stream())
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, db, path):
+        super().__init__(db, path)
+
+    def document(self, doc_id=None):
+        return FakeDocumentReference(self._db, self._path, doc_id or os.urandom(10).hex())
+
+
+class FakeTransaction:
+    def __init__(self, db):
+        self._db = db
+
+    def set(self, reference, data, merge=False):
+        reference.set(data, merge=merge)
+
+    def update(self, reference, data):
+        reference.update(data)
+
+
+class FakeWriteBatch:
+    def __init__(self, db):
+        self._db = db
+        self._writes = []
+
+    def set(self, reference, data, merge=False):
+        self._writes.append((reference, data, merge))
+
+    def commit(self):
+        _pause(FIRESTORE_LATENCY)
+        with self._db.lock:
+            for reference, data, merge in self._writes:
+                reference.set(data, merge=merge, _latency=0)
+
+
+class FakeFirestore:
+    def __init__(self):
+        self.docs = {}
+        self.lock = threading.RLock()
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def document(self, path):
+        collection_path, doc_id = path.rsplit("/", 1)
+        return FakeDocumentReference(self, collection_path, doc_id)
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def transaction(self):
+        return FakeTransaction(self)
+
+
+def transactional(fn):
+    """Run the function under the fake database's lock, which makes it atomic."""
+    def wrapper(transaction, *args, **kwargs):
+        with transaction._db.lock:
+            return fn(transaction, *args, **kwargs)
+    return wrapper
+
+
+class FakeBlob:
+    def __init__(self, bucket, name, chunk_size=None):
+        self.bucket = bucket
+        self.name = name
+        self.chunk_size = chunk_size
+        meta = bucket.objects.get(name, {})
+        self.size = meta.get("size")
+        self.content_type = meta.get("content_type")
+        self.time_created = meta.get("time_created")
+        self.md5_hash = meta.get("md5_hash")
+
+    def _store(self, data, content_type, if_generation_match):
+        _pause(STORAGE_LATENCY)
+        with self.bucket.lock:
+            if if_generation_match == 0 and self.name in self.bucket.objects:
+                from google.api_core.exceptions import PreconditionFailed
+                raise PreconditionFailed(f"Object {self.name} already exists")
+            # Only metadata is kept, so stored uploads do not inflate the process's memory.
+            self.bucket.objects[self.name] = {"size": len(data), "content_type": content_type,
+                                              "time_created": datetime.now(timezone.utc),
+                                              "md5_hash": hashlib.md5(data).hexdigest()}
+        self.size = len(data)
+        self.content_type = content_type
+        self.time_created = self.bucket.objects[self.name]["time_created"]
+
+    def upload_from_string(self, data, content_type=None, if_generation_match=None):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._store(data, content_type, if_generation_match)
+
+    def upload_from_filename(self, filename, content_type=None, if_generation_match=None):
+        with open(filename, "rb") as f:
+            self._store(f.read(), content_type, if_generation_match)
+
+    def exists(self):
+        _pause(STORAGE_LATENCY)
+        return self.name in self.bucket.objects
+
+    def generate_signed_url(self, expiration=None, **kwargs):
+        return f"https://storage.invalid/{self.bucket.name}/{self.name}?signature={os.urandom(8).hex()}"
+
+
+class _BlobListing:
+    def __init__(self, blobs, page_size):
+        self._blobs = blobs
+        self._page_size = page_size or 1000
+
+    @property
+    def pages(self):
+        for start in range(0, len(self._blobs), self._page_size):
+            _pause(STORAGE_LATENCY)
+            yield iter(self._blobs[start:start + self._page_size])
+
+    def __iter__(self):
+        return iter(self._blobs)
+
+
+class FakeBucket:
+    def __init__(self, name="benchmark.appspot.com"):
+        self.name = name
+        self.objects = {}
+        self.lock = threading.Lock()
+
+    def blob(self, name, chunk_size=None):
+        return FakeBlob(self, name, chunk_size=chunk_size)
+
+    def list_blobs(self, prefix=None, page_size=None, max_results=None):
+        with self.lock:
+            names = sorted(name for name in self.objects if not prefix or name.startswith(prefix))
+        return _BlobListing([FakeBlob(self, name) for name in names[:max_results]], page_size)
+
+
+def install(stub_firebase_admin=True):
+    """
+    Register the fakes in sys.modules; returns (db, bucket). With stub_firebase_admin=False only the
+    real firebase_init's clients are replaced, and the real firebase_admin library is still imported
+    wherever the app uses it (so its import cost is measured).
+    """
+    db, bucket = FakeFirestore(), FakeBucket()
+    if not stub_firebase_admin:
+        import firebase_init
+        firebase_init.init = lambda: (db, bucket)
+        return db, bucket
+    firebase_init = types.ModuleType("firebase_init")
+    firebase_init.init = lambda: (db, bucket)
+    firebase_init.get_db = lambda: db
+    firebase_init.get_bucket = lambda: bucket
+    firestore = types.ModuleType("firebase_admin.firestore")
+    firestore.SERVER_TIMESTAMP = SERVER_TIMESTAMP
+    firestore.Increment = Increment
+    firestore.Query = Query
+    firestore.transactional = transactional
+    firebase_admin = types.ModuleType("firebase_admin")
+    firebase_admin.firestore = firestore
+    sys.modules.update({"firebase_init": firebase_init, "firebase_admin": firebase_admin,
+                        "firebase_admin.firestore": firestore})
+    return db, bucket
@@ -0,0 +1,329 @@
+"""
+End-to-end load benchmark for /summarize/url, /summarize/upload, /summarize/url/stream and /summaries.
+
+    python benchmarks/load_test.py [--concurrency 1,4,16] [--requests 40] [--llm-latency 0.5]
+                                   [--scenarios url,upload,url_stream,summaries] [--baseline results.json]
+
+Starts three local processes: the mock chat-completions server (mock_llm_server.py), a static
+server for the generated corpus (corpus.py), and the API itself with Firestore/Storage fakes
+(serve_with_fakes.py). Each scenario is run at every concurrency level. Reports p50/p95/p99
+latency, requests/sec, error counts (a request with any failed model counts as an error, and
+per-model error rates are reported) and peak RSS of the API process tree (including extraction
+workers), prints a table and writes JSON to benchmarks/results/. With --baseline, exits non-zero
+when any p95 is more than --tolerance slower, or the error rate higher, than in the baseline report.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import threading
+import subprocess
+import statistics
+import http.server
+import functools
+import httpx
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARK_DIR)
+import corpus  # noqa: E402
+
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+UPLOAD_TYPES = {".pdf": "application/pdf", ".html": "text/html"}
+# Response keys of the per-model results (summary.MODEL_RESPONSE_KEYS values).
+MODEL_KEYS = ("gpt4", "gpt4mini", "togetherai")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_directory(directory, port):
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=directory)
+    handler.log_message = lambda *args: None
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def wait_until_up(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def _children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def _rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def tree_rss(pid):
+    """Resident memory of a process and all of its descendants (Linux /proc, else psutil)."""
+    if os.path.exists(f"/proc/{pid}/status"):
+        total, stack = 0, [pid]
+        while stack:
+            current = stack.pop()
+            total += _rss_bytes(current)
+            stack.extend(_children(current))
+        return total
+    try:
+        import psutil
+        process = psutil.Process(pid)
+        return sum(p.memory_info().rss for p in [process, *process.children(recursive=True)])
+    except Exception:
+        return 0
+
+
+class RssSampler:
+    """Samples the API process tree's RSS in the background and keeps the peak."""
+
+    def __init__(self, pid, interval=0.1):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.peak = tree_rss(self.pid)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, tree_rss(self.pid))
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Scenarios:
+    def __init__(self, api, corpus_url, files):
+        self.api = api
+        self.corpus_url = corpus_url
+        self.files = files
+        self.counter = 0
+
+    def _next(self, kinds):
+        names = [name for name, (_, kind) in self.files.items() if kind in kinds]
+        self.counter += 1
+        return self.counter, names[self.counter % len(names)]
+
+    def _prompt(self, n):
+        # A distinct prompt per request, so every request reaches the (mock) LLMs instead of the summary cache.
+        return f"Summarize the key provisions of this bill for a policy analyst. Request {n}."
+
+    async def url(self, client):
+        n, name = self._next(("native_pdf", "scanned_pdf", "html"))
+        return await client.post(f"{self.api}/summarize/url",
+                                 data={"url": f"{self.corpus_url}/{name}", "custom_prompt": self._prompt(n)})
+
+    async def upload(self, client):
+        n, name = self._next(("native_pdf", "html"))
+        path, _ = self.files[name]
+        with open(path, "rb") as f:
+            content = f.read()
+        files = {"file": (name, content, UPLOAD_TYPES[os.path.splitext(name)[1]])}
+        return await client.post(f"{self.api}/summarize/upload", data={"custom_prompt": self._prompt(n)}, files=files)
+
+    async def summaries(self, client):
+        return await client.get(f"{self.api}/summaries", params={"limit": 50, "view": "list"})
+
+    async def url_stream(self, client):
+        n, name = self._next(("native_pdf", "scanned_pdf", "html"))
+        return await client.post(f"{self.api}/summarize/url/stream",
+                                 data={"url": f"{self.corpus_url}/{name}", "custom_prompt": self._prompt(n)})
+
+
+def sse_events(body):
+    """(event, data) pairs of a text/event-stream body."""
+    for block in body.split("\n\n"):
+        event, data = "message", []
+        for line in block.splitlines():
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                data.append(line[5:].strip())
+        if data:
+            yield event, json.loads("\n".join(data))
+
+
+def response_errors(response):
+    """
+    (request_failed, models_that_failed) for one response. A request fails on an HTTP error, a
+    top-level "error", or an error from any model (a result with "error", or an SSE "error" event).
+    """
+    if response.status_code >= 400:
+        return True, []
+    content_type = response.headers.get("content-type", "")
+    if content_type.startswith("text/event-stream"):
+        models = [data.get("model", "?") for event, data in sse_events(response.text) if event == "error"]
+        return bool(models), models
+    if content_type.startswith("application/json"):
+        body = response.json()
+        if isinstance(body, dict):
+            models = [key for key in MODEL_KEYS if isinstance(body.get(key), dict) and "error" in body[key]]
+            return "error" in body or bool(models), models
+    return False, []
+
+
+async def run_level(scenario, concurrency, total, timeout):
+    latencies, errors, model_errors = [], 0, {}
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def worker(client):
+        nonlocal errors
+        while True:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            try:
+                response = await scenario(client)
+                failed, models = response_errors(response)
+            except httpx.HTTPError:
+                failed, models = True, []
+            for model in models:
+                model_errors[model] = model_errors.get(model, 0) + 1
+            elapsed = time.perf_counter() - start
+            if failed:
+                errors += 1
+            else:
+                latencies.append(elapsed)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+    return latencies, errors, model_errors, wall
+
+
+def start_process(args, env, log_name):
+    log = open(os.path.join(RESULTS_DIR, log_name), "w")
+    return subprocess.Popen([sys.executable, *args], env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def compare(report, baseline, tolerance):
+    regressions = []
+    previous = {(row["scenario"], row["concurrency"]): row for row in baseline["results"]}
+    for row in report["results"]:
+        before = previous.get((row["scenario"], row["concurrency"]))
+        if before and before["p95_ms"] and row["p95_ms"] and row["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{row['scenario']} @ {row['concurrency']}: p95 {before['p95_ms']:.0f} -> {row['p95_ms']:.0f} ms")
+        if before and row["error_rate"] > before.get("error_rate", 0.0):
+            regressions.append(f"{row['scenario']} @ {row['concurrency']}: error rate {before.get('error_rate', 0.0):.1%} -> {row['error_rate']:.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="url,upload,url_stream,summaries")
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--requests", type=int, default=40, help="requests per scenario and concurrency level")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="mock LLM mean latency in seconds")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--baseline", help="earlier JSON report to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 slowdown vs. the baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    files = corpus.build()
+    corpus_port, llm_port, api_port = free_port(), free_port(), free_port()
+    corpus_server = serve_directory(corpus.DEFAULT_DIR, corpus_port)
+    llm_url = f"http://127.0.0.1:{llm_port}/v1"
+    env = dict(os.environ, OPENAI_API_KEY="mock", TOGETHERAI_API_KEY="mock", OPENAI_BASE_URL=llm_url,
+               TOGETHERAI_BASE_URL=llm_url, LLM_RPM="0", LLM_OPENAI_RPM="0", LLM_TOGETHERAI_RPM="0",
+               LLM_OPENAI_TPM="0", BATCH_DB_PATH=os.path.join(RESULTS_DIR, "batch_jobs.sqlite3"),
+               FIRESTORE_WRITE_SPOOL_PATH=os.path.join(RESULTS_DIR, "firestore_writes.sqlite3"), LOG_LEVEL="WARNING")
+    processes = [
+        start_process([os.path.join(BENCHMARK_DIR, "mock_llm_server.py"), "--port", str(llm_port),
+                       "--latency", str(args.llm_latency), "--error-rate", str(args.llm_error_rate)], env, "mock_llm.log"),
+        start_process([os.path.join(BENCHMARK_DIR, "serve_with_fakes.py"), "--port", str(api_port)], env, "api.log"),
+    ]
+    api = f"http://127.0.0.1:{api_port}"
+    rows = []
+    try:
+        wait_until_up(f"http://127.0.0.1:{llm_port}/v1/mock/stats")
+        wait_until_up(f"{api}/pool/stats")
+        scenarios = Scenarios(api, f"http://127.0.0.1:{corpus_port}", files)
+        for name in args.scenarios.split(","):
+            for concurrency in (int(c) for c in args.concurrency.split(",")):
+                with RssSampler(processes[1].pid) as rss:
+                    latencies, errors, model_errors, wall = asyncio.run(run_level(getattr(scenarios, name), concurrency, args.requests, args.timeout))
+                row = {
+                    "scenario": name, "concurrency": concurrency, "requests": args.requests, "errors": errors,
+                    "error_rate": round(errors / args.requests, 4),
+                    "model_error_rates": {model: round(count / args.requests, 4) for model, count in sorted(model_errors.items())},
+                    "rps": round(len(latencies) / wall, 2) if wall else 0.0,
+                    "p50_ms": percentile(latencies, 0.50) and round(percentile(latencies, 0.50) * 1000, 1),
+                    "p95_ms": percentile(latencies, 0.95) and round(percentile(latencies, 0.95) * 1000, 1),
+                    "p99_ms": percentile(latencies, 0.99) and round(percentile(latencies, 0.99) * 1000, 1),
+                    "mean_ms": round(statistics.mean(latencies) * 1000, 1) if latencies else None,
+                    "peak_rss_mb": round(rss.peak / 1024 ** 2, 1),
+                }
+                rows.append(row)
+                print(f"{name:10s} c={concurrency:<3d} rps={row['rps']:<8} p50={row['p50_ms']}ms p95={row['p95_ms']}ms "
+                      f"p99={row['p99_ms']}ms errors={errors} peak_rss={row['peak_rss_mb']}MiB", flush=True)
+                for model, rate in row["model_error_rates"].items():
+                    print(f"{'':10s} {model} error rate {rate:.1%}", flush=True)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=30)
+        corpus_server.shutdown()
+
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "llm_latency": args.llm_latency, "results": rows}
+    path = os.path.join(RESULTS_DIR, time.strftime("load_%Y%m%d_%H%M%S.json"))
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {path}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Local mock of an OpenAI-compatible chat completions API, for exercising the provider gateway,
+streaming and load tests without real provider calls or cost.
+
+    python benchmarks/mock_llm_server.py --port 8001 --latency 0.5 --error-rate 0.1 --rate-limit-rate 0.1
+
+Point the app at it (any non-empty API keys work):
+
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 TOGETHERAI_BASE_URL=http://127.0.0.1:8001/v1 uvicorn main:app
+
+Serves POST /v1/chat/completions (plain and stream=true) and GET /v1/mock/stats. Failures are
+injected at random: 429 with Retry-After, 500, or a hang past the client's timeout.
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI()
+config = {"latency": 0.5, "jitter": 0.2, "tokens_per_second": 200.0, "error_rate": 0.0,
+          "rate_limit_rate": 0.0, "hang_rate": 0.0, "retry_after": 1}
+stats = {"requests": 0, "ok": 0, "rate_limited": 0, "errors": 0, "hangs": 0}
+
+WORDS = ("the", "bill", "amends", "section", "requires", "department", "fiscal", "year", "grant", "program",
+         "effective", "provides", "funding", "for", "eligible", "entities", "and", "establishes", "reporting")
+
+
+def fake_summary(prompt, max_tokens):
+    rng = random.Random(len(prompt))
+    return " ".join(rng.choice(WORDS) for _ in range(min(max_tokens, 120))).capitalize() + "."
+
+
+async def injected_failure():
+    roll = random.random()
+    if roll < config["rate_limit_rate"]:
+        stats["rate_limited"] += 1
+        return JSONResponse({"error": {"message": "Rate limit reached (mock)", "type": "rate_limit"}}, status_code=429,
+                            headers={"Retry-After": str(config["retry_after"])})
+    roll -= config["rate_limit_rate"]
+    if roll < config["error_rate"]:
+        stats["errors"] += 1
+        return JSONResponse({"error": {"message": "Internal error (mock)", "type": "server_error"}}, status_code=500)
+    roll -= config["error_rate"]
+    if roll < config["hang_rate"]:
+        stats["hangs"] += 1
+        await asyncio.sleep(3600)
+    return None
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    stats["requests"] += 1
+    body = await request.json()
+    failure = await injected_failure()
+    if failure is not None:
+        return failure
+    prompt = "".join(message.get("content", "") for message in body.get("messages", []))
+    summary = fake_summary(prompt, body.get("max_tokens", 256))
+    usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(summary.split()),
+             "total_tokens": len(prompt) // 4 + len(summary.split())}
+    await asyncio.sleep(max(0.0, random.gauss(config["latency"], config["jitter"])))
+    stats["ok"] += 1
+    created = int(time.time())
+    if not body.get("stream"):
+        return {"id": "mock", "object": "chat.completion", "created": created, "model": body.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": summary}, "finish_reason": "stop"}],
+                "usage": usage}
+
+    async def events():
+        for word in summary.split():
+            chunk = {"id": "mock", "object": "chat.completion.chunk", "created": created, "model": body.get("model"),
+                     "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(1.0 / config["tokens_per_second"])
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/v1/mock/stats")
+async def mock_stats():
+    return {"config": config, "stats": stats}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=config["latency"], help="mean seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=config["jitter"])
+    parser.add_argument("--tokens-per-second", type=float, default=config["tokens_per_second"])
+    parser.add_argument("--error-rate", type=float, default=config["error_rate"], help="fraction of 500 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=config["rate_limit_rate"], help="fraction of 429 responses")
+    parser.add_argument("--hang-rate", type=float, default=config["hang_rate"], help="fraction of requests that never answer")
+    parser.add_argument("--retry-after", type=int, default=config["retry_after"])
+    args = parser.parse_args()
+    config.update({key: getattr(args, key) for key in config})
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""
+Run the API with in-process Firestore/Storage fakes (see fakes.py) instead of Firebase.
+
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 TOGETHERAI_BASE_URL=http://127.0.0.1:8001/v1 \
+    OPENAI_API_KEY=mock TOGETHERAI_API_KEY=mock python benchmarks/serve_with_fakes.py --port 8000
+
+Used by load_test.py; can also be run by hand for manual testing without credentials.
+"""
+import os
+import sys
+import argparse
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARK_DIR)
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+import fakes  # noqa: E402
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    fakes.install()
+    # main.py serves ./static, so run from the repository root.
+    os.chdir(os.path.dirname(BENCHMARK_DIR))
+    import uvicorn
+    import main
+    uvicorn.run(main.app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,262 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+
+def hash_content(data):
+    """SHA-256 hex digest of raw document bytes (or text), used as a content address."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """hash_content for a file on disk, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU cache bounded by entry count and, optionally, total size.
+    `sizeof(value)` estimates an entry's size in bytes when max_bytes is set.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=None, sizeof=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._total_bytes -= self._sizes.pop(key)
+                del self._data[key]
+            self._data[key] = value
+            self._sizes[key] = size
+            self._total_bytes += size
+            while self._data and (len(self._data) > self.max_entries or
+                                  (self.max_bytes is not None and self._total_bytes > self.max_bytes)):
+                old_key, _ = self._data.popitem(last=False)
+                self._total_bytes -= self._sizes.pop(old_key)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._total_bytes -= self._sizes.pop(key)
+            return self._data.pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {
+            "entries": len(self._data),
+            "bytes": self._total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class TTLCache:
+    """
+    Small thread-safe cache whose entries expire `ttl` seconds after being stored,
+    for short-lived response caching. clear() is used to invalidate on writes.
+    """
+
+    def __init__(self, ttl, max_entries=256):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = LRUCache(max_entries=max_entries)
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        if entry is not None:
+            self._entries.pop(key)
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        if self.ttl > 0:
+            self._entries.put(key, (time.monotonic() + self.ttl, value))
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return {"entries": len(self._entries), "ttl": self.ttl, "hits": self.hits, "misses": self.misses}
+
+
+class SqliteCache:
+    """
+    On-disk cache tier backed by a single sqlite file. Values are JSON documents;
+    the least recently used rows are deleted once the stored size exceeds max_bytes.
+    """
+
+    def __init__(self, path, max_bytes=2 * 1024 ** 3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access)")
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        payload = json.dumps(value)
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, payload, size, time.time()),
+            )
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            while total > self.max_bytes:
+                row = self._conn.execute(
+                    "SELECT key, size FROM entries ORDER BY last_access LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    break
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (row[0],))
+                total -= row[1]
+                self.evictions += 1
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class ExtractionCache:
+    """
+    Content-addressed cache of extracted, preprocessed document text.
+    A bounded in-memory LRU tier sits in front of an optional sqlite tier on disk,
+    so re-summarizing the same PDF skips native extraction and OCR entirely.
+    """
+
+    # Bump when extraction or preprocessing output changes, so stale entries are ignored.
+    VERSION = "4"
+
+    def __init__(self, max_entries=256, max_bytes=256 * 1024 ** 2, disk_path=None, disk_max_bytes=2 * 1024 ** 3):
+        self.memory = LRUCache(max_entries=max_entries, max_bytes=max_bytes,
+                               sizeof=lambda value: len(value.get("text", "")))
+        self.disk = SqliteCache(disk_path, max_bytes=disk_max_bytes) if disk_path else None
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build the cache from EXTRACTION_CACHE_MAX_ENTRIES, EXTRACTION_CACHE_MAX_BYTES,
+        EXTRACTION_CACHE_PATH (enables the disk tier) and EXTRACTION_CACHE_DISK_MAX_BYTES.
+        """
+        disk_path = os.getenv("EXTRACTION_CACHE_PATH") or None
+        try:
+            return cls(
+                max_entries=int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "256")),
+                max_bytes=int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(256 * 1024 ** 2))),
+                disk_path=disk_path,
+                disk_max_bytes=int(os.getenv("EXTRACTION_CACHE_DISK_MAX_BYTES", str(2 * 1024 ** 3))),
+            )
+        except sqlite3.Error as e:
+            logging.error(f"Could not open extraction cache at {disk_path}, using memory only: {str(e)}")
+            return cls(disk_path=None)
+
+    def _key(self, content_hash):
+        return f"v{self.VERSION}:{content_hash}"
+
+    def get(self, content_hash):
+        key = self._key(content_hash)
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        if self.disk is not None:
+            try:
+                value = self.disk.get(key)
+            except sqlite3.Error as e:
+                logging.error(f"Extraction cache disk read failed: {str(e)}")
+                value = None
+            if value is not None:
+                self.memory.put(key, value)
+                return value
+        return None
+
+    def put(self, content_hash, value):
+        key = self._key(content_hash)
+        self.memory.put(key, value)
+        if self.disk is not None:
+            try:
+                self.disk.put(key, value)
+            except sqlite3.Error as e:
+                logging.error(f"Extraction cache disk write failed: {str(e)}")
+
+    def stats(self):
+        return {"memory": self.memory.stats(), "disk": self.disk.stats() if self.disk is not None else None}
@@ -0,0 +1,217 @@
+import os
+import re
+import codecs
+from html.parser import HTMLParser
+from fingerprint import compute_fingerprint
+
+# Pure extraction and preprocessing helpers. This module must stay free of Firebase and
+# LLM client imports: its functions run inside extraction worker processes.
+
+
+# One pass over the text finds every run that preprocess_text changes: runs of two or more
+# whitespace / non-ASCII characters, and single non-ASCII characters. Lone ASCII whitespace is left alone.
+_NORMALIZE_RE = re.compile(r"[\s\x80-\U0010ffff]{2,}|[\x80-\U0010ffff]")
+
+_MONTHS = "January|February|March|April|May|June|July|August|September|October|November|December"
+EFFECTIVE_DATE_RE = re.compile(
+    r"(effective\s+(?:date\s*(?:is|of|:)?|on)|takes\s+effect\s+(?:on)?)\s*[:\s]*"
+    rf"(?:({_MONTHS})\s+\d{{1,2}}(?:st|nd|rd|th)?[,\s]+\d{{4}}|\d{{1,2}}(?:st|nd|rd|th)?\s+({_MONTHS})[,\s]+\d{{4}}"
+    r"|\d{4}-\d{2}-\d{2}|\d{2}/\d{2}/\d{4})",
+    re.IGNORECASE,
+)
+
+
+def is_blank_text(text):
+    return len("".join(text.split())) < 100
+
+
+# "stream" (event-based, no tree) or "bs4" (BeautifulSoup with html.parser).
+HTML_EXTRACTOR = os.getenv("HTML_EXTRACTOR", "stream")
+
+# Tags whose boundaries end a line in the streaming extractor; other tags separate text with a space.
+BLOCK_TAGS = frozenset({
+    "address", "article", "aside", "blockquote", "br", "caption", "dd", "div", "dl", "dt", "fieldset",
+    "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li",
+    "main", "nav", "ol", "p", "pre", "section", "table", "tbody", "td", "tfoot", "th", "thead", "title",
+    "tr", "ul",
+})
+# Text BeautifulSoup's get_text() leaves out: script/style (decomposed) plus template and ruby annotations.
+SKIPPED_TAGS = frozenset({"script", "style", "template", "rt", "rp"})
+# Elements without content or end tag; they are never pushed on the open-element stack.
+VOID_TAGS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr",
+})
+# Ruby annotations whose end tags are optional: each is closed by the next one or by </ruby>.
+RUBY_ANNOTATION_TAGS = ("rt", "rp")
+
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE)
+
+
+def extract_text_from_html_bs4(html_content):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html_content, 'html.parser')
+    for tag in soup(['script', 'style']):
+        tag.decompose()
+    return soup.get_text(separator=' ').strip()
+
+
+class _TextCollector(HTMLParser):
+    """
+    HTMLParser that keeps only the text. Nothing is built per element: text runs are appended
+    as they are parsed, separated by a newline at block tags and a space at any other markup.
+    Only the names of open elements are kept, to know when skipped elements end.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._open = []
+        self._skipping = 0
+        self._separator = ""
+
+    def _boundary(self, tag=None):
+        if self._separator != "\n":
+            self._separator = "\n" if tag in BLOCK_TAGS else " "
+
+    def _close(self, index):
+        """Close the open element at index and everything opened inside it."""
+        self._skipping -= sum(tag in SKIPPED_TAGS for tag in self._open[index:])
+        del self._open[index:]
+
+    def handle_starttag(self, tag, attrs):
+        if tag in RUBY_ANNOTATION_TAGS and self._open and self._open[-1] in RUBY_ANNOTATION_TAGS:
+            self._close(len(self._open) - 1)
+        if tag not in VOID_TAGS:
+            self._open.append(tag)
+            if tag in SKIPPED_TAGS:
+                self._skipping += 1
+        self._boundary(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self._boundary(tag)
+
+    def handle_endtag(self, tag):
+        # As in BeautifulSoup, an end tag also closes the elements left open inside it
+        # (e.g. </ruby> ends an unclosed <rt>); an end tag with no open element is ignored.
+        for index in range(len(self._open) - 1, -1, -1):
+            if self._open[index] == tag:
+                self._close(index)
+                break
+        self._boundary(tag)
+
+    def handle_data(self, data):
+        if self._skipping:
+            return
+        if self._separator and self.parts:
+            self.parts.append(self._separator)
+        self._separator = ""
+        self.parts.append(data)
+
+    def unknown_decl(self, data):
+        if data.startswith("CDATA["):
+            self.handle_data(data[len("CDATA["):])
+        self._boundary()
+
+    def handle_comment(self, data):
+        self._boundary()
+
+    def handle_decl(self, decl):
+        self._boundary()
+
+    def handle_pi(self, data):
+        self._boundary()
+
+
+def decode_html(html_content):
+    """Decode HTML bytes: BOM, then <meta charset>, then UTF-8, falling back to windows-1252."""
+    if isinstance(html_content, str):
+        return html_content
+    for bom, encoding in ((codecs.BOM_UTF8, "utf-8"), (codecs.BOM_UTF16_LE, "utf-16-le"), (codecs.BOM_UTF16_BE, "utf-16-be")):
+        if html_content.startswith(bom):
+            return html_content[len(bom):].decode(encoding, errors="replace")
+    match = _META_CHARSET_RE.search(html_content[:4096])
+    if match:
+        try:
+            return html_content.decode(match.group(1).decode("ascii"))
+        except (LookupError, UnicodeDecodeError):
+            pass
+    try:
+        return html_content.decode("utf-8")
+    except UnicodeDecodeError:
+        return html_content.decode("windows-1252", errors="replace")
+
+
+def extract_text_from_html_stream(html_content, chunk_chars=1 << 16):
+    """
+    Streaming HTML-to-text: the document is fed to an event-based parser in chunks, so no
+    element tree is built. Yields the same words in the same order as the BeautifulSoup path;
+    only the whitespace between them differs (newlines at block-level tags).
+    """
+    text = decode_html(html_content)
+    collector = _TextCollector()
+    for start in range(0, len(text), chunk_chars):
+        collector.feed(text[start:start + chunk_chars])
+    collector.close()
+    return "".join(collector.parts).strip()
+
+
+def extract_text_from_html(html_content):
+    """Text of an HTML document using the extractor selected by HTML_EXTRACTOR."""
+    if HTML_EXTRACTOR == "bs4":
+        return extract_text_from_html_bs4(html_content)
+    return extract_text_from_html_stream(html_content)
+
+
+def _normalize_run(match):
+    # A run made only of line breaks collapses to one newline; anything else becomes a space.
+    return " " if match.group().strip("\r\n") else "\n"
+
+
+def preprocess_text(text):
+    """
+    Collapse blank lines to one newline, replace non-ASCII characters with spaces and squeeze
+    whitespace runs to one space, in a single precompiled pass. Produces the same output as
+    the former three re.sub passes (line breaks, then non-ASCII, then whitespace).
+    """
+    return _NORMALIZE_RE.sub(_normalize_run, text).strip()
+
+
+def extract_effective_date(text):
+    """The effective date stated in a bill's text (e.g. "January 1, 2025"), or "" if there is none."""
+    match = EFFECTIVE_DATE_RE.search(text)
+    if not match:
+        return ""
+    phrase = match.group(0)
+    if ":" in phrase:
+        return phrase.split(":", 1)[-1].strip()
+    if "on" in phrase:
+        return phrase.split("on", 1)[-1].strip()
+    return phrase.split("effect", 1)[-1].strip()
+
+
+def finalize_text(text, kind):
+    """
+    Blank-check and preprocess extracted text into the result dict returned by extraction.
+    Document metadata (the effective date and the near-duplicate fingerprint) is computed here once,
+    so it is cached with the text.
+    """
+    if is_blank_text(text):
+        return {"text": "", "content_type": kind, "error": f"blank_{kind}"}
+    text = preprocess_text(text)
+    return {"text": text, "content_type": kind, "error": None, "effective_date": extract_effective_date(text),
+            "fingerprint": compute_fingerprint(text)}
+
+
+def extract_content(content, kind):
+    """Extract and preprocess an HTML ("html") or plain-text ("text") document from raw bytes."""
+    if kind == "html":
+        text = extract_text_from_html(content)
+    else:
+        text = content.decode('utf-8', errors='ignore').strip()
+    return finalize_text(text, kind)
+
+
+def extract_file(path, kind):
+    """extract_content for a document spooled to disk; the worker reads it, so no bytes are pickled."""
+    with open(path, "rb") as f:
+        return extract_content(f.read(), kind)
@@ -0,0 +1,140 @@
+import os
+import asyncio
+import hashlib
+import logging
+import tempfile
+import aiohttp
+import metrics
+from cache import LRUCache, SqliteCache
+
+FETCH_TIMEOUT_SECONDS = float(os.getenv("FETCH_TIMEOUT_SECONDS", "60"))
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(64 * 1024 ** 2)))
+FETCH_READ_CHUNK = 256 * 1024
+SNIFF_BYTES = 1024
+USER_AGENT = os.getenv("FETCH_USER_AGENT", "BillSummarizer/1.0")
+
+# Shared session for document downloads, created at app startup and reused by every request.
+_session = None
+
+
+class DocumentTooLarge(Exception):
+    """Raised when a download is larger than FETCH_MAX_BYTES."""
+
+
+def get_session():
+    """Return the shared aiohttp session, creating it on first use."""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=int(os.getenv("FETCH_MAX_CONNECTIONS", "100")),
+            limit_per_host=int(os.getenv("FETCH_MAX_CONNECTIONS_PER_HOST", "10")),
+            ttl_dns_cache=300,
+        )
+        timeout = aiohttp.ClientTimeout(total=FETCH_TIMEOUT_SECONDS, connect=10)
+        _session = aiohttp.ClientSession(connector=connector, timeout=timeout, headers={"User-Agent": USER_AGENT})
+    return _session
+
+
+async def startup():
+    get_session()
+
+
+async def shutdown():
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
+
+
+def make_validator_cache():
+    """
+    Cache of HTTP validators by URL: {"etag", "last_modified", "content_hash", "kind"}. In memory
+    (FETCH_CACHE_MAX_ENTRIES) unless FETCH_CACHE_PATH names a sqlite file, which survives restarts.
+    """
+    path = os.getenv("FETCH_CACHE_PATH") or None
+    if path:
+        try:
+            return SqliteCache(path, max_bytes=int(os.getenv("FETCH_CACHE_MAX_BYTES", str(64 * 1024 ** 2))))
+        except Exception as e:
+            logging.error(f"Could not open fetch cache at {path}, using memory only: {str(e)}")
+    return LRUCache(max_entries=int(os.getenv("FETCH_CACHE_MAX_ENTRIES", "4096")))
+
+
+def sniff_kind(head, content_type, url):
+    """
+    Document kind ("pdf", "html" or "text") from the first bytes of the body, falling back to the
+    Content-Type header and the URL's extension; None if unsupported.
+    """
+    start = head.lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    if start.startswith(b"%pdf-"):
+        return "pdf"
+    if start.startswith((b"<!doctype html", b"<html", b"<head", b"<body")) or b"<html" in start:
+        return "html"
+    path = url.lower().split("?", 1)[0]
+    if "application/pdf" in content_type or "octet-stream" in content_type or path.endswith(".pdf"):
+        return "pdf"
+    if "html" in content_type or path.endswith((".htm", ".html")):
+        return "html"
+    if "text/plain" in content_type:
+        return "text"
+    return None
+
+
+def _cacheable(headers):
+    cache_control = headers.get("Cache-Control", "").lower()
+    return "no-store" not in cache_control and bool(headers.get("ETag") or headers.get("Last-Modified"))
+
+
+async def fetch(url, validators=None, max_bytes=FETCH_MAX_BYTES):
+    """
+    GET url, streaming the body to a temp file while hashing it. With validators (a cached
+    {"etag", "last_modified"}) the request is conditional, and an unchanged document comes back
+    as {"status": 304} without a body. Otherwise returns {"status", "path", "content_hash", "size",
+    "kind", "etag", "last_modified", "cacheable"}; for a 200 the caller deletes the file at path.
+    Raises DocumentTooLarge past max_bytes.
+    """
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    with metrics.stage("fetch"):
+        async with get_session().get(url, headers=headers) as response:
+            if response.status == 304:
+                return {"status": 304}
+            if response.status != 200:
+                return {"status": response.status}
+            if response.content_length is not None and response.content_length > max_bytes:
+                raise DocumentTooLarge(f"Document exceeds the {max_bytes} byte limit.")
+            spool = await asyncio.to_thread(tempfile.NamedTemporaryFile, delete=False)
+            digest = hashlib.sha256()
+            head = b""
+            size = 0
+            try:
+                async for chunk in response.content.iter_chunked(FETCH_READ_CHUNK):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise DocumentTooLarge(f"Document exceeds the {max_bytes} byte limit.")
+                    if len(head) < SNIFF_BYTES:
+                        head += chunk[:SNIFF_BYTES - len(head)]
+                    digest.update(chunk)
+                    await asyncio.to_thread(spool.write, chunk)
+                await asyncio.to_thread(spool.close)
+            except BaseException:
+                spool.close()
+                os.unlink(spool.name)
+                raise
+            content_type = response.headers.get("Content-Type", "").lower()
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug(f"URL: {url} returned Content-Type: {content_type}, {size} bytes")
+            return {
+                "status": 200,
+                "path": spool.name,
+                "content_hash": digest.hexdigest(),
+                "size": size,
+                "kind": sniff_kind(head, content_type, url),
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "cacheable": _cacheable(response.headers),
+            }
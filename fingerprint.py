@@ -0,0 +1,85 @@
+import os
+import re
+import hashlib
+
+# Near-duplicate detection for documents. A MinHash signature of the document's word shingles
+# estimates the Jaccard similarity of two documents; locality-sensitive hashing splits it into
+# bands, so candidate near-duplicates are found by looking up band keys instead of comparing
+# against every stored document.
+
+SIGNATURE_SLOTS = 128
+BANDS = 16
+ROWS_PER_BAND = SIGNATURE_SLOTS // BANDS
+SHINGLE_WORDS = 5
+
+# Documents with fewer shingles than this are too short to fingerprint reliably; they only dedupe exactly.
+MIN_SHINGLES = int(os.getenv("FINGERPRINT_MIN_SHINGLES", "50"))
+
+# Estimated Jaccard similarity at or above which a stored summary is reused (0 disables reuse).
+# With 16 bands of 8 rows, documents at 0.9 similarity share a band with probability > 0.99
+# and documents at 0.5 with probability ~0.06.
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.95"))
+
+_WORD_RE = re.compile(r"\w+")
+_SLOT_MASK = SIGNATURE_SLOTS - 1
+_EMPTY = 1 << 64
+# Odd 32-bit constant used to derive distinct values for densified (empty) slots.
+_DENSIFY_STEP = 0x9E3779B1
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def shingles(text):
+    """The set of overlapping SHINGLE_WORDS-word sequences in text, lowercased."""
+    words = _WORD_RE.findall(text.lower())
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def minhash(shingle_set):
+    """
+    128-slot MinHash signature using one-permutation hashing: each shingle is hashed once, the
+    low bits pick a slot and the slot keeps its smallest value. Empty slots are filled from the
+    next non-empty slot (densification). Values are 32-bit ints, so signatures fit Firestore.
+    """
+    mins = [_EMPTY] * SIGNATURE_SLOTS
+    for shingle in shingle_set:
+        h = _hash64(shingle)
+        slot, value = h & _SLOT_MASK, h >> 7
+        if value < mins[slot]:
+            mins[slot] = value
+    signature = []
+    for slot in range(SIGNATURE_SLOTS):
+        for offset in range(SIGNATURE_SLOTS):
+            value = mins[(slot + offset) % SIGNATURE_SLOTS]
+            if value != _EMPTY:
+                signature.append((value + offset * _DENSIFY_STEP) & 0xFFFFFFFF)
+                break
+    return signature
+
+
+def band_keys(signature):
+    """One LSH key per band; documents sharing any key are candidate near-duplicates."""
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(",".join(map(str, rows)).encode("ascii"), digest_size=8).hexdigest()
+        keys.append(f"{band}:{digest}")
+    return keys
+
+
+def compute_fingerprint(text):
+    """{"minhash": [...], "bands": [...]} for preprocessed document text, or None if it is too short."""
+    shingle_set = shingles(text)
+    if len(shingle_set) < MIN_SHINGLES:
+        return None
+    signature = minhash(shingle_set)
+    return {"minhash": signature, "bands": band_keys(signature)}
+
+
+def similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity of the documents behind two MinHash signatures."""
+    if not signature_a or not signature_b or len(signature_a) != len(signature_b):
+        return 0.0
+    return sum(a == b for a, b in zip(signature_a, signature_b)) / len(signature_a)
@@ -1,33 +1,52 @@
 import os
 import json
-import firebase_admin
-from firebase_admin import credentials, firestore, storage
+import logging
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
 
-if not firebase_admin._apps:
-    firebase_cred_path = "firebase-adminsdk.json"
-    if not os.path.exists(firebase_cred_path):
-        raise FileNotFoundError("firebase-adminsdk.json not found in the project directory.")
-    
-    # Load Firebase credentials
-    with open(firebase_cred_path, 'r') as f:
-        creds = json.load(f)
-    
-    cred = credentials.Certificate(firebase_cred_path)
-    bucket_name = f"{creds['project_id']}.appspot.com"
-    
-    # ✅ Initialize Firebase app (no need for custom database_id)
-    firebase_admin.initialize_app(cred, {
-        "storageBucket": bucket_name
-    })
-
-# ✅ Correct Firestore initialization (DO NOT add database_id unless using multi-database setup)
-db = firestore.client(database_id="statside-summary")
-
-# ✅ Firebase storage bucket
-bucket = storage.bucket()
-
-# Debug
-print("Firestore connected:", db)
+FIREBASE_CRED_PATH = os.getenv("FIREBASE_CRED_PATH", "firebase-adminsdk.json")
+FIRESTORE_DATABASE_ID = os.getenv("FIRESTORE_DATABASE_ID", "statside-summary")
+
+# Firestore client and storage bucket, created on first use (or by the app's startup hook)
+# rather than at import, so importing the app and forking workers stays cheap.
+_db = None
+_bucket = None
+_lock = threading.Lock()
+
+
+def init():
+    """Initialize the Firebase app, Firestore client and storage bucket once; returns (db, bucket)."""
+    global _db, _bucket
+    with _lock:
+        if _db is None:
+            import firebase_admin
+            from firebase_admin import credentials, firestore, storage
+
+            if not firebase_admin._apps:
+                if not os.path.exists(FIREBASE_CRED_PATH):
+                    raise FileNotFoundError(f"{FIREBASE_CRED_PATH} not found in the project directory.")
+
+                # Load Firebase credentials
+                with open(FIREBASE_CRED_PATH, 'r') as f:
+                    creds = json.load(f)
+
+                cred = credentials.Certificate(FIREBASE_CRED_PATH)
+                bucket_name = f"{creds['project_id']}.appspot.com"
+                firebase_admin.initialize_app(cred, {
+                    "storageBucket": bucket_name
+                })
+
+            _db = firestore.client(database_id=FIRESTORE_DATABASE_ID)
+            _bucket = storage.bucket()
+            logging.info(f"Firestore connected: database {FIRESTORE_DATABASE_ID}, bucket {_bucket.name}")
+    return _db, _bucket
+
+
+def get_db():
+    return init()[0]
+
+
+def get_bucket():
+    return init()[1]
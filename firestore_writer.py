@@ -0,0 +1,262 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+import metrics
+from firebase_init import get_db
+
+# Firestore accepts at most 500 writes per batch.
+MAX_BATCH_WRITES = 500
+
+# How long a process may hold spooled writes it is committing before another process may take them over.
+LEASE_SECONDS = float(os.getenv("FIRESTORE_WRITE_LEASE_SECONDS", "300"))
+
+
+def is_permanent(exc):
+    """Errors that will recur however often the write is retried: rejected requests and unencodable data."""
+    from google.api_core import exceptions as api_exceptions
+    if isinstance(exc, api_exceptions.ClientError):
+        return not isinstance(exc, (api_exceptions.TooManyRequests, api_exceptions.Conflict))
+    return isinstance(exc, (ValueError, TypeError))
+
+
+class FirestoreWriter:
+    """
+    Write-behind buffer for Firestore document writes. set() appends the write to a local
+    sqlite spool and returns immediately; a background thread commits spooled writes in
+    Firestore batches once batch_size writes are waiting or flush_interval seconds have
+    passed. Writes are deleted from the spool only after their batch commits, so anything
+    not yet flushed when the process dies is written after the next start. Every write is
+    a set (optionally merged), so replaying one is harmless.
+
+    Several worker processes may share one spool: each batch is leased to the process
+    committing it, and a crashed process's lease expires after LEASE_SECONDS. Writes to the
+    same document are committed in queue order. The spool is
+    opened on start() (or the first write), not when the writer is created.
+    """
+
+    def __init__(self, path, batch_size=200, flush_interval=1.0, on_flush=None):
+        self.path = path
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_WRITES))
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.counters = {"buffered": 0, "flushed": 0, "batches": 0, "batch_failures": 0, "failed": 0}
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stopping = False
+        self._thread = None
+        self._conn = None
+        self.pending = 0
+
+    def _open(self):
+        """Open the spool once, creating it if needed; returns the connection."""
+        with self._lock:
+            if self._conn is None:
+                conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30.0)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(
+                    "CREATE TABLE IF NOT EXISTS writes ("
+                    " id INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT NOT NULL, data TEXT NOT NULL, merge INTEGER NOT NULL,"
+                    " timestamp_fields TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0,"
+                    " error TEXT, created_at REAL NOT NULL, lease TEXT, lease_expires REAL NOT NULL DEFAULT 0);"
+                    "CREATE INDEX IF NOT EXISTS writes_status ON writes(status, id);"
+                    "CREATE INDEX IF NOT EXISTS writes_path ON writes(path, id);"
+                )
+                conn.commit()
+                self._conn = conn
+                self.pending = self._count_pending()
+                if self.pending:
+                    logging.info(f"{self.pending} Firestore write(s) left in {self.path} will be replayed")
+            return self._conn
+
+    def _count_pending(self):
+        """Writes waiting to be committed, not counting those leased by a live process."""
+        return self._conn.execute("SELECT COUNT(*) FROM writes WHERE status = 'pending' AND lease_expires < ?",
+                                  (time.time(),)).fetchone()[0]
+
+    @classmethod
+    def from_env(cls, on_flush=None):
+        """
+        Build the writer from FIRESTORE_WRITE_SPOOL_PATH, FIRESTORE_WRITE_BATCH_SIZE
+        and FIRESTORE_FLUSH_INTERVAL_SECONDS.
+        """
+        return cls(
+            os.getenv("FIRESTORE_WRITE_SPOOL_PATH", "firestore_writes.sqlite3"),
+            batch_size=int(os.getenv("FIRESTORE_WRITE_BATCH_SIZE", "200")),
+            flush_interval=float(os.getenv("FIRESTORE_FLUSH_INTERVAL_SECONDS", "1.0")),
+            on_flush=on_flush,
+        )
+
+    def set(self, path, data, merge=False, timestamp_fields=()):
+        """
+        Queue document.set(data, merge=merge) for the document at path (e.g. "users/u/summaries/id").
+        timestamp_fields are set to the server timestamp when the write is committed.
+        data must be JSON-serializable.
+        """
+        self._open()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO writes (path, data, merge, timestamp_fields, created_at) VALUES (?, ?, ?, ?, ?)",
+                (path, json.dumps(data), int(merge), json.dumps(list(timestamp_fields)), time.time()),
+            )
+            self._conn.commit()
+            self.pending += 1
+            self.counters["buffered"] += 1
+            if self.pending >= self.batch_size:
+                self._wakeup.notify()
+
+    def _lease_batch(self):
+        """
+        Lease up to batch_size pending writes not leased by another process; returns (lease, rows).
+        A write is held back while an earlier write to the same document is leased elsewhere, so
+        writes to one document are always committed in the order they were queued.
+        """
+        lease, now = uuid.uuid4().hex, time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE writes SET lease = ?, lease_expires = ? WHERE id IN ("
+                " SELECT id FROM writes AS w WHERE status = 'pending' AND lease_expires < ? AND NOT EXISTS ("
+                "  SELECT 1 FROM writes AS earlier WHERE earlier.path = w.path AND earlier.id < w.id"
+                "  AND earlier.status = 'pending' AND earlier.lease_expires >= ?)"
+                " ORDER BY id LIMIT ?)",
+                (lease, now + LEASE_SECONDS, now, now, self.batch_size),
+            )
+            self._conn.commit()
+            rows = self._conn.execute(
+                "SELECT id, path, data, merge, timestamp_fields, attempts FROM writes WHERE lease = ? ORDER BY id", (lease,)
+            ).fetchall()
+            self.pending = self._count_pending()
+            return lease, rows
+
+    def _release(self, lease):
+        """Return leased writes that were neither committed nor dropped to the queue."""
+        with self._lock:
+            self._conn.execute("UPDATE writes SET lease = NULL, lease_expires = 0 WHERE lease = ?", (lease,))
+            self._conn.commit()
+            self.pending = self._count_pending()
+
+    @staticmethod
+    def _decode(db, row):
+        from firebase_admin import firestore
+        _, path, data, merge, timestamp_fields, _ = row
+        data = json.loads(data)
+        for field in json.loads(timestamp_fields):
+            data[field] = firestore.SERVER_TIMESTAMP
+        return db.document(path), data, bool(merge)
+
+    def _delete(self, ids):
+        with self._lock:
+            self._conn.executemany("DELETE FROM writes WHERE id = ?", [(i,) for i in ids])
+            self._conn.commit()
+
+    def flush(self):
+        """Commit one batch of spooled writes; returns how many left the spool. Raises on transient failures."""
+        self._open()
+        lease, rows = self._lease_batch()
+        if not rows:
+            return 0
+        try:
+            return self._commit(rows)
+        finally:
+            self._release(lease)
+
+    def _commit(self, rows):
+        db = get_db()
+        batch = db.batch()
+        for row in rows:
+            ref, data, merge = self._decode(db, row)
+            batch.set(ref, data, merge=merge)
+        try:
+            with metrics.stage("firestore_write"):
+                batch.commit()
+        except Exception as e:
+            self.counters["batch_failures"] += 1
+            self.last_error = str(e)
+            with self._lock:
+                self._conn.executemany("UPDATE writes SET attempts = attempts + 1 WHERE id = ?", [(row[0],) for row in rows])
+                self._conn.commit()
+            if not is_permanent(e):
+                raise
+            # One bad write fails the whole batch; write them one at a time to find it.
+            return self._flush_individually(db, rows)
+        self._delete([row[0] for row in rows])
+        self.counters["flushed"] += len(rows)
+        self.counters["batches"] += 1
+        return len(rows)
+
+    def _flush_individually(self, db, rows):
+        for row in rows:
+            ref, data, merge = self._decode(db, row)
+            try:
+                with metrics.stage("firestore_write"):
+                    ref.set(data, merge=merge)
+            except Exception as e:
+                if not is_permanent(e):
+                    raise
+                # Kept in the spool (status 'failed') for inspection instead of blocking the writes behind it.
+                logging.error(f"Dropping Firestore write to {row[1]} from the queue: {str(e)}")
+                with self._lock:
+                    self._conn.execute("UPDATE writes SET status = 'failed', error = ? WHERE id = ?", (str(e), row[0]))
+                    self._conn.commit()
+                self.counters["failed"] += 1
+                continue
+            self._delete([row[0]])
+            self.counters["flushed"] += 1
+        return len(rows)
+
+    def _flush_all(self):
+        flushed = 0
+        try:
+            while True:
+                count = self.flush()
+                flushed += count
+                if count < self.batch_size:
+                    break
+        finally:
+            if flushed and self.on_flush is not None:
+                self.on_flush()
+
+    def _run(self):
+        retry_delay, failing = self.flush_interval, False
+        while True:
+            with self._lock:
+                if not self._stopping and (failing or self.pending < self.batch_size):
+                    self._wakeup.wait(retry_delay)
+                stopping = self._stopping
+            try:
+                self._flush_all()
+                retry_delay, failing = self.flush_interval, False
+            except Exception as e:
+                failing = True
+                retry_delay = min(max(retry_delay, 0.5) * 2, 60.0)
+                logging.error(f"Firestore batch write failed; {self.pending} write(s) stay spooled, retrying in {retry_delay:.1f}s: {str(e)}")
+            if stopping:
+                return
+
+    def start(self):
+        """Open the spool and start the background flush thread; called from the app's startup hook."""
+        self._open()
+        if self._thread is None:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="firestore-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=30.0):
+        """Flush what is spooled (best effort) and stop the background thread."""
+        if self._thread is not None:
+            with self._lock:
+                self._stopping = True
+                self._wakeup.notify()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self):
+        self._open()
+        with self._lock:
+            failed = self._conn.execute("SELECT COUNT(*) FROM writes WHERE status = 'failed'").fetchone()[0]
+        return {"pending": self.pending, "failed_in_spool": failed, "batch_size": self.batch_size,
+                "flush_interval_seconds": self.flush_interval, "last_error": self.last_error, **self.counters}
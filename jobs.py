@@ -0,0 +1,244 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import logging
+import threading
+import metrics
+from rate_limit import TokenBucket
+from workers import PoolSaturated
+from summary import process_input, extract_url_text, run_models_concurrently, MODEL_RESPONSE_KEYS
+
+BATCH_DB_PATH = os.getenv("BATCH_DB_PATH", "batch_jobs.sqlite3")
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+BATCH_MAX_URLS = int(os.getenv("BATCH_MAX_URLS", "1000"))
+
+# Provider behind each model, for per-provider rate limiting.
+MODEL_PROVIDERS = {"gpt4": "openai", "openai": "openai", "togetherai": "togetherai"}
+
+
+class JobStore:
+    """
+    sqlite-backed store of batch jobs and their items (one item per URL).
+    Everything is persisted, so unfinished items are resumed after a restart.
+    """
+
+    def __init__(self, path=BATCH_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, status TEXT NOT NULL, custom_prompt TEXT NOT NULL, mode TEXT NOT NULL,"
+            " user_id TEXT NOT NULL, total INTEGER NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS items ("
+            " job_id TEXT NOT NULL, idx INTEGER NOT NULL, url TEXT NOT NULL, status TEXT NOT NULL,"
+            " result TEXT, error TEXT, elapsed REAL, PRIMARY KEY (job_id, idx));"
+            "CREATE INDEX IF NOT EXISTS items_status ON items(status);"
+        )
+        self._conn.commit()
+
+    def create_job(self, urls, custom_prompt, mode, user_id):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, custom_prompt, mode, user_id, total, created_at, updated_at)"
+                " VALUES (?, 'queued', ?, ?, ?, ?, ?, ?)",
+                (job_id, custom_prompt, mode, user_id, len(urls), now, now),
+            )
+            self._conn.executemany(
+                "INSERT INTO items (job_id, idx, url, status) VALUES (?, ?, ?, 'pending')",
+                [(job_id, idx, url) for idx, url in enumerate(urls)],
+            )
+            self._conn.commit()
+        return job_id
+
+    def get_job(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, custom_prompt, mode, user_id, total, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM items WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall())
+        job = dict(zip(["job_id", "status", "custom_prompt", "mode", "user_id", "total", "created_at", "updated_at"], row))
+        job["counts"] = {status: counts.get(status, 0) for status in ("pending", "running", "done", "failed")}
+        finished = job["counts"]["done"] + job["counts"]["failed"]
+        job["progress"] = round(finished / job["total"], 4) if job["total"] else 1.0
+        return job
+
+    def get_results(self, job_id, offset=0, limit=100):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idx, url, status, result, error, elapsed FROM items WHERE job_id = ? ORDER BY idx LIMIT ? OFFSET ?",
+                (job_id, limit, offset),
+            ).fetchall()
+        return [
+            {"index": idx, "url": url, "status": status, "result": json.loads(result) if result else None,
+             "error": error, "elapsed": elapsed}
+            for idx, url, status, result, error, elapsed in rows
+        ]
+
+    def pending_items(self):
+        """Items that still need work, including ones interrupted mid-run by a restart."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT job_id, idx FROM items WHERE status IN ('pending', 'running') ORDER BY rowid"
+            ).fetchall()
+
+    def load_item(self, job_id, idx):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT i.url, j.custom_prompt, j.mode, j.user_id FROM items i JOIN jobs j ON j.id = i.job_id"
+                " WHERE i.job_id = ? AND i.idx = ?",
+                (job_id, idx),
+            ).fetchone()
+
+    def mark_item(self, job_id, idx, status, result=None, error=None, elapsed=None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE items SET status = ?, result = ?, error = ?, elapsed = ? WHERE job_id = ? AND idx = ?",
+                (status, json.dumps(result) if result is not None else None, error, elapsed, job_id, idx),
+            )
+            remaining = self._conn.execute(
+                "SELECT COUNT(*) FROM items WHERE job_id = ? AND status IN ('pending', 'running')", (job_id,)
+            ).fetchone()[0]
+            job_status = "running" if remaining else "completed"
+            self._conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?", (job_status, now, job_id))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class BatchRunner:
+    """
+    Runs batch items on a bounded pool of asyncio workers. Each item is extracted once and
+    summarized with every model through process_input, so results are persisted to Firestore
+    exactly like interactive requests. Calls are throttled by per-provider token buckets
+    (BATCH_RPM_OPENAI, BATCH_RPM_TOGETHERAI; 0 disables) so a large batch cannot starve
+    interactive traffic or trip provider rate limits.
+    """
+
+    def __init__(self, store, workers=BATCH_WORKERS):
+        self.store = store
+        self.workers = workers
+        self.queue = asyncio.Queue()
+        self.limiters = {
+            "openai": TokenBucket(int(os.getenv("BATCH_RPM_OPENAI", "60"))),
+            "togetherai": TokenBucket(int(os.getenv("BATCH_RPM_TOGETHERAI", "30"))),
+        }
+        self._tasks = []
+
+    def start(self):
+        for job_id, idx in self.store.pending_items():
+            self.queue.put_nowait((job_id, idx))
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logging.info(f"Batch runner started with {self.workers} worker(s), {self.queue.qsize()} item(s) queued")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, urls, custom_prompt, mode, user_id):
+        job_id = self.store.create_job(urls, custom_prompt, mode, user_id)
+        for idx in range(len(urls)):
+            self.queue.put_nowait((job_id, idx))
+        return job_id
+
+    async def _worker(self):
+        while True:
+            job_id, idx = await self.queue.get()
+            metrics.request_id.set(f"batch-{job_id[:8]}-{idx}")
+            try:
+                await self._run_item(job_id, idx)
+            except Exception as e:
+                logging.error(f"Batch item {job_id}/{idx} failed: {str(e)}")
+                self.store.mark_item(job_id, idx, "failed", error=str(e))
+            finally:
+                self.queue.task_done()
+
+    async def _extract(self, url):
+        # Wait for room in the extraction pool instead of failing the item.
+        while True:
+            try:
+                return await extract_url_text(url)
+            except PoolSaturated:
+                await asyncio.sleep(1.0)
+
+    async def _run_item(self, job_id, idx):
+        row = self.store.load_item(job_id, idx)
+        if row is None:
+            return
+        url, custom_prompt, mode, user_id = row
+        self.store.mark_item(job_id, idx, "running")
+        start = time.perf_counter()
+        extracted = await self._extract(url)
+
+        async def make_call(model):
+            await self.limiters[MODEL_PROVIDERS[model]].acquire()
+            return await process_input(
+                input_data=url,
+                model=model,
+                custom_prompt=custom_prompt,
+                user_id=user_id,
+                display_name="Guest",
+                extracted=extracted,
+                mode=mode,
+            )
+
+        results = await run_models_concurrently(make_call)
+        elapsed = round(time.perf_counter() - start, 3)
+        succeeded = any("error" not in results[key] for key in MODEL_RESPONSE_KEYS.values())
+        error = None if succeeded else "; ".join(results[key]["error"] for key in MODEL_RESPONSE_KEYS.values())
+        self.store.mark_item(job_id, idx, "done" if succeeded else "failed", result=results, error=error, elapsed=elapsed)
+
+    def stats(self):
+        return {"workers": self.workers, "queued": self.queue.qsize(),
+                "rate_limits": {provider: bucket.stats() for provider, bucket in self.limiters.items()}}
+
+
+def parse_batch_urls(urls_text=None, jsonl_bytes=None):
+    """
+    Collect URLs from newline-separated text and/or a JSONL upload whose lines are
+    either JSON strings or objects with a "url" field. Blank lines are ignored.
+    Raises ValueError for malformed lines, non-HTTP(S) URLs and URLs listed more than once.
+    """
+    urls = []
+    if urls_text:
+        urls.extend(line.strip() for line in urls_text.splitlines() if line.strip())
+    if jsonl_bytes:
+        for line_number, line in enumerate(jsonl_bytes.decode("utf-8", errors="ignore").splitlines(), start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                raise ValueError(f"Line {line_number} of the JSONL file is not valid JSON.")
+            url = record.get("url") if isinstance(record, dict) else record
+            if not isinstance(url, str):
+                raise ValueError(f"Line {line_number} of the JSONL file has no \"url\".")
+            urls.append(url.strip())
+    invalid = [url for url in urls if not url.startswith(("http://", "https://"))]
+    if invalid:
+        raise ValueError(f"Invalid URL(s): {', '.join(invalid[:5])}")
+    seen, duplicates = set(), []
+    for url in urls:
+        if url in seen and url not in duplicates:
+            duplicates.append(url)
+        seen.add(url)
+    if duplicates:
+        raise ValueError(f"Duplicate URL(s): {', '.join(duplicates[:5])}")
+    return urls
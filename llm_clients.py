@@ -0,0 +1,70 @@
+import os
+import logging
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TOGETHERAI_BASE_URL = os.getenv("TOGETHERAI_BASE_URL", "https://api.together.ai/v1")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+
+# Shared async clients, created once at app startup and reused by every request.
+_openai_client = None
+_together_client = None
+
+
+def _http_client(base_url=None):
+    """A pooled keep-alive HTTP client for LLM providers."""
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20")),
+        keepalive_expiry=60.0,
+    )
+    timeout = httpx.Timeout(float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "120")), connect=10.0)
+    kwargs = {"limits": limits, "timeout": timeout}
+    if base_url:
+        kwargs["base_url"] = base_url
+    return httpx.AsyncClient(**kwargs)
+
+
+def get_openai_client():
+    """Return the shared AsyncOpenAI client, creating it on first use."""
+    global _openai_client
+    if _openai_client is None:
+        # The openai package is slow to import, so it is only loaded once an OpenAI client is needed.
+        import openai
+        _openai_client = openai.AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=OPENAI_BASE_URL,
+            http_client=_http_client(),
+            # Retries are done by the provider gateway, which also applies rate limits and circuit breaking.
+            max_retries=0,
+        )
+    return _openai_client
+
+
+def get_together_client():
+    """Return the shared httpx client for TogetherAI, creating it on first use."""
+    global _together_client
+    if _together_client is None:
+        _together_client = _http_client(TOGETHERAI_BASE_URL)
+    return _together_client
+
+
+async def startup():
+    """Create the shared clients. Called from the FastAPI lifespan hook."""
+    if os.getenv("OPENAI_API_KEY"):
+        get_openai_client()
+    get_together_client()
+    logging.info("LLM clients initialized")
+
+
+async def shutdown():
+    """Close pooled connections on application shutdown."""
+    global _openai_client, _together_client
+    if _openai_client is not None:
+        await _openai_client.close()
+        _openai_client = None
+    if _together_client is not None:
+        await _together_client.aclose()
+        _together_client = None
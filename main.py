@@ -1,30 +1,108 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-from fastapi.responses import HTMLResponse, FileResponse
+import time
+# Start of the app module import, for the time-to-ready measurement.
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse, JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 import logging
 import os
-from io import BytesIO
-from datetime import timedelta
+import json
+from contextlib import asynccontextmanager
+import asyncio
+from datetime import datetime, timezone
 from dotenv import load_dotenv
 
 # Import the centralized Firebase initialization.
-from firebase_init import db, bucket
-# Import Firestore constants like SERVER_TIMESTAMP.
-from firebase_admin import firestore
+import firebase_init
+from firebase_init import get_db
 
+import llm_clients
+import fetcher
+import metrics
+import tokens
+import storage_service
+import provider_gateway
 # Import your summarization functions and classes.
-from summary import process_input, TextProcessor
+from summary import (process_input, extract_url_text, run_models_concurrently, stream_models_concurrently,
+                     extraction_cache, fetch_validators, summaries_cache, firestore_writer, MODEL_RESPONSE_KEYS, TextProcessor)
+from map_reduce import MODES
+from workers import extraction_pool, PoolSaturated
+from jobs import JobStore, BatchRunner, parse_batch_urls, BATCH_MAX_URLS
 
 load_dotenv()
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+metrics.configure_logging()
+
+# Load tokenizers and start extraction workers during startup instead of on the first request.
+STARTUP_PRELOAD = os.getenv("STARTUP_PRELOAD", "0") == "1"
+
+batch_runner = None
+
+@asynccontextmanager
+async def lifespan(app):
+    # Firebase, pooled LLM clients and the extraction process pool are created once and shared by every request.
+    global batch_runner
+    started = time.perf_counter()
+    await asyncio.to_thread(firebase_init.init)
+    # Summary and feedback writes are flushed to Firestore in the background, including any left from a crash.
+    firestore_writer.start()
+    await llm_clients.startup()
+    await fetcher.startup()
+    extraction_pool.start()
+    if STARTUP_PRELOAD:
+        await asyncio.gather(asyncio.to_thread(tokens.preload), extraction_pool.warm())
+    # Batch jobs live in a local sqlite file; unfinished items resume on startup.
+    batch_runner = BatchRunner(JobStore())
+    batch_runner.start()
+    ready = time.perf_counter()
+    metrics.startup_seconds.set(round(started - IMPORT_STARTED, 4), phase="import")
+    metrics.startup_seconds.set(round(ready - started, 4), phase="lifespan")
+    logging.info(f"Ready in {ready - IMPORT_STARTED:.2f}s (import {started - IMPORT_STARTED:.2f}s, "
+                 f"startup {ready - started:.2f}s, preload {'on' if STARTUP_PRELOAD else 'off'})")
+    yield
+    await batch_runner.stop()
+    batch_runner.store.close()
+    extraction_pool.shutdown()
+    await llm_clients.shutdown()
+    await fetcher.shutdown()
+    await asyncio.to_thread(firestore_writer.stop)
 
 app = FastAPI(
     title="Bill Summarization API",
     description="An API to generate bill summaries using GPT-4, GPT-4-mini, and TogetherAI models.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    # Tag everything done for this request (logs, worker threads, model tasks) with one request ID.
+    rid = request.headers.get("X-Request-ID") or metrics.new_request_id()
+    token = metrics.request_id.set(rid)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = rid
+        return response
+    finally:
+        route = request.scope.get("route")
+        # Streaming responses are timed until their headers are sent.
+        metrics.http_request_seconds.observe(time.perf_counter() - start, method=request.method,
+                                             route=route.path if route is not None else "unmatched", status=status)
+        metrics.request_id.reset(token)
+
+@app.exception_handler(PoolSaturated)
+async def pool_saturated_handler(request, exc):
+    # Backpressure: the extraction pool is full, so ask the client to retry later.
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+@app.exception_handler(storage_service.UploadTooLarge)
+async def upload_too_large_handler(request, exc):
+    return JSONResponse(status_code=413, content={"detail": str(exc)})
+
 # Mount static files from the "static" directory.
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -42,161 +120,405 @@ async def read_dashboard():
     return FileResponse("static/dashboard.html")
 
 @app.get("/list_files")
-async def list_files():
+async def list_files(
+    page_size: int = Query(100, ge=1, le=1000, description="Files per page"),
+    page_token: str = Query(None, description="next_page_token from the previous page")
+):
     """
-    List previously uploaded files for the guest user.
-    Returns a JSON object mapping file names to signed URLs.
+    List previously uploaded files for the guest user, one page at a time.
+    Returns {"files": {file_name: signed_url}, "next_page_token": ...}. The listing comes from
+    an incrementally updated manifest and signed URLs are cached until shortly before they expire.
     """
     try:
-        prefix = "users/guest_user/"  # Folder for guest user files.
-        blobs = bucket.list_blobs(prefix=prefix)
-        files = {}
-        for blob in blobs:
-            file_name = blob.name.replace(prefix, "", 1)
-            if file_name:
-                file_url = blob.generate_signed_url(expiration=timedelta(hours=1))
-                files[file_name] = file_url
-        return files
+        return await asyncio.to_thread(storage_service.list_files, "guest_user", page_size, page_token)
     except Exception as e:
         logging.error(f"Error listing files: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """
+    Report hit/miss counters and sizes for the extraction cache tiers and the URL validator cache.
+    """
+    return {**extraction_cache.stats(), "fetch_validators": fetch_validators.stats()}
+
+@app.get("/pool/stats")
+async def pool_stats():
+    """
+    Report the extraction process pool's size, queue limit, active documents and rejections.
+    """
+    return extraction_pool.stats()
+
+@app.get("/writes/stats")
+async def writes_stats():
+    """
+    Report the Firestore write-behind queue: writes waiting to be flushed, batches committed and failures.
+    """
+    return firestore_writer.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """
+    Prometheus metrics: per-stage latency histograms, cache hits, OCR fallbacks, LLM tokens and provider errors.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/providers/stats")
+async def providers_stats():
+    """
+    Report each LLM provider gateway's rate-limit buckets, circuit breaker state, retries and failures.
+    """
+    return provider_gateway.stats()
+
+# Fields returned by /summaries?view=list: everything except the summary body.
+SUMMARY_LIST_FIELDS = ["base_name", "input_data", "model", "custom_prompt", "mode", "file_url",
+                       "feedback", "comment", "feedback_timestamp", "timestamp"]
+# Near-duplicate index fields stored with each summary; internal, so never returned.
+SUMMARY_INDEX_FIELDS = ("prompt_key", "minhash", "lsh_bands")
+
+def parse_date(value, name):
+    """Parse an ISO date/datetime query parameter as UTC."""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: expected an ISO date such as 2025-01-31.")
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def query_summaries(user_id, limit, cursor, view, model, feedback, date_from, date_to):
+    """Run one page of the summaries query against Firestore (blocking)."""
+    summary_ref = get_db().collection("users").document(user_id).collection("summaries")
+    query = summary_ref
+    if model:
+        query = query.where("model", "==", model)
+    if feedback:
+        query = query.where("feedback", "==", feedback)
+    if date_from:
+        query = query.where("timestamp", ">=", date_from)
+    if date_to:
+        query = query.where("timestamp", "<", date_to)
+    # firestore.Query.DESCENDING; the string avoids importing the Firestore client library here.
+    query = query.order_by("timestamp", direction="DESCENDING")
+    if view == "list":
+        query = query.select(SUMMARY_LIST_FIELDS)
+    if cursor:
+        cursor_doc = summary_ref.document(cursor).get()
+        if not cursor_doc.exists:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.start_after(cursor_doc)
+    summaries = []
+    for doc in query.limit(limit).stream():
+        data = doc.to_dict()
+        for field in SUMMARY_INDEX_FIELDS:
+            data.pop(field, None)
+        data["summary_id"] = doc.id
+        summaries.append(data)
+    next_cursor = summaries[-1]["summary_id"] if len(summaries) == limit else None
+    return {"summaries": summaries, "next_cursor": next_cursor}
+
 @app.get("/summaries")
-async def get_summaries():
+async def get_summaries(
+    limit: int = Query(50, ge=1, le=500, description="Page size"),
+    cursor: str = Query(None, description="next_cursor from the previous page"),
+    view: str = Query("full", pattern="^(full|list)$", description="'list' omits summary bodies"),
+    model: str = Query(None, description="Only summaries from this model"),
+    feedback: str = Query(None, description="Only summaries with this feedback, e.g. 'like'"),
+    date_from: str = Query(None, description="Only summaries created on or after this ISO date"),
+    date_to: str = Query(None, description="Only summaries created before this ISO date")
+):
     """
-    Fetch all summaries (with feedback and prompt data) for the guest user from Firestore.
-    Returns a JSON object with a list of summaries.
+    Fetch summaries (with feedback and prompt data) for the guest user from Firestore, newest first.
+    Results are paginated: pass the returned next_cursor to get the following page.
+    Pages are cached briefly per process. The cache is cleared when this process queues a summary or feedback
+    and again when its queued writes reach Firestore. Other uvicorn workers only see such a write once their
+    cached page expires, so a page can be up to SUMMARIES_CACHE_TTL_SECONDS (default 30) stale there.
+    Combining model/feedback filters with the timestamp ordering needs a Firestore composite index.
     """
+    user_id = "guest_user"
+    cache_key = (user_id, limit, cursor, view, model, feedback, date_from, date_to)
+    cached = summaries_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    start = parse_date(date_from, "date_from") if date_from else None
+    end = parse_date(date_to, "date_to") if date_to else None
     try:
-        summaries = []
-        # Retrieve documents from the guest_user's summaries collection.
-        docs = db.collection("users").document("guest_user").collection("summaries").stream()
-        for doc in docs:
-            data = doc.to_dict()
-            data["summary_id"] = doc.id
-            summaries.append(data)
-        return {"summaries": summaries}
+        page = await asyncio.to_thread(query_summaries, user_id, limit, cursor, view, model, feedback, start, end)
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error fetching summaries: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    summaries_cache.put(cache_key, page)
+    return page
+
+@app.get("/summaries/{summary_id}")
+async def get_summary(summary_id: str):
+    """
+    Fetch a single summary document, including its full text.
+    """
+    try:
+        doc = await asyncio.to_thread(get_db().collection("users").document("guest_user").collection("summaries").document(summary_id).get)
+    except Exception as e:
+        logging.error(f"Error fetching summary {summary_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if not doc.exists:
+        raise HTTPException(status_code=404, detail="Summary not found")
+    data = {key: value for key, value in doc.to_dict().items() if key not in SUMMARY_INDEX_FIELDS}
+    return {**data, "summary_id": doc.id}
+
+def check_mode(mode):
+    """Reject unknown summarization modes before doing any work."""
+    if mode not in MODES:
+        raise HTTPException(status_code=400, detail=f"Unsupported mode: {mode}. Use one of: {', '.join(MODES)}.")
 
 @app.post("/summarize/url")
 async def summarize_url(
     url: str = Form(..., description="The URL of the document to summarize"),
     custom_prompt: str = Form(..., description="Your custom prompt for summarization"),
-    override_base_name: str = Form(None, description="Optional override for base name")
+    override_base_name: str = Form(None, description="Optional override for base name"),
+    mode: str = Form("truncate", description="'truncate' (as much as fits the model's context) or 'map_reduce' (whole document in chunks)")
 ):
     """
     Summarize a document provided by its URL.
-    Generates three summaries: GPT-4, GPT-4-mini, and TogetherAI.
-    Uses default guest values.
+    Generates three summaries concurrently: GPT-4, GPT-4-mini, and TogetherAI.
+    A model that fails or times out returns an error entry without blocking the others;
+    per-model timings are returned under "timings". Uses default guest values.
     """
+    check_mode(mode)
     try:
         user_id = "guest_user"
         display_name = "Guest"
-        result_gpt4 = await process_input(
-            input_data=url,
-            model="gpt4",
-            custom_prompt=custom_prompt,
-            user_id=user_id,
-            display_name=display_name,
-            override_base_name=override_base_name
-        )
-        result_gpt4mini = await process_input(
-            input_data=url,
-            model="openai",  # GPT-4-mini option.
-            custom_prompt=custom_prompt,
-            user_id=user_id,
-            display_name=display_name,
-            override_base_name=override_base_name
-        )
-        result_togetherai = await process_input(
+        # Fetch and extract the document once; every model summarizes the same text.
+        extracted = await extract_url_text(url)
+        # All three models run concurrently; each has its own timeout.
+        return await run_models_concurrently(lambda model: process_input(
             input_data=url,
-            model="togetherai",
+            model=model,
             custom_prompt=custom_prompt,
             user_id=user_id,
             display_name=display_name,
-            override_base_name=override_base_name
-        )
-        return {"gpt4": result_gpt4, "gpt4mini": result_gpt4mini, "togetherai": result_togetherai}
+            override_base_name=override_base_name,
+            extracted=extracted,
+            mode=mode
+        ))
+    except PoolSaturated:
+        raise
     except Exception as e:
         logging.error(f"Error in /summarize/url: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def store_and_extract_upload(file, user_id):
+    """
+    Upload a file to Firebase Storage under a unique name (see storage_service.store_upload) and extract its text.
+    The upload is spooled to a temp file first, so memory use does not grow with the file size.
+    Returns {"uploaded_filename", "file_url", "base_name", "extraction"} or {"error": ...}.
+    """
+    base_name_used = file.filename
+    _, ext = os.path.splitext(base_name_used)
+    ext = ext.lower()
+    if ext == ".pdf":
+        kind = "pdf"
+    elif ext in [".htm", ".html"]:
+        kind = "html"
+    else:
+        return {"error": "Unsupported file type. Please upload a PDF or HTML file."}
+
+    spool_path, content_hash, size = await storage_service.spool_upload(file)
+    try:
+        if size == 0:
+            return {"error": f"Empty {kind.upper()} file"}
+        # Reserve extraction capacity first, so an upload rejected with 429 is never stored.
+        with extraction_pool.admit():
+            # Upload to Firebase Storage; identical re-uploads reuse the stored file.
+            stored = await asyncio.to_thread(
+                storage_service.store_upload, user_id, file.filename, spool_path, file.content_type, content_hash
+            )
+            # Process the file for summarization (PDFs are opened by path, never read into memory here).
+            extraction_processor = TextProcessor("openai")
+            extraction_result = await extraction_processor.process_spooled_upload(spool_path, kind, base_name_used, content_hash)
+    finally:
+        await asyncio.to_thread(os.unlink, spool_path)
+
+    if extraction_result.get("error"):
+        return {"error": extraction_result["error"]}
+
+    # Extraction results are already preprocessed (and cached by content hash).
+    return {"uploaded_filename": stored["file_name"], "file_url": stored["file_url"], "base_name": base_name_used, "extraction": extraction_result}
+
 @app.post("/summarize/upload")
 async def summarize_upload(
     custom_prompt: str = Form(..., description="Your custom prompt for summarization"),
-    file: UploadFile = File(..., description="The PDF file to summarize")
+    file: UploadFile = File(..., description="The PDF file to summarize"),
+    mode: str = Form("truncate", description="'truncate' (as much as fits the model's context) or 'map_reduce' (whole document in chunks)")
 ):
     """
     Summarize an uploaded PDF file.
     Uploads the file to Firebase Storage with duplicate naming logic and generates three summaries.
     """
+    check_mode(mode)
     try:
         user_id = "guest_user"
         display_name = "Guest"
 
-        # Read the file content.
-        file_content = await file.read()
-        file_obj = BytesIO(file_content)
-        file_obj.name = file.filename
-
-        # Upload the file to Firebase Storage with duplicate name check.
-        original_filename = file.filename  # e.g., "xyz.pdf"
-        base_name, ext = os.path.splitext(original_filename)
-        
-        new_filename = original_filename
-        counter = 1
-        blob_path = f"users/{user_id}/{new_filename}"
-        
-        while bucket.blob(blob_path).exists():
-            new_filename = f"{base_name}({counter}){ext}"
-            blob_path = f"users/{user_id}/{new_filename}"
-            counter += 1
-
-        blob = bucket.blob(blob_path)
-        blob.upload_from_string(file_content, content_type=file.content_type)
-        file_url = blob.generate_signed_url(expiration=timedelta(hours=1))
-
-        # Process the file for summarization.
-        extraction_processor = TextProcessor("openai")
-        base_name_used = file_obj.name
-        _, ext = os.path.splitext(base_name_used)
-        ext = ext.lower()
-        if ext == ".pdf":
-            extraction_result = extraction_processor.process_uploaded_pdf(file_obj, base_name=base_name_used)
-        elif ext in [".htm", ".html"]:
-            extraction_result = extraction_processor.process_uploaded_html(file_obj, base_name=base_name_used)
-        else:
-            return {"error": "Unsupported file type. Please upload a PDF or HTML file."}
-
-        if extraction_result.get("error"):
-            return {"error": extraction_result["error"]}
-
-        clean_text = extraction_processor.preprocess_text(extraction_result["text"])
-
-        # Generate summaries.
-        processor_gpt4 = TextProcessor("gpt4")
-        result_gpt4 = processor_gpt4.generate_summary(clean_text, base_name_used, custom_prompt, user_id, display_name)
-
-        processor_gpt4mini = TextProcessor("openai")
-        result_gpt4mini = processor_gpt4mini.generate_summary(clean_text, base_name_used, custom_prompt, user_id, display_name)
-
-        processor_togetherai = TextProcessor("togetherai")
-        result_togetherai = processor_togetherai.generate_summary(clean_text, base_name_used, custom_prompt, user_id, display_name)
+        upload = await store_and_extract_upload(file, user_id)
+        if upload.get("error"):
+            return {"error": upload["error"]}
+        extraction_result = upload["extraction"]
+
+        # Generate summaries concurrently.
+        def make_call(model):
+            processor = TextProcessor(model)
+            return processor.generate_summary(extraction_result["text"], upload["base_name"], custom_prompt, user_id, display_name,
+                                              content_hash=extraction_result.get("content_hash"), mode=mode,
+                                              effective_date=extraction_result.get("effective_date"),
+                                              fingerprint=extraction_result.get("fingerprint"))
+
+        results = await run_models_concurrently(make_call)
 
         return {
             "status": "success",
-            "file_url": file_url,
-            "uploaded_filename": new_filename,
-            "gpt4": result_gpt4,
-            "gpt4mini": result_gpt4mini,
-            "togetherai": result_togetherai
+            "file_url": upload["file_url"],
+            "uploaded_filename": upload["uploaded_filename"],
+            **results
         }
+    except (PoolSaturated, storage_service.UploadTooLarge):
+        raise
     except Exception as e:
         logging.error(f"Error in /summarize/upload: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def sse_event(event, data):
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_summary_events(text, base_name, custom_prompt, user_id, display_name, content_hash=None, mode="truncate", effective_date=None,
+                                fingerprint=None):
+    """
+    Stream summaries from all models as Server-Sent Events: "token" events carry text deltas,
+    "done" carries the persisted summary and summary_id, "error" a per-model failure, and a
+    final "end" event the per-model timings. Every payload is tagged with its "model" key.
+    """
+    def make_stream(model):
+        processor = TextProcessor(model)
+        return processor.stream_summary(text, base_name, custom_prompt, user_id, display_name, content_hash=content_hash, mode=mode,
+                                        effective_date=effective_date, fingerprint=fingerprint)
+
+    async for key, event in stream_models_concurrently(make_stream):
+        payload = {k: v for k, v in event.items() if k != "event"}
+        if key is not None:
+            payload["model"] = key
+        yield sse_event(event["event"], payload)
+
+@app.post("/summarize/url/stream")
+async def summarize_url_stream(
+    url: str = Form(..., description="The URL of the document to summarize"),
+    custom_prompt: str = Form(..., description="Your custom prompt for summarization"),
+    override_base_name: str = Form(None, description="Optional override for base name"),
+    mode: str = Form("truncate", description="'truncate' (as much as fits the model's context) or 'map_reduce' (whole document in chunks)")
+):
+    """
+    Streaming variant of /summarize/url. Returns a text/event-stream that forwards tokens
+    from every model as they arrive (see stream_summary_events).
+    """
+    check_mode(mode)
+    user_id = "guest_user"
+    display_name = "Guest"
+    extracted = await extract_url_text(url)
+
+    async def events():
+        if extracted["error"]:
+            for key in MODEL_RESPONSE_KEYS.values():
+                yield sse_event("error", {"model": key, "error": extracted["error"]})
+            yield sse_event("end", {"timings": {}})
+            return
+        base_name = override_base_name if override_base_name else TextProcessor.get_base_name_from_link(url)
+        async for chunk in stream_summary_events(extracted["text"], base_name, custom_prompt, user_id, display_name,
+                                                 content_hash=extracted.get("content_hash"), mode=mode,
+                                                 effective_date=extracted.get("effective_date"),
+                                                 fingerprint=extracted.get("fingerprint")):
+            yield chunk
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.post("/summarize/upload/stream")
+async def summarize_upload_stream(
+    custom_prompt: str = Form(..., description="Your custom prompt for summarization"),
+    file: UploadFile = File(..., description="The PDF file to summarize"),
+    mode: str = Form("truncate", description="'truncate' (as much as fits the model's context) or 'map_reduce' (whole document in chunks)")
+):
+    """
+    Streaming variant of /summarize/upload. The first "upload" event carries the stored
+    file's name and signed URL; model output follows as in /summarize/url/stream.
+    """
+    check_mode(mode)
+    user_id = "guest_user"
+    display_name = "Guest"
+    try:
+        upload = await store_and_extract_upload(file, user_id)
+    except (PoolSaturated, storage_service.UploadTooLarge):
+        raise
+    except Exception as e:
+        logging.error(f"Error in /summarize/upload/stream: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if upload.get("error"):
+        return {"error": upload["error"]}
+
+    async def events():
+        yield sse_event("upload", {"file_url": upload["file_url"], "uploaded_filename": upload["uploaded_filename"]})
+        extraction_result = upload["extraction"]
+        async for chunk in stream_summary_events(extraction_result["text"], upload["base_name"], custom_prompt, user_id, display_name,
+                                                 content_hash=extraction_result.get("content_hash"), mode=mode,
+                                                 effective_date=extraction_result.get("effective_date"),
+                                                 fingerprint=extraction_result.get("fingerprint")):
+            yield chunk
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.post("/batch")
+async def create_batch(
+    custom_prompt: str = Form(..., description="Your custom prompt for summarization"),
+    urls: str = Form(None, description="Newline-separated list of document URLs"),
+    file: UploadFile = File(None, description="Optional JSONL file with one URL (or {\"url\": ...}) per line"),
+    mode: str = Form("truncate", description="'truncate' (as much as fits the model's context) or 'map_reduce' (whole document in chunks)")
+):
+    """
+    Enqueue a batch summarization job for many URLs with one prompt.
+    Returns a job ID; poll /batch/{job_id} for progress and /batch/{job_id}/results for summaries.
+    """
+    check_mode(mode)
+    jsonl_bytes = await file.read() if file is not None else None
+    try:
+        url_list = parse_batch_urls(urls, jsonl_bytes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not url_list:
+        raise HTTPException(status_code=400, detail="Provide at least one URL via 'urls' or a JSONL file.")
+    if len(url_list) > BATCH_MAX_URLS:
+        raise HTTPException(status_code=400, detail=f"A batch may contain at most {BATCH_MAX_URLS} URLs.")
+    job_id = batch_runner.submit(url_list, custom_prompt, mode, "guest_user")
+    logging.info(f"Queued batch job {job_id} with {len(url_list)} URL(s)")
+    return {"job_id": job_id, "total": len(url_list), "status_url": f"/batch/{job_id}", "results_url": f"/batch/{job_id}/results"}
+
+@app.get("/batch/{job_id}")
+async def get_batch(job_id: str):
+    """
+    Report a batch job's status and progress (item counts by status).
+    """
+    job = batch_runner.store.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return job
+
+@app.get("/batch/{job_id}/results")
+async def get_batch_results(job_id: str, offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    """
+    Return per-URL results of a batch job in submission order, paginated by offset/limit.
+    """
+    job = batch_runner.store.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return {"job_id": job_id, "status": job["status"], "offset": offset,
+            "results": batch_runner.store.get_results(job_id, offset=offset, limit=limit)}
+
 @app.post("/feedback")
 async def feedback(
     summary_id: str = Form(...),
@@ -205,22 +527,18 @@ async def feedback(
 ):
     """
     Update the summary document with feedback (like/dislike and an optional comment).
-    The summary document is updated in the "users/guest_user/summaries" subcollection.
+    The summary document in the "users/guest_user/summaries" subcollection is upserted with a single
+    merged write, queued and flushed to Firestore in the background.
     """
     try:
-        summary_ref = db.collection("users").document("guest_user").collection("summaries").document(summary_id)
         update_data = {
             "feedback": feedback,
-            "comment": comment,
-            "feedback_timestamp": firestore.SERVER_TIMESTAMP
+            "comment": comment
         }
-        doc = summary_ref.get()
-        if doc.exists:
-            summary_ref.update(update_data)
-        else:
-            logging.error("No document found for feedback update; creating document with merge.")
-            summary_ref.set(update_data, merge=True)
-        logging.info(f"Feedback updated for summary {summary_id}")
+        await asyncio.to_thread(firestore_writer.set, f"users/guest_user/summaries/{summary_id}", update_data,
+                                merge=True, timestamp_fields=["feedback_timestamp"])
+        summaries_cache.clear()
+        logging.info(f"Feedback queued for summary {summary_id}")
         return {"status": "success", "summary_id": summary_id}
     except Exception as e:
         logging.error(f"Error updating feedback: {e}")
@@ -0,0 +1,122 @@
+import os
+import time
+import asyncio
+import logging
+import tokens
+import metrics
+from cache import LRUCache, hash_content
+
+# Summarization modes selectable per request.
+MODES = ("truncate", "map_reduce")
+
+CHUNK_TOKENS = int(os.getenv("MAP_REDUCE_CHUNK_TOKENS", "3000"))
+OVERLAP_TOKENS = int(os.getenv("MAP_REDUCE_OVERLAP_TOKENS", "200"))
+CONCURRENCY = int(os.getenv("MAP_REDUCE_CONCURRENCY", "4"))
+# Bounds how often section summaries are themselves re-summarized before the reduce pass.
+MAX_COLLAPSE_ROUNDS = 3
+
+MAP_PROMPT_TEMPLATE = (
+    "The text below is one section of a longer legislative document. "
+    "Summarize the provisions in this section that are relevant to the following instructions, "
+    "keeping definitions, amounts, dates and section references. Do not add an introduction.\n"
+    "Instructions: {custom_prompt}"
+)
+REDUCE_PROMPT_TEMPLATE = (
+    "{custom_prompt}\n\n"
+    "The text below consists of summaries of consecutive sections of a single document, in order. "
+    "Write one summary of the whole document from them."
+)
+
+# USD per million (prompt, completion) tokens; override with LLM_PRICE_<MODEL>="in,out".
+MODEL_PRICES_PER_MILLION = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4o-mini": (0.15, 0.60),
+    "meta-llama/Llama-3.3-70B-Instruct-Turbo-Free": (0.0, 0.0),
+}
+
+# Section summaries keyed by (chunk content, map prompt, model).
+chunk_summary_cache = LRUCache(max_entries=int(os.getenv("CHUNK_SUMMARY_CACHE_MAX_ENTRIES", "4096")))
+
+
+def split_into_chunks(text, model, chunk_tokens=CHUNK_TOKENS, overlap_tokens=OVERLAP_TOKENS):
+    """Split text on the model's token boundaries into chunks of chunk_tokens, each overlapping the previous one."""
+    encoding, _ = tokens.get_tokenizer(model)
+    token_ids = encoding.encode(text, disallowed_special=())
+    if len(token_ids) <= chunk_tokens:
+        return [text]
+    step = max(1, chunk_tokens - overlap_tokens)
+    return [encoding.decode(token_ids[start:start + chunk_tokens])
+            for start in range(0, len(token_ids) - overlap_tokens, step)]
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """Estimated USD cost of a call, from MODEL_PRICES_PER_MILLION."""
+    override = os.getenv("LLM_PRICE_" + "".join(c if c.isalnum() else "_" for c in model).upper())
+    if override:
+        price_in, price_out = (float(p) for p in override.split(","))
+    else:
+        price_in, price_out = MODEL_PRICES_PER_MILLION.get(model, (0.0, 0.0))
+    return round((prompt_tokens * price_in + completion_tokens * price_out) / 1_000_000, 6)
+
+
+def build_reduce_prompt(custom_prompt):
+    return REDUCE_PROMPT_TEMPLATE.format(custom_prompt=custom_prompt)
+
+
+async def map_sections(processor, text, custom_prompt, concurrency=CONCURRENCY):
+    """
+    Map step: summarize each chunk of text concurrently (at most `concurrency` calls in flight),
+    collapsing the section summaries again while they exceed one chunk.
+    Chunk results are cached, so a re-run only pays for the reduce step.
+    Returns (combined_section_summaries, stats).
+    """
+    map_prompt = MAP_PROMPT_TEMPLATE.format(custom_prompt=custom_prompt)
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = {"mode": "map_reduce", "chunks": 0, "cached_chunks": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    async def summarize_chunk(chunk):
+        key = hash_content(f"{processor.model}\0{map_prompt}\0{chunk}")
+        cached = chunk_summary_cache.get(key)
+        metrics.cache_result("chunk_summary", cached is not None)
+        if cached is not None:
+            stats["cached_chunks"] += 1
+            return cached
+        async with semaphore:
+            result = await processor.complete(chunk, map_prompt)
+        stats["prompt_tokens"] += result["usage"]["prompt_tokens"]
+        stats["completion_tokens"] += result["usage"]["completion_tokens"]
+        chunk_summary_cache.put(key, result["summary"])
+        return result["summary"]
+
+    start = time.perf_counter()
+    with metrics.stage("tokenize"):
+        chunks = await asyncio.to_thread(split_into_chunks, text, processor.model)
+    stats["chunks"] = len(chunks)
+    rounds = 0
+    while True:
+        partials = await asyncio.gather(*(summarize_chunk(chunk) for chunk in chunks))
+        combined = "\n\n".join(f"Section {i + 1}:\n{partial}" for i, partial in enumerate(partials))
+        rounds += 1
+        chunks = await asyncio.to_thread(split_into_chunks, combined, processor.model)
+        if len(chunks) == 1 or rounds >= MAX_COLLAPSE_ROUNDS:
+            break
+        stats["chunks"] += len(chunks)
+    stats["map_seconds"] = round(time.perf_counter() - start, 3)
+    metrics.stage_seconds.observe(stats["map_seconds"], stage="map")
+    logging.info(f"Map step for {processor.model}: {stats['chunks']} chunks, {stats['cached_chunks']} cached, {stats['map_seconds']}s")
+    return combined, stats
+
+
+async def map_reduce_summary(processor, text, custom_prompt, concurrency=CONCURRENCY):
+    """
+    Summarize a long document without truncating it: map over token chunks, then reduce.
+    Returns {"summary": ..., "stats": {...}} with chunk counts, token usage, cost and latency.
+    """
+    combined, stats = await map_sections(processor, text, custom_prompt, concurrency=concurrency)
+    start = time.perf_counter()
+    result = await processor.complete(combined, build_reduce_prompt(custom_prompt))
+    stats["reduce_seconds"] = round(time.perf_counter() - start, 3)
+    stats["prompt_tokens"] += result["usage"]["prompt_tokens"]
+    stats["completion_tokens"] += result["usage"]["completion_tokens"]
+    stats["cost_usd"] = estimate_cost(processor.model, stats["prompt_tokens"], stats["completion_tokens"])
+    return {"summary": result["summary"], "stats": stats}
@@ -0,0 +1,193 @@
+import os
+import time
+import uuid
+import bisect
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Minimal Prometheus client: counters and histograms with labels, rendered in the text exposition
+# format by /metrics. Updates are a dict lookup plus a lock, cheap enough for per-call use.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Request ID of the HTTP request (or batch item) being handled, added to every log record.
+request_id = contextvars.ContextVar("request_id", default="-")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in (*zip(names, values), *extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labelnames, key, [("le", bound)])
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
+
+
+registry = Registry()
+
+http_request_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ["method", "route", "status"]))
+stage_seconds = registry.register(Histogram(
+    "summarize_stage_duration_seconds",
+    "Time spent in each stage of extraction and summarization "
+    "(fetch, extract, pdf_native, ocr_page, tokenize, llm, llm_stream, map, firestore_read, firestore_write, storage_upload).",
+    ["stage"]))
+cache_requests = registry.register(Counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit or miss).", ["cache", "result"]))
+ocr_fallbacks = registry.register(Counter(
+    "ocr_fallback_documents_total", "PDFs that needed OCR for at least one page."))
+ocr_pages = registry.register(Counter(
+    "ocr_pages_total", "PDF pages sent to OCR because they had no native text."))
+llm_tokens = registry.register(Counter(
+    "llm_tokens_total", "Tokens sent to and received from LLM providers, by model.", ["model", "direction"]))
+llm_request_seconds = registry.register(Histogram(
+    "llm_request_duration_seconds", "Latency of individual LLM provider attempts.", ["provider", "outcome"]))
+provider_errors = registry.register(Counter(
+    "llm_provider_errors_total", "Failed LLM provider attempts by provider and error kind.", ["provider", "kind"]))
+provider_rejections = registry.register(Counter(
+    "llm_circuit_rejections_total", "Calls rejected because the provider's circuit breaker was open.", ["provider"]))
+startup_seconds = registry.register(Gauge(
+    "app_startup_duration_seconds", "Time to ready by phase: import of the app module and the lifespan startup hook.",
+    ["phase"]))
+
+
+def stage(name):
+    """Context manager timing one stage into summarize_stage_duration_seconds."""
+    return stage_seconds.time(stage=name)
+
+
+def cache_result(cache, hit):
+    cache_requests.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_usage(model, usage):
+    """Count prompt and completion tokens from a provider's usage report."""
+    if usage:
+        llm_tokens.inc(usage.get("prompt_tokens", 0), model=model, direction="prompt")
+        llm_tokens.inc(usage.get("completion_tokens", 0), model=model, direction="completion")
+
+
+def new_request_id():
+    return uuid.uuid4().hex[:16]
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds the current request ID to every log record as %(request_id)s."""
+
+    def filter(self, record):
+        record.request_id = request_id.get()
+        return True
+
+
+def configure_logging():
+    """
+    Configure root logging once: level from LOG_LEVEL (default INFO) and the request ID in every line.
+    """
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(),
+                        format="%(asctime)s - %(levelname)s - [%(request_id)s] %(message)s")
+    for handler in logging.getLogger().handlers:
+        if not any(isinstance(f, RequestIdFilter) for f in handler.filters):
+            handler.addFilter(RequestIdFilter())
+
+
+def render():
+    return registry.render()
@@ -0,0 +1,124 @@
+import os
+import asyncio
+import logging
+import tempfile
+import metrics
+
+# fitz, pdf2image, pytesseract and PIL are imported where used, so only processes that handle PDFs load them.
+
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+# Pages rasterized or being OCRed at once per document; caps peak memory regardless of page count.
+OCR_MAX_PAGES_IN_FLIGHT = int(os.getenv("OCR_MAX_PAGES_IN_FLIGHT", str((os.cpu_count() or 1) * 2)))
+# Pages with fewer non-whitespace characters than this are treated as scanned.
+OCR_PAGE_MIN_CHARS = int(os.getenv("OCR_PAGE_MIN_CHARS", "20"))
+
+
+class UnreadablePDF(Exception):
+    """Raised when a PDF can be opened neither by fitz nor by the poppler fallback."""
+
+
+def native_page_texts(pdf_source):
+    """Native text of every page, from PDF bytes or a file path; None if fitz cannot open the PDF."""
+    import fitz
+    try:
+        if isinstance(pdf_source, (bytes, bytearray)):
+            doc = fitz.open(stream=pdf_source, filetype="pdf")
+        else:
+            doc = fitz.open(pdf_source)
+        with doc:
+            return [page.get_text() for page in doc]
+    except Exception as e:
+        logging.error(f"Error in native PDF extraction: {str(e)}")
+        return None
+
+
+def blank_pages(page_texts):
+    """Indices of pages whose native text is too short to be real content."""
+    return [i for i, text in enumerate(page_texts) if len("".join(text.split())) < OCR_PAGE_MIN_CHARS]
+
+
+def ocr_page(pdf_path, page_number, dpi=OCR_DPI):
+    """Rasterize and OCR a single page. Runs in a worker process; only one page image is alive at a time."""
+    import fitz
+    import pytesseract
+    from PIL import Image
+    try:
+        with fitz.open(pdf_path) as doc:
+            pixmap = doc[page_number].get_pixmap(dpi=dpi)
+        image = Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+        del pixmap
+        return pytesseract.image_to_string(image)
+    except Exception as e:
+        logging.error(f"Error processing page {page_number} with Tesseract: {str(e)}")
+        return ""
+
+
+def poppler_page_count(pdf_path):
+    """Page count from poppler (pdf2image), for PDFs fitz cannot open. Raises UnreadablePDF."""
+    try:
+        from pdf2image import pdfinfo_from_path
+        return int(pdfinfo_from_path(pdf_path)["Pages"])
+    except Exception as e:
+        raise UnreadablePDF(f"Could not open PDF: {str(e)}")
+
+
+def ocr_page_poppler(pdf_path, page_number, dpi=OCR_DPI):
+    """ocr_page, rasterizing with poppler (pdf2image) instead of fitz."""
+    import pytesseract
+    from pdf2image import convert_from_path
+    try:
+        images = convert_from_path(pdf_path, dpi=dpi, first_page=page_number + 1, last_page=page_number + 1)
+        return pytesseract.image_to_string(images[0]) if images else ""
+    except Exception as e:
+        logging.error(f"Error processing page {page_number} with Tesseract: {str(e)}")
+        return ""
+
+
+def _spool_to_file(data):
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as spool:
+        spool.write(data)
+    return spool.name
+
+
+async def extract_pdf_text(pdf_source, pool, max_in_flight=OCR_MAX_PAGES_IN_FLIGHT):
+    """
+    Extract text from a PDF (bytes or file path) on the given ExtractionPool: native text
+    where fitz finds it, OCR only for the pages that have none. At most max_in_flight
+    pages are rasterized or OCRed at once, so memory stays bounded for any document length.
+    PDFs fitz cannot open are OCRed in full with poppler. Returns the joined page texts;
+    raises UnreadablePDF when neither can open the file.
+    """
+    spool_path = None
+    if isinstance(pdf_source, (bytes, bytearray)):
+        # Worker processes open the PDF by path instead of receiving a copy of the bytes.
+        spool_path = pdf_path = await asyncio.to_thread(_spool_to_file, pdf_source)
+    else:
+        pdf_path = pdf_source
+    try:
+        with metrics.stage("pdf_native"):
+            page_texts = await pool.run(native_page_texts, pdf_path)
+        render = ocr_page
+        if page_texts is None:
+            page_texts = [""] * await pool.run(poppler_page_count, pdf_path)
+            render = ocr_page_poppler
+            logging.info(f"fitz could not open the PDF; rasterizing its {len(page_texts)} page(s) with poppler.")
+        pages_to_ocr = blank_pages(page_texts)
+        if not pages_to_ocr:
+            logging.info("Native PDF text extraction succeeded.")
+            return "\n".join(page_texts).strip()
+        logging.info(f"OCR fallback for {len(pages_to_ocr)} of {len(page_texts)} page(s) without native text.")
+        metrics.ocr_fallbacks.inc()
+        metrics.ocr_pages.inc(len(pages_to_ocr))
+        semaphore = asyncio.Semaphore(max_in_flight)
+
+        async def ocr_one(page_number):
+            async with semaphore:
+                with metrics.stage("ocr_page"):
+                    return page_number, await pool.run(render, pdf_path, page_number)
+
+        for page_number, text in await asyncio.gather(*(ocr_one(n) for n in pages_to_ocr)):
+            page_texts[page_number] = text
+        return "\n".join(page_texts)
+    finally:
+        if spool_path:
+            os.unlink(spool_path)
@@ -0,0 +1,228 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import httpx
+import metrics
+from rate_limit import TokenBucket
+
+PROVIDERS = ("openai", "togetherai")
+
+# Defaults per provider; every setting can be overridden with LLM_<PROVIDER>_<SETTING>, e.g. LLM_OPENAI_RPM.
+# Set TPM to the deployment's account limit; with tokens.MAX_DOCUMENT_TOKENS it bounds summaries per minute.
+DEFAULT_LIMITS = {
+    "openai": {"RPM": 500, "TPM": 200000},
+    "togetherai": {"RPM": 60, "TPM": 0},
+}
+DEFAULT_SETTINGS = {
+    "MAX_RETRIES": 3,
+    "RETRY_BASE_SECONDS": 0.5,
+    "RETRY_MAX_SECONDS": 20.0,
+    "ATTEMPT_TIMEOUT_SECONDS": 60.0,
+    "BREAKER_FAILURES": 5,
+    "BREAKER_RESET_SECONDS": 30.0,
+}
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+
+def _setting(provider, name):
+    default = DEFAULT_LIMITS.get(provider, {}).get(name, DEFAULT_SETTINGS.get(name, 0))
+    value = os.getenv(f"LLM_{provider.upper()}_{name}", os.getenv(f"LLM_{name}"))
+    return type(default)(value) if value is not None else default
+
+
+def _status_code(exc):
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status
+
+
+def is_retryable(exc):
+    """Rate limits, server errors, timeouts and connection failures are worth retrying; other errors are not."""
+    status = _status_code(exc)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    if isinstance(exc, (TimeoutError, httpx.TransportError)):
+        return True
+    # openai is only imported once an OpenAI client exists; before that no OpenAI error can occur.
+    openai = sys.modules.get("openai")
+    return openai is not None and isinstance(exc, openai.APIConnectionError)
+
+
+def retry_after_seconds(exc):
+    """The provider's Retry-After hint in seconds, if the error carries one."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive transient failures and rejects calls for
+    `reset_seconds`. Then a single trial call is let through (half-open): success closes
+    the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_seconds=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probing = False
+
+    def allow(self):
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                return False
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def retry_in(self):
+        return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+                logging.warning(f"Circuit opened after {self.failures} consecutive failure(s)")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """Forget a trial call that was abandoned (cancelled) or rejected by the client without judging the provider."""
+        self._probing = False
+
+    def stats(self):
+        return {"state": self.state, "consecutive_failures": self.failures, "times_opened": self.times_opened,
+                "retry_in_seconds": round(self.retry_in(), 1) if self.state == "open" else 0.0}
+
+
+class ProviderGateway:
+    """
+    Every call to one LLM provider goes through its gateway, which applies token-bucket limits
+    on requests and tokens per minute, a per-attempt timeout, bounded retries with full-jitter
+    exponential backoff (honoring Retry-After) for transient errors, and a circuit breaker.
+    """
+
+    def __init__(self, name, rpm=0, tpm=0, max_retries=3, retry_base_seconds=0.5, retry_max_seconds=20.0,
+                 attempt_timeout_seconds=60.0, breaker_failures=5, breaker_reset_seconds=30.0):
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.attempt_timeout_seconds = attempt_timeout_seconds
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset_seconds)
+        self.counters = {"calls": 0, "attempts": 0, "retries": 0, "failures": 0, "rejected": 0, "throttled_seconds": 0.0}
+
+    @classmethod
+    def from_env(cls, name):
+        return cls(
+            name,
+            rpm=_setting(name, "RPM"),
+            tpm=_setting(name, "TPM"),
+            max_retries=_setting(name, "MAX_RETRIES"),
+            retry_base_seconds=_setting(name, "RETRY_BASE_SECONDS"),
+            retry_max_seconds=_setting(name, "RETRY_MAX_SECONDS"),
+            attempt_timeout_seconds=_setting(name, "ATTEMPT_TIMEOUT_SECONDS"),
+            breaker_failures=_setting(name, "BREAKER_FAILURES"),
+            breaker_reset_seconds=_setting(name, "BREAKER_RESET_SECONDS"),
+        )
+
+    def backoff(self, attempt, exc):
+        hint = retry_after_seconds(exc)
+        if hint is not None:
+            return min(hint, self.retry_max_seconds)
+        return random.uniform(0, min(self.retry_max_seconds, self.retry_base_seconds * 2 ** attempt))
+
+    async def _throttle(self, estimated_tokens):
+        start = time.monotonic()
+        await self.requests.acquire()
+        await self.tokens.acquire(estimated_tokens)
+        self.counters["throttled_seconds"] += time.monotonic() - start
+
+    async def call(self, make_request, estimated_tokens=1):
+        """
+        Await make_request() (a zero-argument coroutine function) under this provider's limits,
+        retrying transient failures. estimated_tokens (prompt + max completion) is charged to the
+        tokens-per-minute bucket. Raises CircuitOpen when the provider is failing fast.
+        """
+        self.counters["calls"] += 1
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                self.counters["rejected"] += 1
+                metrics.provider_rejections.inc(provider=self.name)
+                raise CircuitOpen(f"{self.name} is unavailable (circuit open, retry in {self.breaker.retry_in():.0f}s)")
+            start = time.perf_counter()
+            try:
+                await self._throttle(estimated_tokens)
+                self.counters["attempts"] += 1
+                start = time.perf_counter()
+                async with asyncio.timeout(self.attempt_timeout_seconds or None):
+                    result = await make_request()
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                metrics.llm_request_seconds.observe(time.perf_counter() - start, provider=self.name, outcome="error")
+                metrics.provider_errors.inc(provider=self.name, kind=_status_code(e) or type(e).__name__)
+                if not is_retryable(e):
+                    # Bad requests and auth errors say nothing about the provider's health, so they
+                    # neither count as failures nor close the circuit; a trial call is just released.
+                    self.breaker.release()
+                    raise
+                self.counters["failures"] += 1
+                self.breaker.record_failure()
+                if attempt == self.max_retries or self.breaker.state == "open":
+                    raise
+                delay = self.backoff(attempt, e)
+                self.counters["retries"] += 1
+                logging.warning(f"{self.name} attempt {attempt + 1} failed ({type(e).__name__}: {e}); retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+            else:
+                metrics.llm_request_seconds.observe(time.perf_counter() - start, provider=self.name, outcome="ok")
+                self.breaker.record_success()
+                return result
+
+    def stats(self):
+        return {
+            "requests_per_minute": self.requests.stats(),
+            "tokens_per_minute": self.tokens.stats(),
+            "circuit": self.breaker.stats(),
+            "max_retries": self.max_retries,
+            "attempt_timeout_seconds": self.attempt_timeout_seconds,
+            **{key: round(value, 3) for key, value in self.counters.items()},
+        }
+
+
+gateways = {name: ProviderGateway.from_env(name) for name in PROVIDERS}
+
+
+def get_gateway(provider):
+    return gateways[provider]
+
+
+def stats():
+    return {name: gateway.stats() for name, gateway in gateways.items()}
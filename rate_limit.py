@@ -0,0 +1,50 @@
+import time
+import asyncio
+
+
+class TokenBucket:
+    """
+    Async token bucket allowing `rate` units per `per` seconds, with bursts up to `capacity`.
+    acquire() waits until enough units are available; rate=0 disables limiting.
+    """
+
+    def __init__(self, rate, per=60.0, capacity=None):
+        self.rate = rate
+        self.per = per
+        self.capacity = capacity or rate
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate / self.per)
+        self.updated = now
+
+    def try_acquire(self, amount=1):
+        """Take `amount` units if available right now; returns whether it succeeded."""
+        if not self.rate:
+            return True
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+
+    async def acquire(self, amount=1):
+        if not self.rate:
+            return
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) * self.per / self.rate)
+
+    def stats(self):
+        if self.rate:
+            self._refill()
+        return {"rate": self.rate, "per_seconds": self.per, "capacity": self.capacity, "available": round(self.tokens, 2)}
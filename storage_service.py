@@ -0,0 +1,218 @@
+import os
+import time
+import bisect
+import asyncio
+import hashlib
+import logging
+import tempfile
+import threading
+from datetime import timedelta
+from firebase_init import get_db, get_bucket
+from cache import LRUCache, TTLCache, hash_content
+import metrics
+
+SIGNED_URL_LIFETIME = timedelta(hours=1)
+# Re-sign a cached URL once it is this close to expiring.
+SIGNED_URL_REFRESH_MARGIN = timedelta(minutes=5)
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(256 * 1024 ** 2)))
+UPLOAD_READ_CHUNK = 1024 * 1024
+# Resumable upload chunk size; Cloud Storage requires a multiple of 256 KiB.
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+
+# blob path -> (signed URL, expiry as epoch seconds)
+_signed_urls = LRUCache(max_entries=int(os.getenv("SIGNED_URL_CACHE_MAX_ENTRIES", "10000")))
+# user_id -> manifest document, so repeated page loads skip even the single Firestore read.
+_manifests = TTLCache(ttl=float(os.getenv("FILE_MANIFEST_CACHE_TTL_SECONDS", "30")))
+_manifest_lock = threading.Lock()
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload is larger than MAX_UPLOAD_BYTES."""
+
+
+def user_prefix(user_id):
+    return f"users/{user_id}/"
+
+
+def signed_url(blob_path):
+    """Signed download URL for a blob, reused from the cache until shortly before it expires."""
+    cached = _signed_urls.get(blob_path)
+    now = time.time()
+    if cached is not None and cached[1] - SIGNED_URL_REFRESH_MARGIN.total_seconds() > now:
+        return cached[0]
+    url = get_bucket().blob(blob_path).generate_signed_url(expiration=SIGNED_URL_LIFETIME)
+    _signed_urls.put(blob_path, (url, now + SIGNED_URL_LIFETIME.total_seconds()))
+    return url
+
+
+def remember_signed_url(blob_path, url):
+    """Cache a URL that was just signed elsewhere (e.g. right after an upload)."""
+    _signed_urls.put(blob_path, (url, time.time() + SIGNED_URL_LIFETIME.total_seconds()))
+
+
+def _manifest_ref(user_id):
+    return get_db().collection("users").document(user_id).collection("meta").document("files")
+
+
+def _manifest_entry(blob):
+    from firebase_admin import firestore
+    return {
+        "path": blob.name,
+        "size": blob.size,
+        "content_type": blob.content_type,
+        "uploaded_at": blob.time_created or firestore.SERVER_TIMESTAMP,
+    }
+
+
+def rebuild_manifest(user_id, page_size=1000):
+    """
+    Build the file manifest from a paged bucket listing. Only needed once per user
+    (or after files are changed outside this app); uploads keep it current afterwards.
+    Files found this way have no content hash, so they are not matched by find_by_hash().
+    """
+    prefix = user_prefix(user_id)
+    files = {}
+    for page in get_bucket().list_blobs(prefix=prefix, page_size=page_size).pages:
+        for blob in page:
+            file_name = blob.name.replace(prefix, "", 1)
+            if file_name:
+                files[file_name] = _manifest_entry(blob)
+    manifest = {"files": files, "hashes": {}}
+    _manifest_ref(user_id).set(manifest)
+    logging.info(f"Rebuilt file manifest for {user_id} with {len(files)} file(s)")
+    return manifest
+
+
+def _load_manifest(user_id):
+    manifest = _manifests.get(user_id)
+    if manifest is not None:
+        return manifest
+    with _manifest_lock:
+        snapshot = _manifest_ref(user_id).get()
+        manifest = snapshot.to_dict() if snapshot.exists else rebuild_manifest(user_id)
+    _manifests.put(user_id, manifest)
+    return manifest
+
+
+def get_manifest(user_id):
+    """Return {file_name: entry} for a user's uploads with one Firestore read (or none if cached)."""
+    return _load_manifest(user_id).get("files", {})
+
+
+def find_by_hash(user_id, content_hash):
+    """Name of a file the user already uploaded with these exact bytes, or None."""
+    manifest = _load_manifest(user_id)
+    file_name = manifest.get("hashes", {}).get(content_hash)
+    return file_name if file_name in manifest.get("files", {}) else None
+
+
+def record_upload(user_id, blob, file_name, content_hash=None):
+    """Add (or replace) one file in the user's manifest after an upload."""
+    entry = _manifest_entry(blob)
+    update = {"files": {file_name: entry}}
+    if content_hash:
+        entry["sha256"] = content_hash
+        update["hashes"] = {content_hash: file_name}
+    # Nested keys in set(merge=True) are literal field names, so names containing dots are safe.
+    _manifest_ref(user_id).set(update, merge=True)
+    _manifests.clear()
+
+
+def _claim_suffix(transaction, counter_ref):
+    snapshot = counter_ref.get(transaction=transaction)
+    suffix = snapshot.get("next") if snapshot.exists else 1
+    transaction.set(counter_ref, {"next": suffix + 1})
+    return suffix
+
+
+def _next_suffix(user_id, file_name):
+    """Atomically claim the next "(n)" suffix for a file name (1, 2, ...)."""
+    # The Firestore client library (and grpc) is imported on first use, not when the app starts.
+    from firebase_admin import firestore
+    counter_ref = (get_db().collection("users").document(user_id)
+                   .collection("upload_names").document(hash_content(file_name)))
+    return firestore.transactional(_claim_suffix)(get_db().transaction(), counter_ref)
+
+
+async def spool_upload(upload, max_bytes=MAX_UPLOAD_BYTES):
+    """
+    Copy an UploadFile to a temp file in 1 MiB chunks, hashing as it goes, so no request ever
+    holds the whole document in memory. Returns (path, sha256, size); the caller deletes the file.
+    Raises UploadTooLarge once more than max_bytes have been read.
+    """
+    suffix = os.path.splitext(upload.filename or "")[1]
+    spool = await asyncio.to_thread(tempfile.NamedTemporaryFile, suffix=suffix, delete=False)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        while chunk := await upload.read(UPLOAD_READ_CHUNK):
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"Upload exceeds the {max_bytes} byte limit.")
+            digest.update(chunk)
+            await asyncio.to_thread(spool.write, chunk)
+        await asyncio.to_thread(spool.close)
+    except BaseException:
+        spool.close()
+        os.unlink(spool.name)
+        raise
+    return spool.name, digest.hexdigest(), size
+
+
+def _create_blob(blob_path, source_path, content_type):
+    """
+    Upload a file only if no object exists at blob_path; returns the blob, or None if the name is taken.
+    The upload is resumable and sent in UPLOAD_CHUNK_SIZE pieces straight from disk.
+    """
+    from google.api_core.exceptions import PreconditionFailed
+    blob = get_bucket().blob(blob_path, chunk_size=UPLOAD_CHUNK_SIZE)
+    try:
+        with metrics.stage("storage_upload"):
+            blob.upload_from_filename(source_path, content_type=content_type, if_generation_match=0)
+    except PreconditionFailed:
+        return None
+    return blob
+
+
+def store_upload(user_id, file_name, source_path, content_type, content_hash):
+    """
+    Store an uploaded file (spooled at source_path) under a unique name and return
+    {"file_name", "blob_path", "file_url", "deduplicated"}.
+    Bytes the user already uploaded are not stored again; the existing file is returned instead.
+    Otherwise the original name is tried first with a create-only precondition, and on a
+    conflict "name(n).ext" is taken from an atomic per-name counter, so a free name costs
+    O(1) storage calls and concurrent uploads of the same name cannot overwrite each other.
+    """
+    existing = find_by_hash(user_id, content_hash)
+    if existing:
+        blob_path = user_prefix(user_id) + existing
+        logging.info(f"Identical upload of {file_name}; reusing {blob_path}")
+        return {"file_name": existing, "blob_path": blob_path, "file_url": signed_url(blob_path), "deduplicated": True}
+
+    base_name, ext = os.path.splitext(file_name)
+    new_filename = file_name
+    blob = _create_blob(user_prefix(user_id) + new_filename, source_path, content_type)
+    while blob is None:
+        # Names can still collide with files uploaded before the counter existed; each retry claims a new suffix.
+        new_filename = f"{base_name}({_next_suffix(user_id, file_name)}){ext}"
+        blob = _create_blob(user_prefix(user_id) + new_filename, source_path, content_type)
+
+    file_url = blob.generate_signed_url(expiration=SIGNED_URL_LIFETIME)
+    remember_signed_url(blob.name, file_url)
+    record_upload(user_id, blob, new_filename, content_hash=content_hash)
+    return {"file_name": new_filename, "blob_path": blob.name, "file_url": file_url, "deduplicated": False}
+
+
+def list_files(user_id, page_size=100, page_token=None):
+    """
+    One page of a user's files as {file_name: signed_url}, ordered by name.
+    page_token is the last file name of the previous page; next_page_token is None on the last page.
+    Note the manifest lives in a single Firestore document (1 MiB, roughly several thousand files).
+    """
+    names = sorted(get_manifest(user_id))
+    start = bisect.bisect_right(names, page_token) if page_token else 0
+    page = names[start:start + page_size]
+    files = {name: signed_url(user_prefix(user_id) + name) for name in page}
+    next_page_token = page[-1] if start + page_size < len(names) else None
+    return {"files": files, "next_page_token": next_page_token}
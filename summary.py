@@ -1,30 +1,79 @@
 import re
-import io
 import json
 import time
 import logging
 import asyncio
-import aiohttp
-from concurrent.futures import ThreadPoolExecutor
-import requests
-import pdfkit
-import tiktoken
-from bs4 import BeautifulSoup
-from PIL import Image
-from pdf2image import convert_from_bytes
-import pytesseract
-import fitz
-import openai
+import httpx
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
-logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 
-# Import the initialized Firestore client and storage bucket from firebase_init.py
-from firebase_init import db, bucket
-# Add this import to use Firestore constants like SERVER_TIMESTAMP.
-from firebase_admin import firestore
+# Firestore client, initialized on first use or by the app's startup hook.
+from firebase_init import get_db
+from cache import ExtractionCache, LRUCache, TTLCache, hash_content, hash_file
+from firestore_writer import FirestoreWriter
+from fingerprint import NEAR_DUPLICATE_THRESHOLD, similarity
+from llm_clients import get_openai_client, get_together_client
+from provider_gateway import get_gateway
+import ocr
+import tokens
+import fetcher
+import metrics
+import extraction
+from workers import extraction_pool, PoolSaturated
+from map_reduce import map_sections, map_reduce_summary, build_reduce_prompt, estimate_cost
+
+# Content-addressed cache of extracted, preprocessed text shared by all requests.
+extraction_cache = ExtractionCache.from_env()
+
+# ETag/Last-Modified and content hash of each fetched URL, for conditional re-fetches.
+fetch_validators = fetcher.make_validator_cache()
+
+# Sampling parameters sent with every summary request; part of the summary key.
+GENERATION_PARAMS = {"temperature": 0.5, "max_tokens": 1500}
+
+# In-process memo of summaries by (user_id, summary key), checked before Firestore.
+summary_memo = LRUCache(max_entries=int(os.getenv("SUMMARY_MEMO_MAX_ENTRIES", "1024")))
+
+# Short-lived cache of /summaries listing pages; cleared whenever a summary or feedback is written.
+summaries_cache = TTLCache(ttl=float(os.getenv("SUMMARIES_CACHE_TTL_SECONDS", "30")))
+
+# Write-behind queue for summary and feedback writes; each flushed batch invalidates the listing cache.
+firestore_writer = FirestoreWriter.from_env(on_flush=summaries_cache.clear)
+
+# Most stored summaries compared per near-duplicate lookup, read NEAR_DUPLICATE_PAGE_SIZE at a time.
+# Only signatures are read for candidates; the summary itself is read for the best match alone.
+NEAR_DUPLICATE_CANDIDATES = int(os.getenv("NEAR_DUPLICATE_CANDIDATES", "500"))
+NEAR_DUPLICATE_PAGE_SIZE = 100
+
+def _summary_params(model, params, mode):
+    params = dict(params or GENERATION_PARAMS)
+    params.update(tokens.budget_signature(model))
+    if mode != "truncate":
+        params["mode"] = mode
+    return params
+
+def make_summary_key(content_hash, custom_prompt, model, params=None, mode="truncate"):
+    """
+    Deterministic summary ID: a hash of the document content, prompt, model and
+    generation parameters. Identical requests map to the same Firestore document.
+    """
+    payload = json.dumps([content_hash, custom_prompt, model, _summary_params(model, params, mode)], sort_keys=True)
+    return hash_content(payload)
+
+def make_prompt_key(custom_prompt, model, params=None, mode="truncate"):
+    """Hash of everything in the summary key except the document; near-duplicates are only reused within it."""
+    payload = json.dumps([custom_prompt, model, _summary_params(model, params, mode)], sort_keys=True)
+    return hash_content(payload)
+
+# Models summarized on every request, mapped to the keys used in API responses.
+MODEL_RESPONSE_KEYS = {"gpt4": "gpt4", "openai": "gpt4mini", "togetherai": "togetherai"}
+DEFAULT_MODEL_TIMEOUT = float(os.getenv("MODEL_TIMEOUT_SECONDS", "120"))
+
+def get_model_timeout(model):
+    """Per-model timeout in seconds, e.g. TOGETHERAI_TIMEOUT_SECONDS=60, else MODEL_TIMEOUT_SECONDS."""
+    return float(os.getenv(f"{model.upper()}_TIMEOUT_SECONDS", DEFAULT_MODEL_TIMEOUT))
 
 class TextProcessor:
     def __init__(self, model):
@@ -38,180 +87,171 @@ class TextProcessor:
                 self.model = "gpt-3.5-turbo"
             else:
                 self.model = "gpt-4o-mini"
-            self.openai_client = openai.OpenAI(api_key=self.openai_api_key)
+            # The AsyncOpenAI client is shared across requests (see llm_clients).
+            self.openai_client = get_openai_client()
+            self.provider = "openai"
         elif model.lower() == "togetherai":
             self.together_api_key = os.getenv("TOGETHERAI_API_KEY")
             if not self.together_api_key or self.together_api_key.strip() == "":
                 raise ValueError("TOGETHERAI_API_KEY is missing or empty in .env file.")
             self.model = "meta-llama/Llama-3.3-70B-Instruct-Turbo-Free"
+            self.provider = "togetherai"
         else:
             raise ValueError(f"Unsupported model selection: {model}. Use 'openai', 'gpt4' or 'togetherai'.")
 
-        logging.info(f"OpenAI API Key: {'Set' if hasattr(self, 'openai_api_key') and self.openai_api_key else 'Not Set'}")
-        logging.info(f"TogetherAI API Key: {'Set' if hasattr(self, 'together_api_key') and self.together_api_key else 'Not Set'}")
 
-    def get_base_name_from_link(self, link):
+    @staticmethod
+    def get_base_name_from_link(link):
         base_name = re.sub(r"[^\w\-_\. ]", "_", link)
-        logging.info(f"Using full URL as base_name: {base_name}")
         return base_name or "default_name"
 
     def is_google_cache_link(self, link):
         return "webcache.googleusercontent.com" in link
 
     def is_blank_text(self, text):
-        clean_text = re.sub(r"\s+", "", text).strip()
-        return len(clean_text) < 100
-
-    def process_image_with_tesseract(self, image):
-        try:
-            return pytesseract.image_to_string(image)
-        except Exception as e:
-            logging.error(f"Error processing image with Tesseract: {str(e)}")
-            return ""
-
-    def extract_text_from_pdf_native(self, pdf_bytes):
-        try:
-            doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-            text = ""
-            for page in doc:
-                text += page.get_text() + "\n"
-            return text.strip()
-        except Exception as e:
-            logging.error(f"Error in native PDF extraction: {str(e)}")
-            return ""
-
-    def extract_text_from_pdf(self, pdf_content, link):
-        base_name = self.get_base_name_from_link(link)
-        pdf_bytes = pdf_content.read()
-        native_text = self.extract_text_from_pdf_native(pdf_bytes)
-        if native_text and not self.is_blank_text(native_text):
-            logging.info("Native PDF text extraction succeeded.")
-            return native_text
-        images = convert_from_bytes(pdf_bytes)
-        logging.info(f"OCR fallback: converting {len(images)} pages to images.")
-        combined_text = ""
-        def process_page(i, img):
-            return self.process_image_with_tesseract(img)
-        with ThreadPoolExecutor() as executor:
-            results = executor.map(lambda x: process_page(x[0], x[1]), enumerate(images))
-            for text in results:
-                combined_text += text + "\n"
-        if self.is_blank_text(combined_text):
-            return ""
-        return combined_text
+        return extraction.is_blank_text(text)
 
     def extract_text_from_html(self, html_content):
-        soup = BeautifulSoup(html_content, 'html.parser')
-        for tag in soup(['script', 'style']):
-            tag.decompose()
-        return soup.get_text(separator=' ').strip()
+        return extraction.extract_text_from_html(html_content)
 
     async def async_extract_text_from_url(self, url: str) -> dict:
+        """
+        Download (streamed to a temp file, see fetcher.fetch) and extract a URL. A URL fetched before
+        is revalidated with its ETag/Last-Modified, so an unchanged document skips both the download
+        and extraction.
+        """
         try:
             if self.is_google_cache_link(url):
                 return {"text": "", "content_type": None, "error": "google_cache"}
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status != 200:
-                        return {"text": "", "content_type": None, "error": f"HTTP error {response.status}"}
-                    content_type = response.headers.get('Content-Type', '').lower()
-                    logging.debug(f"URL: {url} returned Content-Type: {content_type}")
-                    content = await response.read()
-                    if ('application/pdf' in content_type or 'octet-stream' in content_type or url.lower().endswith('.pdf')):
-                        text = self.extract_text_from_pdf(io.BytesIO(content), url)
-                        if self.is_blank_text(text):
-                            return {"text": "", "content_type": "pdf", "error": "blank_pdf"}
-                        return {"text": text, "content_type": "pdf", "error": None}
-                    elif ('html' in content_type or url.lower().endswith(('.htm', '.html'))):
-                        text = self.extract_text_from_html(content)
-                        if self.is_blank_text(text):
-                            return {"text": "", "content_type": "html", "error": "blank_html"}
-                        return {"text": text, "content_type": "html", "error": None}
-                    elif 'text/plain' in content_type:
-                        text = content.decode('utf-8', errors='ignore').strip()
-                        if self.is_blank_text(text):
-                            return {"text": "", "content_type": "text", "error": "blank_text"}
-                        return {"text": text, "content_type": "text", "error": None}
-                    else:
-                        return {"text": "", "content_type": None, "error": "unsupported_type"}
+            known = fetch_validators.get(url)
+            cached = extraction_cache.get(known["content_hash"]) if known else None
+            # A 304 is only useful while the extracted text is still cached.
+            fetched = await fetcher.fetch(url, validators=known if cached is not None else None)
+            if cached is not None:
+                metrics.cache_result("http_not_modified", fetched["status"] == 304)
+            if fetched["status"] == 304:
+                logging.info(f"{url} not modified; reusing its extracted text")
+                return {**cached, "content_hash": known["content_hash"]}
+            if fetched["status"] != 200:
+                return {"text": "", "content_type": None, "error": f"HTTP error {fetched['status']}"}
+            try:
+                if fetched["kind"] is None:
+                    return {"text": "", "content_type": None, "error": "unsupported_type"}
+                result = await self.extract_document(fetched["path"], fetched["kind"], url, fetched["content_hash"])
+            finally:
+                await asyncio.to_thread(os.unlink, fetched["path"])
+            if fetched["cacheable"] and not result.get("error"):
+                fetch_validators.put(url, {"etag": fetched["etag"], "last_modified": fetched["last_modified"],
+                                           "content_hash": fetched["content_hash"]})
+            return result
+        except PoolSaturated:
+            raise
         except Exception as e:
             logging.error(f"Error fetching URL {url}: {str(e)}")
             return {"text": "", "content_type": None, "error": str(e)}
 
-    def process_uploaded_pdf(self, pdf_file, base_name="uploaded_pdf"):
+    async def extract_document(self, content, kind, source="", content_hash=None):
+        """
+        Extract and preprocess a document of the given kind ("pdf", "html" or "text"), given as raw
+        bytes or as the path of a file holding them.
+        Results are cached by content hash, so a document seen before is never parsed or OCRed again.
+        Parsing, OCR and preprocessing run in the extraction process pool; raises PoolSaturated
+        when its queue is full. The returned text carries the document's content_hash.
+        """
+        from_file = isinstance(content, str)
+        if content_hash is None:
+            content_hash = await asyncio.to_thread(hash_file if from_file else hash_content, content)
+        cached = extraction_cache.get(content_hash)
+        metrics.cache_result("extraction", cached is not None)
+        if cached is not None:
+            logging.info(f"Extraction cache hit for {source or content_hash}")
+            return {**cached, "content_hash": content_hash}
+        with extraction_pool.admit(), metrics.stage("extract"):
+            if kind == "pdf":
+                # Native text per page; only pages without it are rasterized and OCRed (see ocr.py).
+                text = await ocr.extract_pdf_text(content, extraction_pool)
+                result = await extraction_pool.run(extraction.finalize_text, text, kind)
+            else:
+                result = await extraction_pool.run(extraction.extract_file if from_file else extraction.extract_content, content, kind)
+        extraction_cache.put(content_hash, result)
+        return {**result, "content_hash": content_hash}
+
+    async def process_spooled_upload(self, path, kind, base_name, content_hash=None):
+        """Extract an upload that was spooled to disk (see storage_service.spool_upload) without loading it here."""
+        try:
+            return await self.extract_document(path, kind, base_name, content_hash)
+        except PoolSaturated:
+            raise
+        except Exception as e:
+            logging.error(f"Error processing uploaded {kind.upper()}: {str(e)}")
+            return {"text": "", "content_type": None, "error": str(e)}
+
+    async def process_uploaded_pdf(self, pdf_file, base_name="uploaded_pdf", content_hash=None):
         try:
             if hasattr(pdf_file, "name"):
                 base_name = re.sub(r"[^\w\-_\. ]", "_", pdf_file.name)
             pdf_bytes = pdf_file.read()
             if not pdf_bytes:
                 return {"text": "", "content_type": "pdf", "error": "Empty PDF file"}
-            native_text = self.extract_text_from_pdf_native(pdf_bytes)
-            if native_text and not self.is_blank_text(native_text):
-                logging.info("Native PDF text extraction succeeded.")
-                return {"text": native_text, "content_type": "pdf", "error": None}
-            logging.info("Native PDF extraction failed. Falling back to OCR.")
-            images = convert_from_bytes(pdf_bytes)
-            logging.info(f"OCR fallback: converting {len(images)} page(s) to images.")
-            combined_text = ""
-            def process_page(i, img):
-                return self.process_image_with_tesseract(img)
-            with ThreadPoolExecutor() as executor:
-                results = executor.map(lambda x: process_page(x[0], x[1]), enumerate(images))
-                for text in results:
-                    combined_text += text + "\n"
-            if self.is_blank_text(combined_text):
-                return {"text": "", "content_type": "pdf", "error": "blank_pdf"}
-            return {"text": combined_text, "content_type": "pdf", "error": None}
+            return await self.extract_document(pdf_bytes, "pdf", base_name, content_hash)
+        except PoolSaturated:
+            raise
         except Exception as e:
             logging.error(f"Error processing uploaded PDF: {str(e)}")
             return {"text": "", "content_type": None, "error": str(e)}
 
-    def process_uploaded_html(self, html_file, base_name="uploaded_html"):
+    async def process_uploaded_html(self, html_file, base_name="uploaded_html", content_hash=None):
         try:
             if hasattr(html_file, "name"):
                 base_name = re.sub(r"[^\w\-_\. ]", "_", html_file.name)
             html_bytes = html_file.read()
             if not html_bytes:
                 return {"text": "", "content_type": "html", "error": "Empty HTML file"}
-            text = self.extract_text_from_html(html_bytes)
-            if self.is_blank_text(text):
-                return {"text": "", "content_type": "html", "error": "blank_html"}
-            return {"text": text, "content_type": "html", "error": None}
+            return await self.extract_document(html_bytes, "html", base_name, content_hash)
+        except PoolSaturated:
+            raise
         except Exception as e:
             logging.error(f"Error processing uploaded HTML: {str(e)}")
             return {"text": "", "content_type": None, "error": str(e)}
 
     def preprocess_text(self, text):
-        text = re.sub(r"[\r\n]{2,}", "\n", text)
-        text = re.sub(r"[^\x00-\x7F]+", " ", text)
-        text = re.sub(r"\s{2,}", " ", text)
-        return text.strip()
-
-    def truncate_text(self, text, max_tokens=3000):
-        encoding = tiktoken.get_encoding("gpt2")
-        tokens = encoding.encode(text)
-        if len(tokens) > max_tokens:
-            tokens = tokens[:max_tokens]
-        return encoding.decode(tokens)
-
-    def generate_summary_openai(self, text, custom_prompt):
+        return extraction.preprocess_text(text)
+
+    async def build_prompt(self, text, custom_prompt):
+        """
+        The user message sent to the model: the prompt followed by as much of the text as fits
+        the model's context window next to the prompt and GENERATION_PARAMS["max_tokens"].
+        """
+        header = custom_prompt + "\n\nText to summarize:\n"
+        # Tokenizing can take tens of milliseconds for long documents, so it runs off the event loop.
+        with metrics.stage("tokenize"):
+            text = await asyncio.to_thread(tokens.fit_to_context, self.model, header, text, GENERATION_PARAMS["max_tokens"])
+        return header + text
+
+    def estimate_request_tokens(self, prompt):
+        """Rough prompt + completion size charged to the provider's tokens-per-minute limit."""
+        return len(prompt) // 4 + GENERATION_PARAMS["max_tokens"]
+
+    async def generate_summary_openai(self, text, custom_prompt):
+        import openai
         if not hasattr(self, 'openai_api_key') or not self.openai_api_key:
             raise ValueError("OpenAI API key is not set. Cannot generate summary with OpenAI model.")
         if not custom_prompt or custom_prompt.strip() == "":
             raise ValueError("Please enter a prompt or generate it through the sample prompt in the web app.")
-        text = self.truncate_text(text, max_tokens=4000)
-        prompt = custom_prompt + "\n\nText to summarize:\n" + text
-        logging.info(f"Sending prompt to OpenAI: {prompt[:100]}...")
+        prompt = await self.build_prompt(text, custom_prompt)
         try:
-            response = self.openai_client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.5,
-                max_tokens=1500,
+            # Rate limits, retries, timeouts and circuit breaking are handled by the provider gateway.
+            response = await get_gateway(self.provider).call(
+                lambda: self.openai_client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    **GENERATION_PARAMS,
+                ),
+                self.estimate_request_tokens(prompt),
             )
             summary = response.choices[0].message.content.strip()
-            logging.info(f"Received summary: {summary[:100]}...")
-            return {"summary": summary}
+            usage = {"prompt_tokens": response.usage.prompt_tokens, "completion_tokens": response.usage.completion_tokens} if response.usage else {"prompt_tokens": 0, "completion_tokens": 0}
+            return {"summary": summary, "usage": usage}
         except openai.AuthenticationError:
             raise ValueError("Invalid OpenAI API key provided.")
         except openai.OpenAIError as e:
@@ -221,13 +261,12 @@ class TextProcessor:
             logging.error(f"Unexpected error with OpenAI: {str(e)}")
             raise ValueError(f"Unexpected error generating summary with OpenAI: {str(e)}")
 
-    def generate_summary_togetherai(self, text, custom_prompt):
+    async def generate_summary_togetherai(self, text, custom_prompt):
         if not hasattr(self, 'together_api_key') or not self.together_api_key:
             raise ValueError("TogetherAI API key is not set. Cannot generate summary with TogetherAI model.")
         if not custom_prompt or custom_prompt.strip() == "":
             raise ValueError("Please enter a prompt or generate it through the sample prompt in the web app.")
-        text = self.truncate_text(text, max_tokens=4000)
-        prompt = custom_prompt + "\n\nText to summarize:\n" + text
+        prompt = await self.build_prompt(text, custom_prompt)
         try:
             headers = {
                 "Authorization": f"Bearer {self.together_api_key}",
@@ -236,76 +275,375 @@ class TextProcessor:
             payload = {
                 "model": self.model,
                 "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.5,
-                "max_tokens": 1500,
+                **GENERATION_PARAMS,
             }
-            response = requests.post("https://api.together.ai/v1/chat/completions", headers=headers, json=payload)
-            if response.status_code == 401:
-                raise ValueError("Invalid TogetherAI API key provided.")
-            response.raise_for_status()
-            summary = response.json()["choices"][0]["message"]["content"].strip()
-            logging.info(f"Received TogetherAI summary: {summary[:100]}...")
-            return {"summary": summary}
-        except requests.exceptions.HTTPError as e:
+
+            async def request():
+                response = await get_together_client().post("/chat/completions", headers=headers, json=payload)
+                if response.status_code == 401:
+                    raise ValueError("Invalid TogetherAI API key provided.")
+                response.raise_for_status()
+                return response
+
+            response = await get_gateway(self.provider).call(request, self.estimate_request_tokens(prompt))
+            data = response.json()
+            summary = data["choices"][0]["message"]["content"].strip()
+            usage = data.get("usage") or {}
+            return {"summary": summary, "usage": {"prompt_tokens": usage.get("prompt_tokens", 0), "completion_tokens": usage.get("completion_tokens", 0)}}
+        except httpx.HTTPStatusError as e:
             logging.error(f"TogetherAI HTTP error: {str(e)}")
             raise ValueError(f"TogetherAI API error: {str(e)}")
         except Exception as e:
             logging.error(f"Unexpected error with TogetherAI: {str(e)}")
             raise ValueError(f"Unexpected error generating summary with TogetherAI: {str(e)}")
 
-    def generate_summary(self, text, base_name, custom_prompt, user_id, display_name, file_url=None):
+    async def complete(self, text, custom_prompt):
+        """One chat completion with this processor's model; returns {"summary": ..., "usage": ...}."""
+        with metrics.stage("llm"):
+            if "gpt" in self.model.lower():
+                result = await self.generate_summary_openai(text, custom_prompt)
+            else:
+                result = await self.generate_summary_togetherai(text, custom_prompt)
+        metrics.record_usage(self.model, result["usage"])
+        return result
+
+    async def stream_summary_openai(self, text, custom_prompt):
+        """Yield summary text deltas from OpenAI as they arrive."""
+        import openai
+        if not hasattr(self, 'openai_api_key') or not self.openai_api_key:
+            raise ValueError("OpenAI API key is not set. Cannot generate summary with OpenAI model.")
         if not custom_prompt or custom_prompt.strip() == "":
             raise ValueError("Please enter a prompt or generate it through the sample prompt in the web app.")
-        
-        summary_ref = db.collection("users").document(user_id).collection("summaries")
-        # Check for an existing summary with the same file, prompt, and model.
-        docs = summary_ref.where("base_name", "==", base_name).where("model", "==", self.model).stream()
-        for doc in docs:
-            existing_data = doc.to_dict()
-            if existing_data.get("custom_prompt") == custom_prompt:
-                summary_id = doc.id
-                logging.info(f"Fetching existing summary for {summary_id} with same file, prompt, and model")
-                return {"summary": existing_data["summary"], "input_data": existing_data.get("input_data", ""), "file_url": existing_data.get("file_url", ""), "summary_id": summary_id}
-        
-        summary_id = f"{base_name}_{int(time.time())}"
-        logging.debug(f"Generating new summary for {base_name} with prompt: {custom_prompt[:50]}... and model: {self.model}")
+        prompt = await self.build_prompt(text, custom_prompt)
         try:
-            if "gpt" in self.model.lower():
-                summary = self.generate_summary_openai(text, custom_prompt)
-            else:
-                summary = self.generate_summary_togetherai(text, custom_prompt)
-        except ValueError as e:
-            raise e
-        except Exception as e:
-            raise ValueError(f"Unexpected error during summary generation: {str(e)}")
-        if "Error" not in summary["summary"]:
-            effective_date_pattern = r"(effective\s+(?:date\s*(?:is|of|:)?|on)|takes\s+effect\s+(?:on)?)\s*[:\s]*(?:(January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2}(?:st|nd|rd|th)?[,\s]+\d{4}|\d{1,2}(?:st|nd|rd|th)?\s+(January|February|March|April|May|June|July|August|September|October|November|December)[,\s]+\d{4}|\d{4}-\d{2}-\d{2}|\d{2}/\d{2}/\d{4})"
-            match = re.search(effective_date_pattern, text, re.IGNORECASE)
-            if match:
-                date_str = (match.group(0).split(":", 1)[-1].strip() if ":" in match.group(0)
-                            else match.group(0).split("on", 1)[-1].strip() if "on" in match.group(0)
-                            else match.group(0).split("effect", 1)[-1].strip())
-                summary["summary"] += f"\nThis measure has an effective date of: {date_str}"
+            # Only opening the stream is retried; once tokens have been sent a failure is final.
+            stream = await get_gateway(self.provider).call(
+                lambda: self.openai_client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **GENERATION_PARAMS,
+                ),
+                self.estimate_request_tokens(prompt),
+            )
+            async for chunk in stream:
+                if chunk.usage:
+                    metrics.record_usage(self.model, {"prompt_tokens": chunk.usage.prompt_tokens,
+                                                      "completion_tokens": chunk.usage.completion_tokens})
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except openai.AuthenticationError:
+            raise ValueError("Invalid OpenAI API key provided.")
+        except openai.OpenAIError as e:
+            logging.error(f"OpenAI API error: {str(e)}")
+            raise ValueError(f"OpenAI API error: {str(e)}")
+
+    async def stream_summary_togetherai(self, text, custom_prompt):
+        """Yield summary text deltas from TogetherAI's server-sent event stream."""
+        if not hasattr(self, 'together_api_key') or not self.together_api_key:
+            raise ValueError("TogetherAI API key is not set. Cannot generate summary with TogetherAI model.")
+        if not custom_prompt or custom_prompt.strip() == "":
+            raise ValueError("Please enter a prompt or generate it through the sample prompt in the web app.")
+        prompt = await self.build_prompt(text, custom_prompt)
+        headers = {
+            "Authorization": f"Bearer {self.together_api_key}",
+            "Content-Type": "application/json"
+        }
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": True,
+            **GENERATION_PARAMS,
+        }
+        client = get_together_client()
+
+        async def open_stream():
+            response = await client.send(client.build_request("POST", "/chat/completions", headers=headers, json=payload), stream=True)
+            if response.status_code >= 400:
+                await response.aread()
+                await response.aclose()
+                if response.status_code == 401:
+                    raise ValueError("Invalid TogetherAI API key provided.")
+                response.raise_for_status()
+            return response
+
+        try:
+            # Only opening the stream is retried; once tokens have been sent a failure is final.
+            response = await get_gateway(self.provider).call(open_stream, self.estimate_request_tokens(prompt))
+            try:
+                async for line in response.aiter_lines():
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    event = json.loads(data)
+                    if event.get("usage"):
+                        metrics.record_usage(self.model, event["usage"])
+                    choices = event.get("choices") or []
+                    delta = choices[0].get("delta", {}).get("content") if choices else None
+                    if delta:
+                        yield delta
+            finally:
+                await response.aclose()
+        except httpx.HTTPStatusError as e:
+            logging.error(f"TogetherAI HTTP error: {str(e)}")
+            raise ValueError(f"TogetherAI API error: {str(e)}")
+
+    def find_existing_summary(self, summary_id, user_id):
+        """Return a previously generated summary from the memo or Firestore, or None."""
+        memo_key = (user_id, summary_id)
+        memoized = summary_memo.get(memo_key)
+        metrics.cache_result("summary_memo", memoized is not None)
+        if memoized is not None:
+            logging.info(f"Returning memoized summary {summary_id}")
+            return dict(memoized)
+        summary_ref = get_db().collection("users").document(user_id).collection("summaries")
+        with metrics.stage("firestore_read"):
+            existing = summary_ref.document(summary_id).get()
+        metrics.cache_result("summary_firestore", existing.exists)
+        if existing.exists:
+            existing_data = existing.to_dict()
+            logging.info(f"Fetching existing summary for {summary_id} with same content, prompt, and model")
+            result = {"summary": existing_data["summary"], "input_data": existing_data.get("input_data", ""), "file_url": existing_data.get("file_url", ""), "summary_id": summary_id}
+            summary_memo.put(memo_key, result)
+            return dict(result)
+        return None
+
+    def find_near_duplicate_summary(self, user_id, prompt_key, fingerprint):
+        """
+        A stored summary for the same prompt, model and settings whose document is a near-duplicate
+        of this one (estimated similarity >= NEAR_DUPLICATE_THRESHOLD), as (summary_id, data, similarity),
+        or None. Candidates come from the LSH band index, so the lookup does not scan every summary.
+        The query cannot be ordered by how many bands a candidate shares, so every candidate (up to
+        NEAR_DUPLICATE_CANDIDATES) is compared; one band shared by many summaries cannot crowd the
+        best match out. Needs a Firestore composite index on (prompt_key, lsh_bands).
+        """
+        if not fingerprint or not NEAR_DUPLICATE_THRESHOLD:
+            return None
+        query = (get_db().collection("users").document(user_id).collection("summaries")
+                 .where("prompt_key", "==", prompt_key)
+                 .where("lsh_bands", "array_contains_any", fingerprint["bands"])
+                 .select(["minhash"]))
+        best, compared, last = None, 0, None
+        with metrics.stage("firestore_read"):
+            while compared < NEAR_DUPLICATE_CANDIDATES:
+                page_size = min(NEAR_DUPLICATE_PAGE_SIZE, NEAR_DUPLICATE_CANDIDATES - compared)
+                page = query.limit(page_size) if last is None else query.start_after(last).limit(page_size)
+                docs = list(page.stream())
+                for doc in docs:
+                    score = similarity(fingerprint["minhash"], doc.to_dict().get("minhash"))
+                    if score >= NEAR_DUPLICATE_THRESHOLD and (best is None or score > best[1]):
+                        best = (doc.reference, score)
+                compared += len(docs)
+                if len(docs) < page_size:
+                    break
+                last = docs[-1]
+            if best is not None:
+                snapshot = best[0].get()
+                best = (snapshot.id, snapshot.to_dict(), best[1]) if snapshot.exists else None
+        metrics.cache_result("summary_near_duplicate", best is not None)
+        return best
+
+    async def find_reusable_summary(self, summary_id, user_id, base_name, custom_prompt, content_hash, file_url, mode, fingerprint,
+                                    text="", effective_date=None):
+        """
+        An existing summary for this request: the exact one (same content), else one of a near-duplicate
+        document, which is then saved under this request's summary_id. None if a new summary is needed.
+        A reused summary gets this document's effective-date sentence in place of the source document's.
+        """
+        # Firestore calls are blocking, so they run in a worker thread.
+        existing = await asyncio.to_thread(self.find_existing_summary, summary_id, user_id)
+        if existing is not None:
+            return existing
+        near = await asyncio.to_thread(self.find_near_duplicate_summary, user_id, make_prompt_key(custom_prompt, self.model, mode=mode),
+                                       fingerprint)
+        if near is None:
+            return None
+        source_id, data, score = near
+        if "effective_date" not in data:
+            # Stored before effective dates were recorded, so its date sentence cannot be told apart from the summary.
+            return None
+        summary_text = data["summary"]
+        source_suffix = self.effective_date_suffix(summary_text, "", data["effective_date"])
+        if source_suffix and summary_text.endswith(source_suffix):
+            summary_text = summary_text[:-len(source_suffix)]
+        summary_text += self.effective_date_suffix(summary_text, text, effective_date)
+        logging.info(f"Reusing summary {source_id} for near-duplicate document {base_name} (similarity {score:.3f})")
+        return await asyncio.to_thread(self.save_summary, summary_text, summary_id, base_name, custom_prompt, user_id, content_hash,
+                                       file_url=file_url, mode=mode, stats={"near_duplicate_of": source_id, "similarity": score},
+                                       fingerprint=fingerprint, effective_date=effective_date)
+
+    def effective_date_suffix(self, summary_text, text, effective_date=None):
+        """
+        The effective-date sentence appended to a summary, or "" if none applies.
+        effective_date comes from the extraction result; it is only searched for in text when not given.
+        """
+        if "Error" in summary_text:
+            return ""
+        if effective_date is None:
+            effective_date = extraction.extract_effective_date(text)
+        if not effective_date:
+            return ""
+        return f"\nThis measure has an effective date of: {effective_date}"
+
+    def save_summary(self, summary_text, summary_id, base_name, custom_prompt, user_id, content_hash, file_url=None, mode="truncate", stats=None,
+                     fingerprint=None, effective_date=None):
+        """
+        Persist a finished summary to the memo and queue its Firestore write, returning the API result dict.
+        The memo serves repeat requests until the write-behind queue has flushed it to Firestore.
+        The document's fingerprint and effective date are stored with the summary for near-duplicate lookups.
+        """
         input_data = base_name if base_name.startswith(("http://", "https://")) else base_name
         try:
             summary_data = {
-                "summary": summary["summary"],
+                "summary": summary_text,
                 "custom_prompt": custom_prompt,
                 "model": self.model,
-                "timestamp": firestore.SERVER_TIMESTAMP,
                 "base_name": base_name,
-                "input_data": input_data
+                "input_data": input_data,
+                "content_hash": content_hash
             }
             if file_url:
                 summary_data["file_url"] = file_url
-            summary_ref.document(summary_id).set(summary_data)
-            logging.info(f"Saved new summary to Firestore with summary_id: {summary_id}, base_name: {base_name}, model: {self.model}")
+            if mode != "truncate":
+                summary_data["mode"] = mode
+            if fingerprint:
+                summary_data.update({"prompt_key": make_prompt_key(custom_prompt, self.model, mode=mode),
+                                     "minhash": fingerprint["minhash"], "lsh_bands": fingerprint["bands"],
+                                     "effective_date": effective_date or ""})
+            firestore_writer.set(f"users/{user_id}/summaries/{summary_id}", summary_data, timestamp_fields=["timestamp"])
+            summaries_cache.clear()
+            logging.info(f"Queued new summary for Firestore with summary_id: {summary_id}, base_name: {base_name}, model: {self.model}")
+        except Exception as e:
+            logging.error(f"Failed to queue summary for Firestore: {str(e)}")
+            raise
+        result = {"summary": summary_text, "input_data": input_data, "file_url": file_url, "summary_id": summary_id}
+        summary_memo.put((user_id, summary_id), result)
+        # Generation stats describe this call only, so they are not memoized.
+        return {**result, "stats": stats} if stats else dict(result)
+
+    async def generate_summary(self, text, base_name, custom_prompt, user_id, display_name, file_url=None, content_hash=None, mode="truncate",
+                               effective_date=None, fingerprint=None):
+        """
+        Summarize text with this processor's model, reusing an existing summary when possible: the same
+        document's, or a near-duplicate document's when the extraction fingerprint is given.
+        mode="truncate" summarizes as much as fits the model's context; mode="map_reduce" summarizes the whole
+        document in chunks (see map_reduce.py). Fresh summaries carry token, cost and latency "stats".
+        """
+        if not custom_prompt or custom_prompt.strip() == "":
+            raise ValueError("Please enter a prompt or generate it through the sample prompt in the web app.")
+
+        # The summary ID is derived from content, prompt, model and params, so dedup is a point read.
+        content_hash = content_hash or hash_content(text)
+        summary_id = make_summary_key(content_hash, custom_prompt, self.model, mode=mode)
+        if effective_date is None:
+            effective_date = extraction.extract_effective_date(text)
+        existing = await self.find_reusable_summary(summary_id, user_id, base_name, custom_prompt, content_hash, file_url, mode, fingerprint,
+                                                    text=text, effective_date=effective_date)
+        if existing is not None:
+            return existing
+
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug(f"Generating new summary for {base_name} with model: {self.model}")
+        start = time.perf_counter()
+        try:
+            if mode == "map_reduce":
+                summary = await map_reduce_summary(self, text, custom_prompt)
+                stats = summary["stats"]
+            else:
+                summary = await self.complete(text, custom_prompt)
+                stats = {"mode": "truncate", **summary["usage"],
+                         "cost_usd": estimate_cost(self.model, summary["usage"]["prompt_tokens"], summary["usage"]["completion_tokens"])}
+        except ValueError as e:
+            raise e
         except Exception as e:
-            logging.error(f"Failed to save summary to Firestore: {str(e)}")
+            raise ValueError(f"Unexpected error during summary generation: {str(e)}")
+        stats["llm_seconds"] = round(time.perf_counter() - start, 3)
+        summary_text = summary["summary"] + self.effective_date_suffix(summary["summary"], text, effective_date)
+        return await asyncio.to_thread(self.save_summary, summary_text, summary_id, base_name, custom_prompt, user_id, content_hash,
+                                       file_url=file_url, mode=mode, stats=stats, fingerprint=fingerprint,
+                                       effective_date=effective_date)
+
+    async def stream_summary(self, text, base_name, custom_prompt, user_id, display_name, file_url=None, content_hash=None, mode="truncate",
+                             effective_date=None, fingerprint=None):
+        """
+        Streaming counterpart of generate_summary. Yields {"event": "token", "text": ...} as the
+        model produces output, then {"event": "done", ...} with the persisted summary and summary_id.
+        Existing summaries are returned as a single "done" event. In map_reduce mode the map step
+        runs first and only the reduce pass is streamed.
+        """
+        if not custom_prompt or custom_prompt.strip() == "":
+            raise ValueError("Please enter a prompt or generate it through the sample prompt in the web app.")
+        content_hash = content_hash or hash_content(text)
+        summary_id = make_summary_key(content_hash, custom_prompt, self.model, mode=mode)
+        if effective_date is None:
+            effective_date = extraction.extract_effective_date(text)
+        existing = await self.find_reusable_summary(summary_id, user_id, base_name, custom_prompt, content_hash, file_url, mode, fingerprint,
+                                                    text=text, effective_date=effective_date)
+        if existing is not None:
+            yield {"event": "done", **existing}
+            return
+
+        stats = None
+        source_text, prompt = text, custom_prompt
+        if mode == "map_reduce":
+            source_text, stats = await map_sections(self, text, custom_prompt)
+            prompt = build_reduce_prompt(custom_prompt)
+        if "gpt" in self.model.lower():
+            deltas = self.stream_summary_openai(source_text, prompt)
+        else:
+            deltas = self.stream_summary_togetherai(source_text, prompt)
+        parts = []
+        try:
+            with metrics.stage("llm_stream"):
+                async for delta in deltas:
+                    parts.append(delta)
+                    yield {"event": "token", "text": delta}
+        except ValueError:
             raise
-        return {"summary": summary["summary"], "input_data": input_data, "file_url": file_url, "summary_id": summary_id}
+        except Exception as e:
+            raise ValueError(f"Unexpected error during summary generation: {str(e)}")
+        summary_text = "".join(parts).strip()
+        suffix = self.effective_date_suffix(summary_text, text, effective_date)
+        if suffix:
+            yield {"event": "token", "text": suffix}
+        result = await asyncio.to_thread(self.save_summary, summary_text + suffix, summary_id, base_name, custom_prompt, user_id, content_hash,
+                                         file_url=file_url, mode=mode, stats=stats, fingerprint=fingerprint,
+                                         effective_date=effective_date)
+        yield {"event": "done", **result}
+
+# URL extractions currently in progress, keyed by URL, so concurrent requests share one download.
+_inflight_extractions = {}
 
-async def process_input(input_data, model, custom_prompt, user_id, display_name, file_url=None, override_base_name=None):
+async def _extract_url_text(url):
+    processor = TextProcessor("openai")
+    return await processor.async_extract_text_from_url(url)
+
+async def extract_url_text(url):
+    """
+    Download, extract and preprocess a URL once, returning the cleaned text as
+    {"text": ..., "content_type": ..., "error": ..., "content_hash": ...}.
+    Concurrent callers for the same URL are coalesced onto a single in-flight extraction.
+    """
+    task = _inflight_extractions.get(url)
+    if task is None:
+        task = asyncio.ensure_future(_extract_url_text(url))
+        _inflight_extractions[url] = task
+        task.add_done_callback(lambda _: _inflight_extractions.pop(url, None))
+    else:
+        logging.info(f"Joining in-flight extraction for {url}")
+    # Shield so one caller timing out does not cancel the extraction for the others.
+    return await asyncio.shield(task)
+
+async def process_input(input_data, model, custom_prompt, user_id, display_name, file_url=None, override_base_name=None, extracted=None, mode="truncate"):
+    """
+    Extract (if needed) and summarize input_data with a single model.
+    For URLs, pass `extracted` (the result of extract_url_text) to reuse one extraction
+    across several models instead of fetching the document again.
+    `mode` is "truncate" or "map_reduce" (see TextProcessor.generate_summary).
+    """
     try:
         processor = TextProcessor(model=model)
         base_name = None
@@ -315,27 +653,31 @@ async def process_input(input_data, model, custom_prompt, user_id, display_name,
             _, ext = os.path.splitext(base_name)
             ext = ext.lower()
             if ext == ".pdf":
-                result = processor.process_uploaded_pdf(input_data, base_name=base_name)
+                result = await processor.process_uploaded_pdf(input_data, base_name=base_name)
             elif ext in [".htm", ".html"]:
-                result = processor.process_uploaded_html(input_data, base_name=base_name)
+                result = await processor.process_uploaded_html(input_data, base_name=base_name)
             else:
                 return {"error": "Unsupported file type. Please upload a PDF or HTML file.", "model": model}
             if result["error"]:
                 return {"error": result["error"], "model": model}
-            clean_text = processor.preprocess_text(result["text"])
+            clean_text = result["text"]
             input_data_str = base_name
         elif isinstance(input_data, str) and input_data.startswith(("http://", "https://")):
-            result = await processor.async_extract_text_from_url(input_data)
+            result = extracted if extracted is not None else await extract_url_text(input_data)
             if result["error"]:
                 return {"error": result["error"], "model": model}
-            clean_text = processor.preprocess_text(result["text"])
+            clean_text = result["text"]
             base_name = override_base_name if override_base_name else processor.get_base_name_from_link(input_data)
             input_data_str = input_data
         else:
             return {"error": "Invalid input type. Expected URL, PDF, or HTML file.", "model": model}
-        logging.debug(f"Calling generate_summary with base_name={base_name}, custom_prompt={custom_prompt[:50]}...")
-        summary = processor.generate_summary(clean_text, base_name, custom_prompt, user_id, display_name, file_url=file_url)
-        return {"model": model, "summary": summary["summary"], "input_data": input_data_str, "file_url": file_url, "summary_id": summary["summary_id"]}
+        summary = await processor.generate_summary(clean_text, base_name, custom_prompt, user_id, display_name,
+                                                   file_url=file_url, content_hash=result.get("content_hash"), mode=mode,
+                                                   effective_date=result.get("effective_date"), fingerprint=result.get("fingerprint"))
+        response = {"model": model, "summary": summary["summary"], "input_data": input_data_str, "file_url": file_url, "summary_id": summary["summary_id"]}
+        if summary.get("stats"):
+            response["stats"] = summary["stats"]
+        return response
     except ValueError as ve:
         logging.error(f"ValueError processing input: {str(ve)}")
         return {"error": f"ValueError: {str(ve)}", "model": model}
@@ -343,5 +685,88 @@ async def process_input(input_data, model, custom_prompt, user_id, display_name,
         logging.error(f"Exception processing input: {str(e)}")
         return {"error": f"Exception: {str(e)}", "model": model}
 
+async def run_models_concurrently(make_call, models=None):
+    """
+    Run one summarization per model concurrently instead of one after another.
+    make_call(model) must return an awaitable resolving to that model's result dict.
+    Each model has its own timeout (see get_model_timeout); a model that times out or
+    raises gets an {"error": ..., "model": ...} entry while the others still return
+    their summaries. Per-model wall-clock timings are reported under "timings".
+    """
+    models = models or list(MODEL_RESPONSE_KEYS)
+
+    async def run_one(model):
+        timeout = get_model_timeout(model)
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(make_call(model), timeout=timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"Model {model} timed out after {timeout}s")
+            result = {"error": f"Timeout: no response from {model} within {timeout:g}s", "model": model}
+        except ValueError as ve:
+            logging.error(f"ValueError summarizing with {model}: {str(ve)}")
+            result = {"error": f"ValueError: {str(ve)}", "model": model}
+        except Exception as e:
+            logging.error(f"Exception summarizing with {model}: {str(e)}")
+            result = {"error": f"Exception: {str(e)}", "model": model}
+        return model, result, round(time.perf_counter() - start, 3)
+
+    outcomes = await asyncio.gather(*(run_one(model) for model in models))
+    response = {}
+    timings = {}
+    for model, result, elapsed in outcomes:
+        key = MODEL_RESPONSE_KEYS.get(model, model)
+        response[key] = result
+        timings[key] = elapsed
+    response["timings"] = timings
+    return response
+
+async def stream_models_concurrently(make_stream, models=None):
+    """
+    Merge several per-model event streams into one async stream.
+    make_stream(model) returns an async iterator of event dicts (see TextProcessor.stream_summary).
+    Yields (response_key, event) pairs as they arrive, an {"event": "error"} for a model that
+    raises or exceeds its timeout, and finally (None, {"event": "end", "timings": ...}).
+    """
+    models = models or list(MODEL_RESPONSE_KEYS)
+    queue = asyncio.Queue()
+    finished = object()
+    start = time.perf_counter()
+
+    async def pump(model):
+        try:
+            async with asyncio.timeout(get_model_timeout(model)):
+                async for event in make_stream(model):
+                    queue.put_nowait((model, event))
+        except TimeoutError:
+            logging.error(f"Model {model} timed out while streaming")
+            queue.put_nowait((model, {"event": "error", "error": f"Timeout: no response from {model} within {get_model_timeout(model):g}s"}))
+        except ValueError as ve:
+            logging.error(f"ValueError streaming {model}: {str(ve)}")
+            queue.put_nowait((model, {"event": "error", "error": f"ValueError: {str(ve)}"}))
+        except Exception as e:
+            logging.error(f"Exception streaming {model}: {str(e)}")
+            queue.put_nowait((model, {"event": "error", "error": f"Exception: {str(e)}"}))
+        finally:
+            queue.put_nowait((model, finished))
+
+    tasks = [asyncio.create_task(pump(model)) for model in models]
+    timings = {}
+    try:
+        remaining = len(tasks)
+        while remaining:
+            model, event = await queue.get()
+            key = MODEL_RESPONSE_KEYS.get(model, model)
+            if event is finished:
+                remaining -= 1
+                timings[key] = round(time.perf_counter() - start, 3)
+                continue
+            yield key, event
+    finally:
+        # Stop generating if the client disconnects mid-stream.
+        for task in tasks:
+            task.cancel()
+    yield None, {"event": "end", "timings": timings}
+
 if __name__ == "__main__":
     pass
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import fakes  # noqa: E402
+
+# Installed before any test module is imported, so app modules bind to the fake Firestore and bucket.
+FAKE_DB, FAKE_BUCKET = fakes.install()
+
+
+@pytest.fixture
+def firebase():
+    """The fake (db, bucket), emptied for each test."""
+    FAKE_DB.docs.clear()
+    FAKE_BUCKET.objects.clear()
+    return FAKE_DB, FAKE_BUCKET
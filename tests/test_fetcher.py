@@ -0,0 +1,171 @@
+import os
+import asyncio
+import hashlib
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web  # noqa: E402
+from aiohttp.test_utils import TestServer  # noqa: E402
+
+import fetcher  # noqa: E402
+from fetcher import DocumentTooLarge, sniff_kind  # noqa: E402
+
+PDF = b"%PDF-1.4\n1 0 obj\n<<>>\nendobj\n"
+HTML = ("<!DOCTYPE html><html><body><h1>House Bill 1</h1><p>"
+        + "The department shall adopt rules for the grant program. " * 10
+        + "This act takes effect on January 1, 2026.</p></body></html>").encode()
+
+
+@pytest.mark.parametrize("head, content_type, url, kind", [
+    (PDF, "text/html", "https://a.gov/page", "pdf"),
+    (b"\xef\xbb\xbf  <!doctype html><html>", "application/octet-stream", "https://a.gov/bill.pdf", "html"),
+    (b"<?xml version='1.0'?><html xmlns='x'>", "", "https://a.gov/x", "html"),
+    (b"\x00binary", "application/octet-stream", "https://a.gov/x", "pdf"),
+    (b"plain words", "text/plain; charset=utf-8", "https://a.gov/x", "text"),
+    (b"plain words", "", "https://a.gov/BILL.PDF?download=1", "pdf"),
+    (b"plain words", "", "https://a.gov/bill.htm", "html"),
+    (b"plain words", "text/html", "https://a.gov/x", "html"),
+    (b"GIF89a", "image/gif", "https://a.gov/x.gif", None),
+])
+def test_sniff_kind_prefers_magic_bytes(head, content_type, url, kind):
+    assert sniff_kind(head, content_type, url) == kind
+
+
+def make_app(hits):
+    async def document(request):
+        hits.append((request.path, request.headers.get("If-None-Match"), request.headers.get("If-Modified-Since")))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.Response(body=HTML, content_type="text/html",
+                            headers={"ETag": '"v1"', "Last-Modified": "Wed, 01 Jan 2025 00:00:00 GMT"})
+
+    async def mislabeled_pdf(request):
+        return web.Response(body=PDF, content_type="text/html")
+
+    async def no_store(request):
+        return web.Response(body=HTML, content_type="text/html", headers={"ETag": '"v1"', "Cache-Control": "no-store"})
+
+    async def chunked(request):
+        response = web.StreamResponse()
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        for _ in range(4):
+            await response.write(b"x" * 500)
+        await response.write_eof()
+        return response
+
+    async def sized(request):
+        return web.Response(body=b"x" * 2000, content_type="text/plain")
+
+    async def missing(request):
+        return web.Response(status=404)
+
+    app = web.Application()
+    app.router.add_get("/doc", document)
+    app.router.add_get("/report", mislabeled_pdf)
+    app.router.add_get("/no-store", no_store)
+    app.router.add_get("/chunked", chunked)
+    app.router.add_get("/sized", sized)
+    app.router.add_get("/missing", missing)
+    return app
+
+
+def serve(test, hits=None):
+    """Run test(base_url) against a local server, with a fresh shared fetcher session."""
+    async def run():
+        server = TestServer(make_app(hits if hits is not None else []))
+        await server.start_server()
+        try:
+            return await test(str(server.make_url("")).rstrip("/"))
+        finally:
+            await fetcher.shutdown()
+            await server.close()
+    return asyncio.run(run())
+
+
+def test_fetch_streams_to_a_file_and_hashes(tmp_path):
+    async def test(base):
+        return await fetcher.fetch(base + "/doc")
+
+    fetched = serve(test)
+    try:
+        with open(fetched["path"], "rb") as f:
+            assert f.read() == HTML
+    finally:
+        os.unlink(fetched["path"])
+    assert fetched["status"] == 200 and fetched["size"] == len(HTML)
+    assert fetched["content_hash"] == hashlib.sha256(HTML).hexdigest()
+    assert fetched["kind"] == "html" and fetched["etag"] == '"v1"' and fetched["cacheable"]
+
+
+def test_content_is_sniffed_over_the_content_type():
+    async def test(base):
+        return await fetcher.fetch(base + "/report")
+
+    fetched = serve(test)
+    os.unlink(fetched["path"])
+    assert fetched["kind"] == "pdf"
+    assert not fetched["cacheable"]
+
+
+def test_conditional_request_returns_304():
+    hits = []
+
+    async def test(base):
+        return await fetcher.fetch(base + "/doc", validators={"etag": '"v1"', "last_modified": "Wed, 01 Jan 2025 00:00:00 GMT"})
+
+    assert serve(test, hits) == {"status": 304}
+    assert hits == [("/doc", '"v1"', "Wed, 01 Jan 2025 00:00:00 GMT")]
+
+
+def test_no_store_and_errors():
+    async def test(base):
+        no_store = await fetcher.fetch(base + "/no-store")
+        os.unlink(no_store["path"])
+        return no_store, await fetcher.fetch(base + "/missing")
+
+    no_store, missing = serve(test)
+    assert not no_store["cacheable"]
+    assert missing == {"status": 404}
+
+
+@pytest.mark.parametrize("path", ["/sized", "/chunked"])
+def test_oversized_downloads_are_rejected(path):
+    async def test(base):
+        with pytest.raises(DocumentTooLarge):
+            await fetcher.fetch(base + path, max_bytes=1000)
+        return await fetcher.fetch(base + path, max_bytes=2000)
+
+    fetched = serve(test)
+    os.unlink(fetched["path"])
+    assert fetched["size"] == 2000
+
+
+def test_unchanged_url_reuses_the_cached_extraction(monkeypatch):
+    pytest.importorskip("google.api_core")
+    import summary
+    monkeypatch.setenv("TOGETHERAI_API_KEY", "test")
+    summary.fetch_validators.clear()
+    extracted = []
+
+    async def extract_document(self, content, kind, source="", content_hash=None):
+        extracted.append(source)
+        result = {"text": "The department shall adopt rules.", "content_type": kind, "error": None}
+        summary.extraction_cache.put(content_hash, result)
+        return {**result, "content_hash": content_hash}
+
+    monkeypatch.setattr(summary.TextProcessor, "extract_document", extract_document)
+    hits = []
+
+    async def test(base):
+        processor = summary.TextProcessor("togetherai")
+        first = await processor.async_extract_text_from_url(base + "/doc")
+        second = await processor.async_extract_text_from_url(base + "/doc")
+        return first, second
+
+    first, second = serve(test, hits)
+    assert first == second
+    assert first["content_hash"] == hashlib.sha256(HTML).hexdigest()
+    assert len(extracted) == 1
+    assert [if_none_match for _, if_none_match, _ in hits] == [None, '"v1"']
@@ -0,0 +1,49 @@
+import random
+
+import fingerprint
+from fingerprint import BANDS, band_keys, compute_fingerprint, shingles, similarity
+
+WORDS = [f"word{i}" for i in range(2000)]
+
+
+def document(seed, length=400):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def test_shingles_are_lowercased_overlapping_word_runs():
+    assert shingles("The Bill amends SECTION 5, and more") == {
+        "the bill amends section 5", "bill amends section 5 and", "amends section 5 and more"}
+    assert shingles("too short") == set()
+
+
+def test_short_documents_get_no_fingerprint(monkeypatch):
+    monkeypatch.setattr(fingerprint, "MIN_SHINGLES", 50)
+    text = document(1, length=50)
+    assert len(shingles(text)) < 50 and compute_fingerprint(text) is None
+    assert compute_fingerprint(document(1, length=60)) is not None
+
+
+def test_band_keys_split_the_signature_into_bands():
+    signature = compute_fingerprint(document(2))["minhash"]
+    keys = band_keys(signature)
+    assert len(keys) == BANDS and len(set(keys)) == BANDS
+    assert keys == band_keys(list(signature))
+    changed = list(signature)
+    changed[0] += 1
+    assert [a == b for a, b in zip(keys, band_keys(changed))] == [False] + [True] * (BANDS - 1)
+
+
+def test_near_identical_documents_are_similar_and_share_bands():
+    text = document(3)
+    edited = text.replace(text.split()[200], "amended", 1)
+    a, b = compute_fingerprint(text), compute_fingerprint(edited)
+    assert similarity(a["minhash"], b["minhash"]) >= 0.9
+    assert set(a["bands"]) & set(b["bands"])
+    assert similarity(a["minhash"], a["minhash"]) == 1.0
+
+
+def test_unrelated_documents_are_not_similar():
+    a, b = compute_fingerprint(document(4)), compute_fingerprint(document(5))
+    assert similarity(a["minhash"], b["minhash"]) < 0.1
+    assert similarity(a["minhash"], None) == 0.0
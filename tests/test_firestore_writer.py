@@ -0,0 +1,112 @@
+import pytest
+
+pytest.importorskip("google.api_core")
+from google.api_core import exceptions as api_exceptions  # noqa: E402
+
+import fakes  # noqa: E402
+import firestore_writer  # noqa: E402
+from firestore_writer import FirestoreWriter  # noqa: E402
+
+
+@pytest.fixture
+def spool(tmp_path):
+    return str(tmp_path / "writes.sqlite3")
+
+
+def document(db, path):
+    return db.document(path).get().to_dict()
+
+
+def fail_writes(monkeypatch, exc, paths=None):
+    """Make committing to the fake Firestore raise exc, for every document or only those in paths."""
+    original = fakes.FakeDocumentReference.set
+
+    def set(self, data, merge=False, _latency=None):
+        if paths is None or self.path in paths:
+            raise exc
+        return original(self, data, merge=merge, _latency=_latency)
+    monkeypatch.setattr(fakes.FakeDocumentReference, "set", set)
+
+
+def test_writes_left_by_a_dead_process_are_replayed(firebase, spool):
+    db, _ = firebase
+    dead = FirestoreWriter(spool)
+    for i in range(3):
+        dead.set(f"users/u/summaries/s{i}", {"summary": str(i)}, timestamp_fields=["timestamp"])
+
+    replacement = FirestoreWriter(spool)
+    assert replacement.stats()["pending"] == 3
+    assert replacement.flush() == 3
+    assert [document(db, f"users/u/summaries/s{i}")["summary"] for i in range(3)] == ["0", "1", "2"]
+    assert document(db, "users/u/summaries/s0")["timestamp"] is not None
+    assert replacement.stats()["pending"] == 0
+
+
+def test_leased_writes_are_taken_over_once_the_lease_expires(firebase, spool, monkeypatch):
+    db, _ = firebase
+    crashed, other = FirestoreWriter(spool), FirestoreWriter(spool)
+    crashed.set("users/u/summaries/a", {"summary": "a"})
+    lease, rows = crashed._lease_batch()
+    assert len(rows) == 1
+
+    # The lease is live, so the write belongs to the (crashed) process that took it.
+    assert other.flush() == 0
+    assert document(db, "users/u/summaries/a") is None
+
+    monkeypatch.setattr(firestore_writer, "LEASE_SECONDS", 0.0)
+    crashed.set("users/u/summaries/b", {"summary": "b"})
+    crashed._lease_batch()
+    other._conn.execute("UPDATE writes SET lease_expires = 0")
+    other._conn.commit()
+    assert other.flush() == 2
+    assert document(db, "users/u/summaries/a") == {"summary": "a"}
+
+
+def test_writes_to_one_document_commit_in_queue_order(firebase, spool):
+    db, _ = firebase
+    first, second = FirestoreWriter(spool), FirestoreWriter(spool)
+    path = "users/guest_user/summaries/s"
+    first.set(path, {"summary": "text", "model": "gpt-4o-mini"})
+    lease, rows = first._lease_batch()
+    second.set(path, {"feedback": {"rating": 5}}, merge=True)
+    second.set("users/guest_user/summaries/other", {"summary": "other"})
+
+    # The feedback merge waits for the summary write leased by the first process.
+    assert second.flush() == 1
+    assert document(db, path) is None
+
+    first._commit(rows)
+    first._release(lease)
+    assert second.flush() == 1
+    assert document(db, path) == {"summary": "text", "model": "gpt-4o-mini", "feedback": {"rating": 5}}
+
+
+def test_transient_failure_keeps_writes_spooled(firebase, spool, monkeypatch):
+    db, _ = firebase
+    writer = FirestoreWriter(spool)
+    writer.set("users/u/summaries/a", {"summary": "a"})
+    fail_writes(monkeypatch, api_exceptions.ServiceUnavailable("down"))
+    with pytest.raises(api_exceptions.ServiceUnavailable):
+        writer.flush()
+    assert writer.stats()["pending"] == 1
+    assert writer.stats()["batch_failures"] == 1
+
+    monkeypatch.undo()
+    assert writer.flush() == 1
+    assert document(db, "users/u/summaries/a") == {"summary": "a"}
+
+
+def test_permanent_failure_is_quarantined_without_blocking_the_batch(firebase, spool, monkeypatch):
+    db, _ = firebase
+    writer = FirestoreWriter(spool)
+    for name in ("a", "bad", "c"):
+        writer.set(f"users/u/summaries/{name}", {"summary": name})
+    fail_writes(monkeypatch, api_exceptions.InvalidArgument("rejected"), paths={"users/u/summaries/bad"})
+
+    assert writer.flush() == 3
+    assert document(db, "users/u/summaries/a") == {"summary": "a"}
+    assert document(db, "users/u/summaries/c") == {"summary": "c"}
+    assert document(db, "users/u/summaries/bad") is None
+    stats = writer.stats()
+    assert stats["pending"] == 0 and stats["failed_in_spool"] == 1 and stats["failed"] == 1
+    assert writer.flush() == 0
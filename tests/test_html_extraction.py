@@ -0,0 +1,54 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import extraction  # noqa: E402
+
+pytest.importorskip("bs4")
+
+# The streaming extractor must yield the same words, in the same order, as the BeautifulSoup one.
+FIXTURES = {
+    "paragraphs": "<html><head><title>HB 1</title></head><body><h1>Bill</h1><p>First section.</p><p>Second</p></body></html>",
+    "script_style": "<p>before</p><script>var x = '<p>no</p>';</script><style>p { color: red }</style><p>after</p>",
+    "entities": "<p>Fees &amp; charges &lt;5%&gt; &nbsp;apply&#33; caf&eacute;</p>",
+    "inline_markup": "<p>The <b>department</b> shall<i>adopt</i>rules<br>and<br/>report.</p>",
+    "unclosed_paragraphs": "<div><p>one<p>two<li>three<li>four</div>five",
+    "stray_end_tags": "</p></div>text <span>inside</span></b> more</td>",
+    "comments_and_decls": "<!DOCTYPE html><!-- hidden --><p>shown</p><?php echo 1; ?><p>also shown</p>",
+    "cdata": "<p>a</p><![CDATA[raw text]]>b",
+    "template": "<p>kept</p><template><p>not rendered</p></template><p>also kept</p>",
+    "ruby_closed": "<ruby>kan<rp>(</rp><rt>k</rt><rp>)</rp></ruby> after",
+    "ruby_unclosed_rt": "<ruby>kan<rt>k</ruby><p>after text here</p>",
+    "ruby_unclosed_rp": "<ruby>a<rp>(<rt>x<rp>)</ruby>rest",
+    "ruby_sequence": "<ruby>a<rt>x<rt>y</ruby> b <ruby>c<rp>(<rp>)</ruby> d",
+    "rt_closed_by_parent": "<div><ruby>a<rt>x</div>after the div",
+    "table": "<table><tr><th>Year</th><td>2025</td></tr><tr><td>Amount</td><td>$1,000</td></tr></table>",
+    "nested_skipped": "<div><script>1</script><template><style>x</style>t</template>visible</div>",
+}
+
+
+@pytest.mark.parametrize("name", sorted(FIXTURES))
+def test_stream_matches_bs4(name):
+    html = FIXTURES[name]
+    assert extraction.extract_text_from_html_stream(html).split() == extraction.extract_text_from_html_bs4(html).split()
+
+
+@pytest.mark.parametrize("name", sorted(FIXTURES))
+def test_stream_is_independent_of_chunk_boundaries(name):
+    html = FIXTURES[name]
+    assert (extraction.extract_text_from_html_stream(html, chunk_chars=3).split()
+            == extraction.extract_text_from_html_stream(html).split())
+
+
+def test_unclosed_ruby_annotation_keeps_following_text():
+    assert extraction.extract_text_from_html_stream(FIXTURES["ruby_unclosed_rt"]).split() == ["kan", "after", "text", "here"]
+    assert extraction.extract_text_from_html_stream(FIXTURES["ruby_unclosed_rp"]).split() == ["a", "rest"]
+
+
+def test_encoded_bytes_match_bs4():
+    html = "<html><head><meta charset=\"windows-1252\"></head><body><p>Section § 1 — café</p></body></html>"
+    content = html.encode("windows-1252")
+    assert extraction.extract_text_from_html_stream(content).split() == extraction.extract_text_from_html_bs4(content).split()
@@ -0,0 +1,106 @@
+import json
+import asyncio
+
+import pytest
+
+from jobs import BatchRunner, JobStore, parse_batch_urls
+
+
+def jsonl(*records):
+    return "\n".join(json.dumps(record) for record in records).encode()
+
+
+def test_urls_from_text_and_jsonl():
+    text = "https://a.gov/1\n\n  http://b.gov/2  \n"
+    upload = jsonl("https://c.gov/3", {"url": " https://d.gov/4 ", "note": "x"}) + b"\n\n"
+    assert parse_batch_urls(text, upload) == ["https://a.gov/1", "http://b.gov/2", "https://c.gov/3", "https://d.gov/4"]
+    assert parse_batch_urls(None, None) == []
+
+
+@pytest.mark.parametrize("text, upload, message", [
+    ("ftp://a.gov/1\nhttps://b.gov", None, "Invalid URL(s): ftp://a.gov/1"),
+    ("a.gov/bill.pdf", None, "Invalid URL(s): a.gov/bill.pdf"),
+    (None, b"https://a.gov/1\n", "Line 1 of the JSONL file is not valid JSON."),
+    (None, jsonl("https://a.gov/1", {"link": "https://b.gov"}), "Line 2 of the JSONL file has no \"url\"."),
+    (None, jsonl(42), "Line 1 of the JSONL file has no \"url\"."),
+    ("https://a.gov/1\nhttps://b.gov/2\nhttps://a.gov/1", None, "Duplicate URL(s): https://a.gov/1"),
+    ("https://a.gov/1", jsonl({"url": "https://a.gov/1"}), "Duplicate URL(s): https://a.gov/1"),
+])
+def test_invalid_batches_are_rejected(text, upload, message):
+    with pytest.raises(ValueError) as error:
+        parse_batch_urls(text, upload)
+    assert str(error.value) == message
+
+
+def test_job_progress_and_results(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = store.create_job(["https://a.gov/1", "https://a.gov/2"], "Summarize.", "truncate", "guest_user")
+    job = store.get_job(job_id)
+    assert job["status"] == "queued" and job["total"] == 2 and job["progress"] == 0.0
+    assert job["counts"] == {"pending": 2, "running": 0, "done": 0, "failed": 0}
+
+    store.mark_item(job_id, 1, "done", result={"gpt4": {"summary": "s"}}, elapsed=1.5)
+    assert store.get_job(job_id)["status"] == "running"
+    store.mark_item(job_id, 0, "failed", error="HTTP error 404")
+    job = store.get_job(job_id)
+    assert job["status"] == "completed" and job["progress"] == 1.0
+    results = store.get_results(job_id)
+    assert [(r["index"], r["status"], r["error"]) for r in results] == [(0, "failed", "HTTP error 404"), (1, "done", None)]
+    assert results[1]["result"] == {"gpt4": {"summary": "s"}} and results[1]["elapsed"] == 1.5
+    assert store.get_results(job_id, offset=1, limit=1)[0]["index"] == 1
+    assert store.get_job("missing") is None
+    store.close()
+
+
+def test_unfinished_items_survive_a_restart(tmp_path, monkeypatch):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(path)
+    job_id = store.create_job(["https://a.gov/1", "https://a.gov/2", "https://a.gov/3"], "Summarize.", "map_reduce", "u")
+    store.mark_item(job_id, 0, "done", result={})
+    store.mark_item(job_id, 1, "running")
+    store.close()
+
+    reopened = JobStore(path)
+    assert reopened.pending_items() == [(job_id, 1), (job_id, 2)]
+    assert reopened.load_item(job_id, 2) == ("https://a.gov/3", "Summarize.", "map_reduce", "u")
+
+    ran = []
+
+    async def run_item(self, job, idx):
+        ran.append((job, idx))
+        self.store.mark_item(job, idx, "done", result={})
+
+    monkeypatch.setattr(BatchRunner, "_run_item", run_item)
+
+    async def resume():
+        runner = BatchRunner(reopened, workers=2)
+        runner.start()
+        await runner.queue.join()
+        await runner.stop()
+
+    asyncio.run(resume())
+    assert sorted(ran) == [(job_id, 1), (job_id, 2)]
+    assert reopened.get_job(job_id)["status"] == "completed"
+    reopened.close()
+
+
+def test_failed_item_is_recorded(tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+
+    async def run_item(self, job, idx):
+        raise RuntimeError("extraction exploded")
+
+    monkeypatch.setattr(BatchRunner, "_run_item", run_item)
+
+    async def run():
+        runner = BatchRunner(store, workers=1)
+        runner.start()
+        job_id = runner.submit(["https://a.gov/1"], "Summarize.", "truncate", "u")
+        await runner.queue.join()
+        await runner.stop()
+        return job_id
+
+    job_id = asyncio.run(run())
+    assert store.get_results(job_id)[0]["error"] == "extraction exploded"
+    assert store.get_job(job_id)["counts"]["failed"] == 1
+    store.close()
@@ -0,0 +1,73 @@
+import re
+import random
+
+import pytest
+
+import extraction
+
+OLD_EFFECTIVE_DATE_PATTERN = (
+    r"(effective\s+(?:date\s*(?:is|of|:)?|on)|takes\s+effect\s+(?:on)?)\s*[:\s]*(?:(January|February|March|April|May|June|"
+    r"July|August|September|October|November|December)\s+\d{1,2}(?:st|nd|rd|th)?[,\s]+\d{4}|\d{1,2}(?:st|nd|rd|th)?\s+"
+    r"(January|February|March|April|May|June|July|August|September|October|November|December)[,\s]+\d{4}|\d{4}-\d{2}-\d{2}"
+    r"|\d{2}/\d{2}/\d{4})"
+)
+
+# Whitespace, line breaks and non-ASCII characters (including Unicode whitespace) mixed with text.
+ALPHABET = ["a", "B", "7", ".", " ", "  ", "\t", "\n", "\r", "\r\n", "\n\n", "\x0b", "\x0c", " ", "é", "§",
+            " ", "　", "​", "—", "😀", "\x85"]
+
+
+def old_preprocess_text(text):
+    text = re.sub(r"[\r\n]{2,}", "\n", text)
+    text = re.sub(r"[^\x00-\x7F]+", " ", text)
+    text = re.sub(r"\s{2,}", " ", text)
+    return text.strip()
+
+
+def old_extract_effective_date(text):
+    match = re.search(OLD_EFFECTIVE_DATE_PATTERN, text, re.IGNORECASE)
+    if not match:
+        return ""
+    phrase = match.group(0)
+    return (phrase.split(":", 1)[-1].strip() if ":" in phrase
+            else phrase.split("on", 1)[-1].strip() if "on" in phrase
+            else phrase.split("effect", 1)[-1].strip())
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_preprocess_matches_the_three_pass_version(seed):
+    rng = random.Random(seed)
+    text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 80)))
+    assert extraction.preprocess_text(text) == old_preprocess_text(text)
+
+
+@pytest.mark.parametrize("text", [
+    "", "   ", "\n\n\n", "line one\r\n\r\nline two", "a\n \nb", "é\né", "a   b", "tab\t\tseparated",
+    "Section 1.\n\n\n   Fees — apply.\n", "　leading and trailing　",
+])
+def test_preprocess_edge_cases(text):
+    assert extraction.preprocess_text(text) == old_preprocess_text(text)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("This act takes effect on January 1, 2025.", "January 1, 2025"),
+    ("SECTION 9. This act shall take effect. Effective date: March 3rd, 2026", "March 3rd, 2026"),
+    ("Effective date: 2025-07-01", "2025-07-01"),
+    ("effective on 1st September 2025 unless", "1st September 2025"),
+    ("This section takes effect 07/01/2025.", "07/01/2025"),
+    ("It becomes effective on December 31, 2030", "December 31, 2030"),
+    ("Takes effect upon passage.", ""),
+    ("No date is stated here.", ""),
+])
+def test_extract_effective_date(text, expected):
+    assert extraction.extract_effective_date(text) == expected
+    assert extraction.extract_effective_date(text) == old_extract_effective_date(text)
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_compiled_effective_date_pattern_matches_the_inline_one(seed):
+    rng = random.Random(seed)
+    words = ["effective", "date", "of", "is", "on", "takes", "effect", ":", "January", "march", "1st", "22", "2025",
+             "2025-01-02", "01/02/2025", ",", "the", "act"]
+    text = " ".join(rng.choice(words) for _ in range(rng.randint(0, 30)))
+    assert extraction.extract_effective_date(text) == old_extract_effective_date(text)
@@ -0,0 +1,125 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("fastapi")
+pytest.importorskip("uvicorn")
+
+import mock_llm_server  # noqa: E402
+from provider_gateway import CircuitOpen, ProviderGateway  # noqa: E402
+
+PAYLOAD = {"model": "mock", "messages": [{"role": "user", "content": "Summarize the bill."}], "max_tokens": 16}
+
+
+@pytest.fixture(autouse=True)
+def mock_server():
+    """The mock provider with no latency and no injected failures; tests turn failures on."""
+    saved_config, saved_stats = dict(mock_llm_server.config), dict(mock_llm_server.stats)
+    mock_llm_server.config.update({"latency": 0.0, "jitter": 0.0, "tokens_per_second": 10000.0, "error_rate": 0.0,
+                                   "rate_limit_rate": 0.0, "hang_rate": 0.0, "retry_after": 0})
+    mock_llm_server.stats.update({key: 0 for key in mock_llm_server.stats})
+    yield mock_llm_server
+    mock_llm_server.config.update(saved_config)
+    mock_llm_server.stats.update(saved_stats)
+
+
+def gateway(**kwargs):
+    settings = {"max_retries": 2, "retry_base_seconds": 0.0, "attempt_timeout_seconds": 5.0, "breaker_failures": 5,
+                "breaker_reset_seconds": 60.0}
+    return ProviderGateway("mock", **{**settings, **kwargs})
+
+
+def run(gw, *failures):
+    """Make one gateway call per entry against the mock server; an entry is the config to apply first."""
+    async def calls():
+        transport = httpx.ASGITransport(app=mock_llm_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://mock/v1") as client:
+            async def request():
+                response = await client.post("/chat/completions", json=PAYLOAD)
+                response.raise_for_status()
+                return response.json()
+
+            results = []
+            for failure in failures:
+                mock_llm_server.config.update(failure)
+                try:
+                    results.append(await gw.call(request, 10))
+                except Exception as e:
+                    results.append(e)
+            return results
+    return asyncio.run(calls())
+
+
+def test_rate_limits_are_retried_then_succeed(mock_server):
+    gw = gateway()
+    limited, ok = run(gw, {"rate_limit_rate": 1.0}, {"rate_limit_rate": 0.0})
+    assert isinstance(limited, httpx.HTTPStatusError) and limited.response.status_code == 429
+    assert mock_server.stats["rate_limited"] == 3
+    assert gw.counters["retries"] == 2
+    assert ok["choices"][0]["message"]["content"]
+    assert gw.breaker.state == "closed" and gw.breaker.failures == 0
+
+
+def test_server_errors_open_the_circuit(mock_server):
+    gw = gateway(max_retries=5, breaker_failures=2)
+    failed, rejected = run(gw, {"error_rate": 1.0}, {"error_rate": 0.0})
+    assert isinstance(failed, httpx.HTTPStatusError) and failed.response.status_code == 500
+    assert mock_server.stats["errors"] == 2
+    assert isinstance(rejected, CircuitOpen)
+    assert mock_server.stats["ok"] == 0
+
+
+def test_hung_requests_time_out_and_count_as_failures(mock_server):
+    gw = gateway(max_retries=1, attempt_timeout_seconds=0.1)
+    timed_out, = run(gw, {"hang_rate": 1.0})
+    assert isinstance(timed_out, TimeoutError)
+    assert mock_server.stats["hangs"] == 2
+    assert gw.counters["failures"] == 2 and gw.breaker.failures == 2
+
+
+def test_client_errors_leave_the_circuit_alone(mock_server):
+    gw = gateway(max_retries=0, breaker_failures=1, breaker_reset_seconds=0.0)
+    run(gw, {"error_rate": 1.0})
+    assert gw.breaker.state == "open"
+
+    async def bad_request():
+        request = httpx.Request("POST", "http://mock/v1/chat/completions")
+        raise httpx.HTTPStatusError("400 Bad Request", request=request, response=httpx.Response(400, request=request))
+
+    # The trial call after the reset period is rejected by the client; that says nothing about the provider.
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(gw.call(bad_request))
+    assert gw.breaker.state == "half_open"
+    assert gw.counters["retries"] == 0
+    ok, = run(gw, {"error_rate": 0.0})
+    assert ok["choices"][0]["message"]["content"]
+    assert gw.breaker.state == "closed"
+
+
+def test_openai_client_errors_are_classified(mock_server):
+    openai = pytest.importorskip("openai")
+    gw = gateway(max_retries=1)
+
+    async def calls():
+        http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=mock_llm_server.app))
+        client = openai.AsyncOpenAI(api_key="mock", base_url="http://mock/v1", http_client=http_client, max_retries=0)
+        try:
+            mock_llm_server.config["rate_limit_rate"] = 1.0
+            with pytest.raises(openai.RateLimitError):
+                await gw.call(lambda: client.chat.completions.create(**PAYLOAD))
+            mock_llm_server.config["rate_limit_rate"] = 0.0
+            return await gw.call(lambda: client.chat.completions.create(**PAYLOAD))
+        finally:
+            await client.close()
+
+    response = asyncio.run(calls())
+    assert response.choices[0].message.content
+    assert mock_server.stats["rate_limited"] == 2
+    assert gw.counters["retries"] == 1
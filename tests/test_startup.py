@@ -0,0 +1,18 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHECK_STARTUP = os.path.join(ROOT, "benchmarks", "check_startup.py")
+
+pytest.importorskip("fastapi")
+
+
+def test_startup_within_budget_and_heavy_imports_deferred(tmp_path):
+    # A fresh interpreter, so modules imported by other tests don't count against the app.
+    env = {**os.environ, "BATCH_DB_PATH": str(tmp_path / "batch_jobs.sqlite3"),
+           "FIRESTORE_WRITE_SPOOL_PATH": str(tmp_path / "firestore_writes.sqlite3")}
+    result = subprocess.run([sys.executable, CHECK_STARTUP], capture_output=True, text=True, env=env, timeout=120)
+    assert result.returncode == 0, result.stdout + result.stderr
@@ -0,0 +1,57 @@
+import pytest
+
+pytest.importorskip("google.api_core")
+
+import storage_service  # noqa: E402
+from cache import hash_content  # noqa: E402
+
+
+@pytest.fixture
+def store(firebase, tmp_path):
+    storage_service._manifests.clear()
+    storage_service._signed_urls.clear()
+    _, bucket = firebase
+
+    def upload(file_name, data, user_id="u"):
+        path = tmp_path / "upload.pdf"
+        path.write_bytes(data)
+        return storage_service.store_upload(user_id, file_name, str(path), "application/pdf", hash_content(data))
+    upload.bucket = bucket
+    return upload
+
+
+def test_free_name_is_used_as_is(store):
+    stored = store("bill.pdf", b"one")
+    assert stored["file_name"] == "bill.pdf" and not stored["deduplicated"]
+    assert "users/u/bill.pdf" in store.bucket.objects
+    assert stored["file_url"]
+
+
+def test_name_conflict_takes_the_next_suffix(store):
+    names = [store("bill.pdf", content)["file_name"] for content in (b"one", b"two", b"three")]
+    assert names == ["bill.pdf", "bill(1).pdf", "bill(2).pdf"]
+    assert storage_service.get_manifest("u").keys() == set(names)
+
+
+def test_leftover_suffixed_name_is_skipped(store):
+    # Files stored before the counter existed: the counter starts at 1, but that name is taken.
+    store.bucket.objects["users/u/bill.pdf"] = {"size": 3}
+    store.bucket.objects["users/u/bill(1).pdf"] = {"size": 3}
+    stored = store("bill.pdf", b"new")
+    assert stored["file_name"] == "bill(2).pdf"
+    assert store.bucket.objects["users/u/bill(1).pdf"] == {"size": 3}
+    assert store("bill.pdf", b"newer")["file_name"] == "bill(3).pdf"
+
+
+def test_identical_reupload_returns_the_existing_file(store):
+    first = store("bill.pdf", b"same bytes")
+    objects = dict(store.bucket.objects)
+    again = store("renamed.pdf", b"same bytes")
+    assert again["deduplicated"] and again["file_name"] == first["file_name"] == "bill.pdf"
+    assert store.bucket.objects == objects
+
+
+def test_uploads_are_per_user(store):
+    store("bill.pdf", b"one", user_id="a")
+    assert store("bill.pdf", b"one", user_id="b")["file_name"] == "bill.pdf"
+    assert not store("bill.pdf", b"two", user_id="b")["deduplicated"]
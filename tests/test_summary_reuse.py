@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("google.api_core")
+
+import summary  # noqa: E402
+from fingerprint import band_keys  # noqa: E402
+from firestore_writer import FirestoreWriter  # noqa: E402
+
+PROMPT = "Summarize the bill."
+SUFFIX = "\nThis measure has an effective date of: "
+
+
+@pytest.fixture
+def processor(firebase, tmp_path, monkeypatch):
+    monkeypatch.setenv("TOGETHERAI_API_KEY", "test")
+    monkeypatch.setattr(summary, "firestore_writer", FirestoreWriter(str(tmp_path / "writes.sqlite3")))
+    summary.summary_memo.clear()
+    return summary.TextProcessor("togetherai")
+
+
+def signature(changed=(), shared_prefix=0):
+    """A 128-slot signature equal to the reference one except in the changed slots (or after shared_prefix)."""
+    values = list(range(128))
+    for slot in changed:
+        values[slot] += 1000
+    if shared_prefix:
+        values[shared_prefix:] = [value + 5000 for value in values[shared_prefix:]]
+    return {"minhash": values, "bands": band_keys(values)}
+
+
+def store(db, processor, summary_id, text, fp, effective_date=""):
+    db.document(f"users/u/summaries/{summary_id}").set({
+        "summary": text, "prompt_key": summary.make_prompt_key(PROMPT, processor.model), "minhash": fp["minhash"],
+        "lsh_bands": fp["bands"], "effective_date": effective_date})
+
+
+def reuse(processor, summary_id, fp, effective_date):
+    return asyncio.run(processor.find_reusable_summary(summary_id, "u", "doc", PROMPT, f"hash-{summary_id}", None, "truncate",
+                                                       fp, text="", effective_date=effective_date))
+
+
+def test_best_match_is_found_behind_many_candidates_sharing_a_band(firebase, processor, monkeypatch):
+    db, _ = firebase
+    monkeypatch.setattr(summary, "NEAR_DUPLICATE_PAGE_SIZE", 7)
+    # Stored first, each shares only the first band with the query and is not similar enough.
+    for i in range(40):
+        store(db, processor, f"decoy{i:02d}", "Decoy.", signature(shared_prefix=8))
+    store(db, processor, "zz_match", "Match.", signature(changed=(127,)))
+
+    source_id, data, score = processor.find_near_duplicate_summary("u", summary.make_prompt_key(PROMPT, processor.model),
+                                                                   signature())
+    assert source_id == "zz_match" and data["summary"] == "Match."
+    assert score == 127 / 128
+
+
+def test_no_match_below_the_threshold(firebase, processor):
+    db, _ = firebase
+    store(db, processor, "decoy", "Decoy.", signature(shared_prefix=8))
+    assert processor.find_near_duplicate_summary("u", summary.make_prompt_key(PROMPT, processor.model), signature()) is None
+
+
+def test_reuse_swaps_in_this_documents_effective_date(firebase, processor):
+    db, _ = firebase
+    store(db, processor, "source", "Body." + SUFFIX + "January 1, 2025", signature(changed=(5,)), "January 1, 2025")
+
+    assert reuse(processor, "new", signature(), "July 1, 2026")["summary"] == "Body." + SUFFIX + "July 1, 2026"
+    assert reuse(processor, "undated", signature(), "")["summary"] == "Body."
+    saved = processor.find_existing_summary("new", "u")
+    assert saved["summary"] == "Body." + SUFFIX + "July 1, 2026"
+
+
+def test_summaries_without_a_stored_effective_date_are_not_reused(firebase, processor):
+    db, _ = firebase
+    fp = signature(changed=(5,))
+    db.document("users/u/summaries/legacy").set({
+        "summary": "Body." + SUFFIX + "January 1, 2025", "prompt_key": summary.make_prompt_key(PROMPT, processor.model),
+        "minhash": fp["minhash"], "lsh_bands": fp["bands"]})
+    assert reuse(processor, "new", signature(), "July 1, 2026") is None
+
+
+def test_saving_a_summary_clears_the_cached_summary_pages(processor):
+    summary.summaries_cache.put(("guest_user", 50), {"summaries": []})
+    processor.save_summary("Summary.", "s1", "doc", PROMPT, "guest_user", "hash-s1")
+    assert summary.summaries_cache.get(("guest_user", 50)) is None
@@ -0,0 +1,96 @@
+import re
+import random
+
+import pytest
+
+import tokens
+
+EXACT_MODEL = "test-exact"
+APPROXIMATE_MODEL = "test-approximate"
+
+
+class WordEncoding:
+    """A tiktoken-like encoding with one token per word (with its leading whitespace) or trailing whitespace run."""
+
+    _PIECE = re.compile(r"\s*\S+|\s+")
+
+    def __init__(self):
+        self.vocab, self.pieces = {}, []
+
+    def encode(self, text, disallowed_special=()):
+        ids = []
+        for piece in self._PIECE.findall(text):
+            if piece not in self.vocab:
+                self.vocab[piece] = len(self.pieces)
+                self.pieces.append(piece)
+            ids.append(self.vocab[piece])
+        return ids
+
+    def decode(self, ids):
+        return "".join(self.pieces[i] for i in ids)
+
+
+@pytest.fixture(autouse=True)
+def encodings(monkeypatch):
+    encoding = WordEncoding()
+    monkeypatch.setitem(tokens._encodings, EXACT_MODEL, (encoding, True))
+    monkeypatch.setitem(tokens._encodings, APPROXIMATE_MODEL, (encoding, False))
+    return encoding
+
+
+def words(count, seed=0):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(["bill", "section", "fiscal", "a", "department-of-revenue"]) for _ in range(count))
+
+
+@pytest.mark.parametrize("budget, expected_words", [(101, 100), (100, 100), (99, 99), (1, 1), (0, 0)])
+def test_truncate_just_under_at_and_over_the_budget(budget, expected_words):
+    text = words(100)
+    result = tokens.truncate_to_tokens(text, budget, EXACT_MODEL)
+    assert result == " ".join(text.split()[:expected_words])
+    assert tokens.count_tokens(result, EXACT_MODEL) == expected_words
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_prefix_encoding_matches_encoding_the_whole_text(encodings, seed):
+    rng = random.Random(seed)
+    # Long whitespace runs make some tokens much longer than CHARS_PER_TOKEN_BOUND, forcing the prefix to double.
+    text = "".join(rng.choice(["word ", "x" * rng.randint(1, 40), " " * rng.randint(1, 200), "\n"]) for _ in range(500))
+    budget = rng.randint(1, 400)
+    expected = encodings.decode(encodings.encode(text)[:budget])
+    assert tokens.truncate_to_tokens(text, budget, EXACT_MODEL) == expected
+
+
+@pytest.mark.parametrize("budget", [1, 2, 22, 23, 24, 46, 100, 299, 1000])
+def test_approximate_counts_stay_within_the_budget(budget):
+    text = words(2000)
+    result = tokens.truncate_to_tokens(text, budget, APPROXIMATE_MODEL)
+    assert tokens.count_tokens(result, APPROXIMATE_MODEL) <= budget
+    # And no more is cut than the margin requires: one more word would go over.
+    kept = len(result.split())
+    assert tokens.count_tokens(" ".join(text.split()[:kept + 1]), APPROXIMATE_MODEL) > budget
+
+
+def test_document_budget_subtracts_prompt_completion_and_overhead(monkeypatch):
+    monkeypatch.setattr(tokens, "MAX_DOCUMENT_TOKENS", 0)
+    monkeypatch.setenv("CONTEXT_WINDOW_TEST_EXACT", "5000")
+    prompt = words(40)
+    assert tokens.document_budget(EXACT_MODEL, prompt, 1500) == 5000 - 1500 - tokens.MESSAGE_OVERHEAD_TOKENS - 40
+    assert tokens.document_budget(EXACT_MODEL, prompt, 5000) == 0
+
+
+def test_max_document_tokens_caps_the_budget(monkeypatch):
+    monkeypatch.setattr(tokens, "MAX_DOCUMENT_TOKENS", 8000)
+    monkeypatch.setenv("CONTEXT_WINDOW_TEST_EXACT", "128000")
+    assert tokens.document_budget(EXACT_MODEL, "Summarize:", 1500) == 8000
+    text = words(9000)
+    fitted = tokens.fit_to_context(EXACT_MODEL, "Summarize:", text, 1500)
+    assert tokens.count_tokens(fitted, EXACT_MODEL) == 8000
+    # A small window still wins over the cap.
+    monkeypatch.setenv("CONTEXT_WINDOW_TEST_EXACT", "4000")
+    assert tokens.document_budget(EXACT_MODEL, "Summarize:", 1500) == 4000 - 1500 - tokens.MESSAGE_OVERHEAD_TOKENS - 1
+
+
+def test_max_document_tokens_is_part_of_the_budget_signature(monkeypatch):
+    monkeypatch.setattr(tokens, "MAX_DOCUMENT_TOKENS", 8000)
+    assert tokens.budget_signature(EXACT_MODEL)["max_document_tokens"] == 8000
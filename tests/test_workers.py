@@ -0,0 +1,76 @@
+import os
+import sys
+import signal
+import asyncio
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workers import ExtractionPool, PoolSaturated  # noqa: E402
+
+
+def run(pool, *calls):
+    """Run (fn, *args) calls one after another on the pool; an exception is returned in place of a result."""
+    async def go():
+        results = []
+        for fn, *args in calls:
+            try:
+                results.append(await pool.run(fn, *args))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    try:
+        return asyncio.run(go())
+    finally:
+        pool.shutdown()
+
+
+def test_killed_worker_is_replaced():
+    pool = ExtractionPool(max_workers=1)
+
+    async def go():
+        pid = await pool.run(os.getpid)
+        os.kill(pid, signal.SIGKILL)
+        return pid, await pool.run(os.getpid)
+
+    try:
+        old_pid, new_pid = asyncio.run(go())
+    finally:
+        pool.shutdown()
+    assert new_pid != old_pid
+    assert pool.restarts == 1
+
+
+def test_call_that_crashes_its_worker_fails_but_pool_recovers():
+    pool = ExtractionPool(max_workers=1)
+    crashed, pid = run(pool, (os._exit, 1), (os.getpid,))
+    assert isinstance(crashed, BrokenProcessPool)
+    assert isinstance(pid, int) and pid != os.getpid()
+    assert pool.restarts == 2
+
+
+def test_admit_rejects_past_the_queue_limit_and_nests():
+    pool = ExtractionPool(max_workers=1, max_queue=1)
+    admitted = asyncio.Event()
+
+    async def holder():
+        with pool.admit():
+            with pool.admit():
+                assert pool.active == 1
+            admitted.set()
+            await asyncio.sleep(0.05)
+
+    async def other():
+        await admitted.wait()
+        with pool.admit():
+            pass
+
+    async def go():
+        return await asyncio.gather(holder(), other(), return_exceptions=True)
+
+    _, rejected = asyncio.run(go())
+    assert isinstance(rejected, PoolSaturated)
+    assert pool.active == 0 and pool.rejected == 1
@@ -0,0 +1,117 @@
+import os
+import logging
+import threading
+
+# Context window (prompt + completion tokens) per model; override with CONTEXT_WINDOW_<MODEL>.
+CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4o-mini": 128000,
+    "meta-llama/Llama-3.3-70B-Instruct-Turbo-Free": 131072,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Cap on document tokens per request (0 = use the whole context window), to bound cost and throughput.
+# Every request is charged its prompt + max completion tokens against the provider's tokens-per-minute
+# limit (LLM_<PROVIDER>_TPM), so this also sets how many summaries a minute fit: at the default 8000 (plus
+# 1500 completion tokens) and OpenAI's default 200000 TPM about 20 full-length documents a minute, whereas
+# a whole 128k gpt-4o-mini window would allow one or two. Raise both together when the account allows.
+MAX_DOCUMENT_TOKENS = int(os.getenv("MAX_DOCUMENT_TOKENS", "8000"))
+
+# Tokens added by the chat format around a single user message.
+MESSAGE_OVERHEAD_TOKENS = 8
+
+# Models without a tiktoken encoding (Llama) are counted with cl100k_base and this safety factor.
+APPROXIMATE_TOKENIZER = "cl100k_base"
+APPROXIMATE_MARGIN = float(os.getenv("TOKEN_COUNT_MARGIN", "1.15"))
+
+# Upper bound on characters per token, used to size the text prefix encoded before truncating.
+CHARS_PER_TOKEN_BOUND = 8
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+
+def _env_suffix(model):
+    return "".join(c if c.isalnum() else "_" for c in model).upper()
+
+
+def get_tokenizer(model):
+    """
+    tiktoken encoding for a model, loaded once per process. Returns (encoding, exact) where
+    exact is False when the model's real tokenizer is unavailable and counts are approximate.
+    """
+    with _encodings_lock:
+        if model not in _encodings:
+            import tiktoken
+            try:
+                _encodings[model] = (tiktoken.encoding_for_model(model), True)
+            except KeyError:
+                logging.info(f"No tiktoken encoding for {model}; approximating with {APPROXIMATE_TOKENIZER}")
+                _encodings[model] = (tiktoken.get_encoding(APPROXIMATE_TOKENIZER), False)
+        return _encodings[model]
+
+
+def preload(models=None):
+    """Load the tokenizers of the given models (default: every model with a known context window)."""
+    for model in models or CONTEXT_WINDOWS:
+        get_tokenizer(model)
+
+
+def count_tokens(text, model):
+    """Token count of text for a model (an upper estimate for approximate tokenizers)."""
+    encoding, exact = get_tokenizer(model)
+    count = len(encoding.encode(text, disallowed_special=()))
+    return count if exact else int(count * APPROXIMATE_MARGIN) + 1
+
+
+def truncate_to_tokens(text, max_tokens, model):
+    """
+    The longest prefix of text that is at most max_tokens tokens for the model.
+    Only a prefix a little longer than needed is encoded (doubling if it was too short),
+    so keeping the first few thousand tokens of a huge document stays cheap.
+    """
+    if max_tokens <= 0:
+        return ""
+    encoding, exact = get_tokenizer(model)
+    limit = max_tokens
+    if not exact:
+        # The most raw tokens whose approximate count (see count_tokens) is still within max_tokens.
+        limit = int(max_tokens / APPROXIMATE_MARGIN)
+        if int(limit * APPROXIMATE_MARGIN) + 1 > max_tokens:
+            limit -= 1
+    prefix_chars = (limit + 1) * CHARS_PER_TOKEN_BOUND
+    while True:
+        prefix = text[:prefix_chars]
+        tokens = encoding.encode(prefix, disallowed_special=())
+        if len(tokens) > limit:
+            # More tokens than needed were encoded, so the first `limit` are not affected by the cut.
+            return encoding.decode(tokens[:limit])
+        if len(prefix) == len(text):
+            return text
+        prefix_chars *= 2
+
+
+def context_window(model):
+    override = os.getenv(f"CONTEXT_WINDOW_{_env_suffix(model)}")
+    return int(override) if override else CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+
+
+def budget_signature(model):
+    """The settings that decide how much of a document a model sees; part of the summary key."""
+    return {"context_window": context_window(model), "max_document_tokens": MAX_DOCUMENT_TOKENS}
+
+
+def document_budget(model, prompt, max_completion_tokens):
+    """
+    Tokens left for the document once the prompt, the chat format overhead and the
+    completion (max_tokens) are accounted for in the model's context window.
+    """
+    budget = context_window(model) - max_completion_tokens - MESSAGE_OVERHEAD_TOKENS - count_tokens(prompt, model)
+    if MAX_DOCUMENT_TOKENS:
+        budget = min(budget, MAX_DOCUMENT_TOKENS)
+    return max(budget, 0)
+
+
+def fit_to_context(model, prompt, text, max_completion_tokens):
+    """Truncate text so that prompt + text + max_completion_tokens fits the model's context window."""
+    return truncate_to_tokens(text, document_budget(model, prompt, max_completion_tokens), model)
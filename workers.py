@@ -0,0 +1,124 @@
+import os
+import asyncio
+import logging
+import functools
+import contextvars
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+# Workers are started with forkserver (spawn where unavailable) rather than fork: by the time the pool
+# starts, the app has gRPC channels and background threads, which a forked child would inherit mid-state.
+START_METHOD = os.getenv("EXTRACTION_START_METHOD") or (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+# Imported once by the fork server, so each new worker starts with the extraction code already loaded.
+PRELOAD_MODULES = ["extraction", "ocr"]
+
+# Set while the current task holds a pool slot, so nested admit() calls share it.
+_admitted = contextvars.ContextVar("extraction_admitted", default=False)
+
+
+class PoolSaturated(Exception):
+    """Raised when the extraction pool's queue is full; surfaced to clients as HTTP 429."""
+
+
+class ExtractionPool:
+    """
+    Process pool for CPU-heavy extraction (fitz, BeautifulSoup, OCR, preprocessing),
+    keeping that work off the event loop. admit() bounds how many documents may be
+    queued or in progress at once; beyond that new work is rejected with PoolSaturated.
+    """
+
+    def __init__(self, max_workers=None, max_queue=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue or self.max_workers * 4
+        self.active = 0
+        self.rejected = 0
+        self.restarts = 0
+        self._executor = None
+
+    @classmethod
+    def from_env(cls):
+        """Size the pool from EXTRACTION_WORKERS and EXTRACTION_MAX_QUEUE (start method: EXTRACTION_START_METHOD)."""
+        max_workers = int(os.getenv("EXTRACTION_WORKERS", "0")) or None
+        max_queue = int(os.getenv("EXTRACTION_MAX_QUEUE", "0")) or None
+        return cls(max_workers=max_workers, max_queue=max_queue)
+
+    def _get_executor(self):
+        if self._executor is None:
+            context = multiprocessing.get_context(START_METHOD)
+            if START_METHOD == "forkserver":
+                context.set_forkserver_preload(PRELOAD_MODULES)
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+            logging.info(f"Started extraction pool with {self.max_workers} {START_METHOD} worker(s), queue limit {self.max_queue}")
+        return self._executor
+
+    @contextmanager
+    def admit(self):
+        """
+        Reserve a slot for one document, or raise PoolSaturated if the queue is full. A caller can
+        admit before work that must not happen for a rejected document; admit() calls nested inside
+        it (in the same task) use the same slot.
+        """
+        if _admitted.get():
+            yield
+            return
+        if self.active >= self.max_queue:
+            self.rejected += 1
+            raise PoolSaturated(f"Extraction queue is full ({self.max_queue} documents in progress)")
+        self.active += 1
+        token = _admitted.set(True)
+        try:
+            yield
+        finally:
+            _admitted.reset(token)
+            self.active -= 1
+
+    def _replace_broken(self, executor):
+        # Only the first caller to see a broken executor replaces it; the rest reuse the new one.
+        if self._executor is executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self.restarts += 1
+            logging.error("An extraction worker died; restarting the extraction pool")
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Run a picklable top-level function in a worker process. A worker that dies (a crash in native
+        code, the OOM killer) breaks the whole executor, so it is replaced and the call retried once;
+        raises BrokenProcessPool if the call kills that pool's worker too.
+        """
+        loop = asyncio.get_running_loop()
+        call = functools.partial(fn, *args, **kwargs)
+        executor = self._get_executor()
+        try:
+            return await loop.run_in_executor(executor, call)
+        except BrokenProcessPool:
+            self._replace_broken(executor)
+        executor = self._get_executor()
+        try:
+            return await loop.run_in_executor(executor, call)
+        except BrokenProcessPool:
+            self._replace_broken(executor)
+            raise
+
+    def start(self):
+        self._get_executor()
+
+    async def warm(self):
+        """Start the worker processes now instead of on the first document."""
+        await asyncio.gather(*(self.run(os.getpid) for _ in range(self.max_workers)))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self):
+        return {"workers": self.max_workers, "max_queue": self.max_queue, "active": self.active, "rejected": self.rejected,
+                "restarts": self.restarts}
+
+
+extraction_pool = ExtractionPool.from_env()